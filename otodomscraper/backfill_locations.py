@@ -0,0 +1,16 @@
+import logging
+
+from services import connect_to_database
+from services import PropertyService
+from services.indexes import ensure_indexes
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    connect_to_database()
+    PropertyService.backfill_locations()
+    ensure_indexes()
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,135 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import uuid
+from urllib.parse import urlsplit
+from urllib.parse import urlunsplit
+
+from crawler import Crawler
+from mongoengine.connection import get_connection
+from services import PropertyService
+
+
+def benchmark_database(host: str) -> tuple[str, str]:
+    """
+    :param host: The URL of the database from settings.json
+    :return: The URL and the name of a new database on the same server
+    """
+    parts = urlsplit(host)
+    name = parts.path.strip("/") or "otodomscraper"
+    name = f"{name}_benchmark_{uuid.uuid4().hex[:8]}"
+    return urlunsplit(parts._replace(path="/" + name)), name
+
+
+def benchmark_settings(settings: dict, archive: str, host: str) -> dict:
+    """
+    Builds the settings replaying the archive from scratch.
+
+    The incremental mode, the change tracking, the HTTP cache
+    and the checkpoint are disabled, so every listing of the archive
+    is extracted and written to the database.
+
+    :param settings: The settings of the recorded crawl
+    :param archive: The path of the crawl archive
+    :param host: The URL of the empty database
+    :return: The settings of the benchmark
+    """
+    crawler_settings = dict(settings["crawler"])
+    crawler_settings.update(
+        incremental=False,
+        track_changes=False,
+        http_cache={**crawler_settings.get("http_cache", {}), "enabled": False},
+        checkpoint={**crawler_settings.get("checkpoint", {}), "enabled": False},
+        archive={"mode": "replay", "path": archive},
+    )
+    return {**settings, "crawler": crawler_settings, "database": {"host": host}}
+
+
+def report(crawler: Crawler, elapsed: float, saved: int) -> str:
+    """
+    :param crawler: The crawler which replayed the archive
+    :param elapsed: The duration of the whole replay in seconds
+    :param saved: The number of the properties written to the database
+    :return: The summary of the benchmark
+    """
+    timings = crawler.timings
+
+    def per_call(stage: str) -> str:
+        count = timings.counts.get(stage, 0)
+        if not count:
+            return "-"
+        total = timings.totals[stage]
+        return f"{total / count * 1000:.2f}ms x {count} ({total:.3f}s total)"
+
+    return "\n".join(
+        [
+            f"listings: {len(crawler.listings)}, saved: {saved}",
+            f"elapsed: {elapsed:.2f}s",
+            f"throughput: {saved / elapsed if elapsed else 0:.1f} listings/s",
+            f"parse per page: {per_call('parse')}",
+            f"extract per listing: {per_call('extract')}",
+            f"write per batch: {per_call('write')}",
+        ]
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Replay the crawl archive into a new, empty database "
+        "and measure the throughput of the whole pipeline."
+    )
+    parser.add_argument(
+        "archive",
+        nargs="?",
+        help="path of the crawl archive, defaults to the one in settings.json",
+    )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="replay the crawl with the asyncio crawler",
+    )
+    parser.add_argument(
+        "--keep",
+        action="store_true",
+        help="keep the database of the benchmark instead of dropping it",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    with open("settings.json", "r", encoding="utf-8") as f:
+        settings = json.load(f)
+    archive = args.archive or settings["crawler"].get("archive", {}).get("path")
+    if not archive or not os.path.isfile(archive):
+        print(f"Crawl archive not found: {archive}", file=sys.stderr)
+        return 1
+    host, name = benchmark_database(settings["database"]["host"])
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "settings.json"), "w") as f:
+            json.dump(benchmark_settings(settings, os.path.abspath(archive), host), f)
+        os.chdir(directory)
+        started_at = time.perf_counter()
+        crawler = Crawler()
+        try:
+            if PropertyService.get_all().count():
+                print(f"Database {name} is not empty", file=sys.stderr)
+                return 1
+            if args.use_async:
+                crawler.start_async()
+            else:
+                crawler.start()
+            elapsed = time.perf_counter() - started_at
+            print(report(crawler, elapsed, PropertyService.get_all().count()))
+        finally:
+            if args.keep:
+                print(f"Kept the database {name}")
+            else:
+                get_connection().drop_database(name)
+    return 0
+
+
+if "__main__" == __name__:
+    sys.exit(main())
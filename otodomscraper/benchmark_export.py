@@ -0,0 +1,208 @@
+import argparse
+import random
+import sys
+import time
+from datetime import datetime
+from datetime import timezone
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+
+from bson import ObjectId
+from common import flatten_dict
+from models import AgencyDocument
+from models import PropertyDocument
+from models.schema import CSV_FLATTENER
+from models.schema import document_columns
+from mongoengine import BooleanField
+from mongoengine import DateTimeField
+from mongoengine import EnumField
+from mongoengine import FloatField
+from mongoengine import IntField
+from mongoengine import ListField
+from mongoengine.base import BaseField
+from services import PropertyService
+
+
+def sample_value(field: BaseField, number: int) -> object:
+    """
+    :param field: The field of the document
+    :param number: The number of the document
+    :return: The raw value of the field type
+    """
+    if isinstance(field, EnumField):
+        members = list(field._enum_cls)
+        return members[number % len(members)].value
+    if isinstance(field, BooleanField):
+        return number % 2 == 0
+    if isinstance(field, IntField):
+        return number
+    if isinstance(field, FloatField):
+        return number / 10
+    if isinstance(field, DateTimeField):
+        return datetime(2024, 1, 1, tzinfo=timezone.utc)
+    if isinstance(field, ListField):
+        return []
+    return f"value {number}"
+
+
+def sample_document(document_cls: type, number: int) -> dict:
+    """
+    :param document_cls: The class of the document
+    :param number: The number of the document
+    :return: The raw document with every column of the document filled
+    """
+    document = {}
+    for column in document_columns(document_cls):
+        parent = document
+        for key in column.path[:-1]:
+            parent = parent.setdefault(key, {})
+        parent[column.path[-1]] = sample_value(column.field, number)
+    return document
+
+
+def synthetic_agencies(count: int) -> list[dict]:
+    """
+    :param count: The number of the agencies
+    :return: The raw agencies with their ids
+    """
+    agencies = []
+    for number in range(count):
+        agency = sample_document(AgencyDocument, number)
+        agency["_id"] = ObjectId()
+        agencies.append(agency)
+    return agencies
+
+
+def synthetic_properties(count: int, agencies: list[dict]) -> Iterator[dict]:
+    """
+    Generates the properties offered by the agencies drawn at random,
+    the same ones for every call.
+
+    The nested documents are shared by all the properties,
+    so the properties are cheap to generate and take no memory once consumed.
+
+    :param count: The number of the properties
+    :param agencies: The raw agencies offering the properties
+    :return: The raw properties
+    """
+    template = sample_document(PropertyDocument, 0)
+    draw = random.Random(0)
+    for number in range(count):
+        property_ = dict(template)
+        property_["_id"] = ObjectId()
+        property_["otodom_id"] = number
+        property_["estate_agency"] = draw.choice(agencies)["_id"]
+        yield property_
+
+
+def scan_join(properties: Iterable[dict], agencies: list[dict]) -> Iterator[dict]:
+    """
+    Joins the properties with their agencies the way the export did
+    before the hash lookup, by scanning the agencies for every property.
+
+    :param properties: The raw properties
+    :param agencies: The raw agencies
+    :return: The properties with their agency under the agency key
+    """
+    for property_ in properties:
+        estate_agency = property_.get("estate_agency")
+        if estate_agency is not None:
+            agency_id = str(estate_agency)
+            for agency in agencies:
+                if str(agency["_id"]) == agency_id:
+                    property_["agency"] = agency
+                    property_.pop("estate_agency")
+                    break
+        yield property_
+
+
+def measure(rows: Iterable[dict], process: Callable) -> tuple[float, int]:
+    """
+    :param rows: The rows to process
+    :param process: The function processing the rows lazily
+    :return: The CPU time in seconds and the number of the processed rows
+    """
+    processed = 0
+    started_at = time.process_time()
+    for _ in process(rows):
+        processed += 1
+    return time.process_time() - started_at, processed
+
+
+def report(name: str, seconds: float, rows: int, total: int) -> str:
+    """
+    :param name: The name of the measured variant
+    :param seconds: The CPU time of the measured rows
+    :param rows: The number of the measured rows
+    :param total: The number of the rows the time is projected to
+    :return: The summary of the measurement
+    """
+    rate = rows / seconds if seconds else 0
+    projected = seconds / rows * total if rows else 0
+    return f"{name}: {rate:.0f} rows/s, {projected:.1f}s per {total} rows"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Measure the join of the exported properties with their "
+        "agencies and their flattening over synthetic documents, "
+        "without the database."
+    )
+    parser.add_argument(
+        "--properties", type=int, default=1_000_000, help="number of the properties"
+    )
+    parser.add_argument(
+        "--agencies", type=int, default=5_000, help="number of the agencies"
+    )
+    parser.add_argument(
+        "--scan-sample",
+        type=int,
+        default=200,
+        help="number of the properties joined by the scan, "
+        "its time is projected to all the properties",
+    )
+    parser.add_argument(
+        "--flatten-rows",
+        type=int,
+        default=100_000,
+        help="number of the joined properties flattened to the csv columns",
+    )
+    args = parser.parse_args()
+    if args.properties < 1 or args.agencies < 1:
+        print(
+            "The numbers of properties and agencies must be positive", file=sys.stderr
+        )
+        return 1
+    agencies = synthetic_agencies(args.agencies)
+    print(f"{args.properties} properties, {args.agencies} agencies")
+
+    seconds, rows = measure(
+        synthetic_properties(args.properties, agencies),
+        lambda properties: PropertyService.join_agencies(properties, agencies),
+    )
+    print(report("hash join", seconds, rows, args.properties))
+
+    sample = min(args.scan_sample, args.properties)
+    seconds, rows = measure(
+        synthetic_properties(sample, agencies),
+        lambda properties: scan_join(properties, agencies),
+    )
+    print(report("scan join", seconds, rows, args.properties))
+
+    joined = list(
+        PropertyService.join_agencies(
+            synthetic_properties(args.flatten_rows, agencies), agencies
+        )
+    )
+    flatteners = {"RowFlattener": CSV_FLATTENER, "flatten_dict": flatten_dict}
+    for name, flatten in flatteners.items():
+        seconds, rows = measure(
+            joined, lambda properties: (flatten(row) for row in properties)
+        )
+        print(report(name, seconds, rows, args.properties))
+    return 0
+
+
+if "__main__" == __name__:
+    sys.exit(main())
@@ -0,0 +1,204 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from typing import Callable
+
+from common import OfferedBy
+from crawler.archive import ArchiveReplay
+from crawler.extractor import extract_page_data
+from crawler.parsing import extract_listing
+from models import AgencyDocument
+from models import PropertyDocument
+from models.building import BuildingDocument
+from models.localization import LocalizationDocument
+from models.records import AgencyRecord
+from models.records import PropertyRecord
+from mongoengine import ValidationError
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+
+
+def listing_pages(archive: str) -> list[tuple[str, bytes]]:
+    """
+    :param archive: The path of the crawl archive
+    :return: The links and the contents of the listing pages
+        recorded in the archive
+    """
+    replay = ArchiveReplay(archive)
+    return [
+        (response.url, response.content)
+        for response in replay.responses.values()
+        if response.status == 200 and "/pl/oferta/" in response.url
+    ]
+
+
+def soup_page_data(content: bytes) -> dict | None:
+    """
+    Decodes the page data the way it was done before the raw extraction,
+    by parsing the whole page to the DOM tree.
+
+    :param content: The raw content of the page
+    :return: The decoded page data or None if the JSON was not found
+    """
+    script = BeautifulSoup(content, "html.parser").find(
+        "script", {"type": "application/json"}
+    )
+    if script is None:
+        return None
+    return json.loads(script.text)
+
+
+def record_fields(record: object) -> dict:
+    """
+    :param record: The record extracted from the listing page
+    :return: The values of the record keyed by the names of its fields
+    """
+    return {name: getattr(record, name) for name in record.__slots__}
+
+
+def document_listing(page_data: dict, link: str, promoted: bool) -> dict | None:
+    """
+    Extracts the listing the way it was done before the records,
+    by constructing, validating and serializing the documents.
+
+    The page is read by the records, so only the cost of the documents
+    is added to the extraction.
+
+    :param page_data: The data embedded in the listing page
+    :param link: The link of the listing
+    :param promoted: Whether the listing is promoted
+    :return: The dictionary with the raw property and agency
+        or None if the property is not valid
+    """
+    record = PropertyRecord.from_page(page_data, link, promoted)
+    values = record_fields(record)
+    values["localization"] = LocalizationDocument(**record_fields(record.localization))
+    if record.building is not None:
+        values["building"] = BuildingDocument(**record_fields(record.building))
+    property_ = PropertyDocument(**values)
+    try:
+        property_.validate()
+    except ValidationError:
+        return None
+    agency = None
+    if record.offered_by == OfferedBy.ESTATE_AGENCY:
+        agency = AgencyDocument(**record_fields(AgencyRecord.from_page(page_data)))
+    document = property_.to_mongo().to_dict()
+    document["content_hash"] = PropertyDocument.hash_content(document)
+    return {
+        "property": document,
+        "agency": agency.to_mongo().to_dict() if agency is not None else None,
+    }
+
+
+def measure(
+    pages: list[tuple[str, object]], extract: Callable, rounds: int
+) -> tuple[float, int]:
+    """
+    Extracts every page in the given number of rounds.
+
+    The CPU time of the process is measured, so the result is the throughput
+    of a single core regardless of the other load of the machine.
+
+    :param pages: The links and the contents or the decoded data of the pages
+    :param extract: The function extracting the listing from the link and the page
+    :param rounds: The number of the rounds over the pages
+    :return: The CPU time in seconds and the number of the extracted listings
+    """
+    extracted = 0
+    started_at = time.process_time()
+    for _ in range(rounds):
+        for link, content in pages:
+            if extract(link, content) is not None:
+                extracted += 1
+    return time.process_time() - started_at, extracted
+
+
+def raw_extraction(link: str, content: bytes) -> dict | None:
+    """
+    :param link: The link of the listing
+    :param content: The raw content of the listing page
+    :return: The extracted property and agency
+    """
+    page_data = extract_page_data(content)
+    if page_data is None:
+        return None
+    return extract_listing(page_data, link, False)
+
+
+def soup_extraction(link: str, content: bytes) -> dict | None:
+    """
+    :param link: The link of the listing
+    :param content: The raw content of the listing page
+    :return: The extracted property and agency
+    """
+    page_data = soup_page_data(content)
+    if page_data is None:
+        return None
+    return extract_listing(page_data, link, False)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Measure the listing pages extracted per second "
+        "by one CPU core over the pages recorded in the crawl archive."
+    )
+    parser.add_argument(
+        "archive",
+        nargs="?",
+        help="path of the crawl archive, defaults to the one in settings.json",
+    )
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        default=10,
+        help="number of the rounds over the recorded pages",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    archive = args.archive
+    if archive is None:
+        with open("settings.json", "r", encoding="utf-8") as f:
+            archive = json.load(f)["crawler"].get("archive", {}).get("path")
+    if not archive or not os.path.isfile(archive):
+        print(f"Crawl archive not found: {archive}", file=sys.stderr)
+        return 1
+    pages = listing_pages(archive)
+    if not pages:
+        print(f"No listing pages recorded in {archive}", file=sys.stderr)
+        return 1
+    print(f"{len(pages)} listing pages, {args.rounds} rounds")
+    extractions = {"raw JSON": raw_extraction}
+    if BeautifulSoup is not None:
+        extractions["BeautifulSoup"] = soup_extraction
+    for name, extract in extractions.items():
+        seconds, extracted = measure(pages, extract, args.rounds)
+        print(
+            f"{name}: {extracted / seconds if seconds else 0:.0f} pages/s per core, "
+            f"{seconds / (len(pages) * args.rounds) * 1000:.3f}ms per page"
+        )
+    decoded = [(link, extract_page_data(content)) for link, content in pages]
+    decoded = [(link, page_data) for link, page_data in decoded if page_data]
+    listings = {"records": extract_listing, "documents": document_listing}
+    for name, extract in listings.items():
+        seconds, extracted = measure(
+            decoded,
+            lambda link, page_data: extract(page_data, link, False),
+            args.rounds,
+        )
+        print(
+            f"listing from {name}: "
+            f"{seconds / (len(decoded) * args.rounds) * 1_000_000:.1f}us "
+            f"CPU per listing, {extracted} extracted"
+        )
+    return 0
+
+
+if "__main__" == __name__:
+    sys.exit(main())
@@ -1,3 +1,4 @@
+from common.constans import ArchiveMode  # noqa: F401
 from common.constans import AUCTION_TYPE_MAP  # noqa: F401
 from common.constans import AuctionType  # noqa: F401
 from common.constans import Constans  # noqa: F401
@@ -34,6 +34,12 @@ class MarketType(Enum):
     SECONDARY = "secondary"
 
 
+class ArchiveMode(Enum):
+    OFF = "off"
+    RECORD = "record"
+    REPLAY = "replay"
+
+
 class Constans:
     """
     A class that provides default values for the settings used by the application.
@@ -48,6 +54,54 @@ class Constans:
         Defaults to `None`.
         DEFAULT_PROPERTY_TYPE (str): The default type of property.
         DEFAULT_AUCTION_TYPE (str): The default type of auction.
+        DEFAULT_MAX_CONCURRENT_REQUESTS (int): The default limit of the requests
+        made at once to the website.
+        DEFAULT_QUEUE_SIZE (int): The default number of the listings waiting
+        for the extraction.
+        DEFAULT_INCREMENTAL (bool): Whether only the new or changed listings
+        are extracted by default.
+        DEFAULT_INDEX_PATH (str): The default path of the seen listings index.
+        DEFAULT_TRACK_CHANGES (bool): Whether the changes of the known listings
+        are recorded by default.
+        DEFAULT_WRITE_BATCH_SIZE (int): The default number of the properties
+        written to the database at once.
+        DEFAULT_WRITE_FLUSH_INTERVAL (float): The default maximum number of seconds
+        the properties wait to be written to the database.
+        DEFAULT_RATE_LIMIT (float): The default number of the requests per second
+        made to the website.
+        DEFAULT_RATE_BURST (int): The default number of the requests which may
+        exceed the rate limit at once.
+        DEFAULT_INITIAL_CONCURRENCY (int): The default number of the requests
+        made at once at the start of the crawl.
+        DEFAULT_MIN_CONCURRENCY (int): The default lowest number of the requests
+        made at once.
+        DEFAULT_LATENCY_THRESHOLD (float): The default latency in seconds
+        after which the number of the requests made at once is decreased.
+        DEFAULT_MAX_ATTEMPTS (int): The default number of the attempts made
+        to fetch the page before giving up.
+        DEFAULT_BACKOFF_BASE (float): The default delay in seconds
+        before the first retry.
+        DEFAULT_BACKOFF_MAX (float): The default highest delay in seconds
+        between the attempts.
+        DEFAULT_REQUEST_TIMEOUT (float): The default timeout of the request
+        in seconds.
+        DEFAULT_HTTP_CACHE (bool): Whether the fetched pages are cached
+        on the disk by default.
+        DEFAULT_HTTP_CACHE_PATH (str): The default path of the HTTP cache.
+        DEFAULT_HTTP_CACHE_MAX_SIZE (int): The default maximum size
+        of the HTTP cache in megabytes.
+        DEFAULT_ARCHIVE_MODE (ArchiveMode): Whether the responses are recorded
+        to or replayed from the archive by default.
+        DEFAULT_ARCHIVE_PATH (str): The default path of the crawl archive.
+        DEFAULT_MAX_PAGES (int): The default number of the search pages
+        served by the website for a single search.
+        DEFAULT_PARSE_WORKERS (int): The default number of the processes
+        extracting the listings, 0 extracts them in the fetching threads.
+        DEFAULT_CHECKPOINT (bool): Whether the state of the crawl is checkpointed
+        on the disk by default.
+        DEFAULT_CHECKPOINT_PATH (str): The default path of the crawl checkpoint.
+        DEFAULT_CHECKPOINT_MAX_RETRIES (int): The default number of the runs
+        retrying the listing which could not be fetched.
     """
 
     DEFAULT_URL = "https://www.otodom.pl"
@@ -58,6 +112,32 @@ class Constans:
     DEFAULT_DISTRICT = None
     DEFAULT_PROPERTY_TYPE = PropertyType.FLAT
     DEFAULT_AUCTION_TYPE = AuctionType.SALE
+    DEFAULT_MAX_CONCURRENT_REQUESTS = 100
+    DEFAULT_QUEUE_SIZE = 1000
+    DEFAULT_INCREMENTAL = False
+    DEFAULT_INDEX_PATH = "seen_index.bin"
+    DEFAULT_TRACK_CHANGES = False
+    DEFAULT_WRITE_BATCH_SIZE = 100
+    DEFAULT_WRITE_FLUSH_INTERVAL = 5.0
+    DEFAULT_RATE_LIMIT = 20.0
+    DEFAULT_RATE_BURST = 40
+    DEFAULT_INITIAL_CONCURRENCY = 10
+    DEFAULT_MIN_CONCURRENCY = 1
+    DEFAULT_LATENCY_THRESHOLD = 5.0
+    DEFAULT_MAX_ATTEMPTS = 3
+    DEFAULT_BACKOFF_BASE = 0.5
+    DEFAULT_BACKOFF_MAX = 30.0
+    DEFAULT_REQUEST_TIMEOUT = 10.0
+    DEFAULT_HTTP_CACHE = False
+    DEFAULT_HTTP_CACHE_PATH = "http_cache.sqlite"
+    DEFAULT_HTTP_CACHE_MAX_SIZE = 1024
+    DEFAULT_ARCHIVE_MODE = ArchiveMode.OFF
+    DEFAULT_ARCHIVE_PATH = "crawl_archive.tar.gz"
+    DEFAULT_MAX_PAGES = 100
+    DEFAULT_PARSE_WORKERS = 0
+    DEFAULT_CHECKPOINT = False
+    DEFAULT_CHECKPOINT_PATH = "crawl_checkpoint.sqlite"
+    DEFAULT_CHECKPOINT_MAX_RETRIES = 3
 
     CSV_KEYS = [
         "_id",
@@ -74,6 +154,7 @@ class Constans:
         "building_build_year",
         "building_floors",
         "building_type",
+        "construction_status",
         "created_at",
         "estate_agency",
         "extras",
@@ -2,7 +2,11 @@ def flatten_dict(y: dict):
     """
     Flattens a dictionary object to a single level.
 
-    >>> flatten_json({"a": {"b": 1, "c": {"d": 2}})
+    The exports flatten the rows with the models.schema.RowFlattener,
+    this function is kept for compatibility and as the baseline
+    of the flattening in benchmark_export.py.
+
+    >>> flatten_dict({"a": {"b": 1, "c": {"d": 2}}})
         {"a_b": 1, "a_c_d": 2}
     """
     out = {}
@@ -0,0 +1,248 @@
+import io
+import json
+import logging
+import tarfile
+import threading
+import time
+from hashlib import sha1
+
+from crawler.cache import cache_key
+from crawler.fetcher import DEFAULT_TIMEOUT
+from crawler.fetcher import Response
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+NOT_ARCHIVED = Response(url="", status=404, headers=CaseInsensitiveDict(), content=b"")
+
+
+def member_name(key: str) -> str:
+    """
+    :param key: The key of the response
+    :return: The name of the archive member holding the response
+    """
+    return sha1(key.encode()).hexdigest()
+
+
+class ArchiveRecorder:
+    """
+    Recorder of the fetched responses to the gzipped tarball.
+
+    Every response is stored as two members, the JSON with its key, URL,
+    status and headers, and the raw body, so the archive can be inspected
+    with the standard tools. The recorder is safe to be used from many threads.
+    """
+
+    def __init__(self, path: str):
+        """
+        Create the archive, overwriting the existing one.
+
+        :param path: The path of the archive
+        """
+        self.path = path
+        self.tar = tarfile.open(path, "w:gz")
+        self.lock = threading.Lock()
+        self.recorded = 0
+
+    def add_member(self, name: str, data: bytes) -> None:
+        """
+        Writes the member to the archive. Has to be called with the lock held.
+
+        :param name: The name of the member
+        :param data: The content of the member
+        """
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        self.tar.addfile(info, io.BytesIO(data))
+
+    def add(self, key: str, response: Response) -> None:
+        """
+        Records the response.
+
+        :param key: The key of the response
+        :param response: The fetched response
+        """
+        name = member_name(key)
+        meta = {
+            "key": key,
+            "url": response.url,
+            "status": response.status,
+            "headers": dict(response.headers),
+        }
+        with self.lock:
+            self.add_member(name + ".json", json.dumps(meta).encode())
+            self.add_member(name + ".body", response.content)
+            self.recorded += 1
+
+    def close(self) -> None:
+        """
+        Finish the archive.
+        """
+        with self.lock:
+            self.tar.close()
+        logger.info(f"Recorded {self.recorded} responses to {self.path}")
+
+
+class ArchiveReplay:
+    """
+    The responses of the recorded crawl loaded to the memory.
+
+    When the same URL was recorded many times, the last response is kept.
+    """
+
+    def __init__(self, path: str):
+        """
+        Load the archive.
+
+        :param path: The path of the archive
+        """
+        self.path = path
+        self.responses: dict[str, Response] = {}
+        self.missing = 0
+        metas = {}
+        bodies = {}
+        with tarfile.open(path, "r:gz") as tar:
+            for member in tar:
+                name, _, kind = member.name.rpartition(".")
+                data = tar.extractfile(member).read()
+                if kind == "json":
+                    metas[name] = json.loads(data)
+                else:
+                    bodies[name] = data
+        for name, meta in metas.items():
+            self.responses[meta["key"]] = Response(
+                url=meta["url"],
+                status=meta["status"],
+                headers=CaseInsensitiveDict(meta["headers"]),
+                content=bodies.get(name, b""),
+            )
+        logger.info(f"Loaded {len(self.responses)} responses from {path}")
+
+    def get(self, key: str) -> Response:
+        """
+        :param key: The key of the response
+        :return: The recorded response or the empty 404 if it was not recorded
+        """
+        response = self.responses.get(key)
+        if response is None:
+            self.missing += 1
+            logger.warning(f"Response of {key} was not recorded")
+            return NOT_ARCHIVED._replace(url=key)
+        return response
+
+
+class RecordingFetcher:
+    """
+    Fetcher recording every response to the archive.
+    """
+
+    def __init__(self, fetcher, recorder: ArchiveRecorder):
+        """
+        :param fetcher: The fetcher making the requests
+        :param recorder: The recorder of the responses
+        """
+        self.fetcher = fetcher
+        self.recorder = recorder
+
+    def get(
+        self, url: str, params: dict = None, timeout: float = DEFAULT_TIMEOUT
+    ) -> Response:
+        """
+        Fetch the given URL and record the response.
+
+        :param url: The URL to fetch
+        :param params: The query parameters of the request
+        :param timeout: The timeout of the request in seconds
+        :return: The fetched response
+        """
+        response = self.fetcher.get(url, params=params, timeout=timeout)
+        self.recorder.add(cache_key(url, params), response)
+        return response
+
+    def close(self) -> None:
+        """
+        Close the pooled connections.
+        """
+        self.fetcher.close()
+
+
+class AsyncRecordingFetcher:
+    """
+    Asynchronous version of the RecordingFetcher.
+    """
+
+    def __init__(self, fetcher, recorder: ArchiveRecorder):
+        """
+        :param fetcher: The fetcher making the requests
+        :param recorder: The recorder of the responses
+        """
+        self.fetcher = fetcher
+        self.recorder = recorder
+
+    async def get(
+        self, url: str, params: dict = None, timeout: float = DEFAULT_TIMEOUT
+    ) -> Response:
+        """
+        Fetch the given URL and record the response.
+
+        :param url: The URL to fetch
+        :param params: The query parameters of the request
+        :param timeout: The timeout of the request in seconds
+        :return: The fetched response
+        """
+        response = await self.fetcher.get(url, params=params, timeout=timeout)
+        self.recorder.add(cache_key(url, params), response)
+        return response
+
+
+class ReplayFetcher:
+    """
+    Fetcher serving the recorded responses instead of making the requests,
+    so the crawl can be repeated offline and deterministically.
+    """
+
+    def __init__(self, replay: ArchiveReplay):
+        """
+        :param replay: The recorded responses
+        """
+        self.replay = replay
+
+    def get(
+        self, url: str, params: dict = None, timeout: float = DEFAULT_TIMEOUT
+    ) -> Response:
+        """
+        :param url: The URL to fetch
+        :param params: The query parameters of the request
+        :param timeout: Ignored, there is no request made
+        :return: The recorded response
+        """
+        return self.replay.get(cache_key(url, params))
+
+    def close(self) -> None:
+        """
+        Nothing to close, kept for the compatibility with the Fetcher.
+        """
+
+
+class AsyncReplayFetcher:
+    """
+    Asynchronous version of the ReplayFetcher.
+    """
+
+    def __init__(self, replay: ArchiveReplay):
+        """
+        :param replay: The recorded responses
+        """
+        self.replay = replay
+
+    async def get(
+        self, url: str, params: dict = None, timeout: float = DEFAULT_TIMEOUT
+    ) -> Response:
+        """
+        :param url: The URL to fetch
+        :param params: The query parameters of the request
+        :param timeout: Ignored, there is no request made
+        :return: The recorded response
+        """
+        return self.replay.get(cache_key(url, params))
@@ -0,0 +1,330 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from typing import NamedTuple
+from urllib.parse import urlencode
+
+from crawler.fetcher import AsyncFetcher
+from crawler.fetcher import DEFAULT_TIMEOUT
+from crawler.fetcher import Fetcher
+from crawler.fetcher import Response
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+CACHED_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+EVICTION_RATIO = 0.9
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    content_type TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+"""
+
+
+def cache_key(url: str, params: dict | None = None) -> str:
+    """
+    :param url: The URL of the request
+    :param params: The query parameters of the request
+    :return: The key of the response in the cache
+    """
+    if not params:
+        return url
+    return url + "?" + urlencode(sorted(params.items()))
+
+
+class CachedResponse(NamedTuple):
+    """
+    Response stored in the cache with its validators.
+    """
+
+    url: str
+    content_type: str | None
+    etag: str | None
+    last_modified: str | None
+    body: bytes
+
+    def conditional_headers(self) -> dict:
+        """
+        :return: The headers making the request conditional
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def to_response(self) -> Response:
+        """
+        :return: The stored response as if it was fetched again
+        """
+        headers = CaseInsensitiveDict(
+            {
+                name: value
+                for name, value in zip(
+                    CACHED_HEADERS, (self.content_type, self.etag, self.last_modified)
+                )
+                if value is not None
+            }
+        )
+        return Response(url=self.url, status=200, headers=headers, content=self.body)
+
+
+class HttpCache:
+    """
+    On-disk cache of the fetched pages.
+
+    The bodies are stored compressed in the SQLite database together
+    with their ETag and Last-Modified, so the next crawl can make conditional
+    requests and read the unchanged pages from the disk. When the size
+    of the stored bodies exceeds the limit, the least recently used
+    responses are evicted.
+    """
+
+    def __init__(self, path: str, max_size: int):
+        """
+        Open the cache, creating the database if it does not exist.
+
+        :param path: The path of the database file
+        :param max_size: The maximum size of the compressed bodies in bytes
+        """
+        self.path = path
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        (self.size,) = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def get(self, key: str) -> CachedResponse | None:
+        """
+        Reads the response from the cache and marks it as recently used.
+
+        :param key: The key of the response
+        :return: The stored response or None if it is not cached
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT url, content_type, etag, last_modified, body "
+                "FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self.connection.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                (time.time(), key),
+            )
+            self.connection.commit()
+        url, content_type, etag, last_modified, body = row
+        return CachedResponse(
+            url, content_type, etag, last_modified, zlib.decompress(body)
+        )
+
+    def put(self, key: str, response: Response) -> None:
+        """
+        Stores the fetched response, evicting the least recently used ones
+        if the cache exceeds its size.
+
+        :param key: The key of the response
+        :param response: The fetched response
+        """
+        body = zlib.compress(response.content)
+        with self.lock:
+            previous = self.connection.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if previous is not None:
+                self.size -= previous[0]
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    response.url,
+                    response.headers.get("Content-Type"),
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                    body,
+                    len(body),
+                    time.time(),
+                ),
+            )
+            self.size += len(body)
+            if self.size > self.max_size:
+                self.evict(int(self.max_size * EVICTION_RATIO))
+            self.connection.commit()
+
+    def evict(self, target_size: int) -> None:
+        """
+        Removes the least recently used responses until the cache
+        is not larger than the target size. Has to be called with the lock held.
+
+        :param target_size: The size of the cache after the eviction in bytes
+        """
+        rows = self.connection.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        )
+        evicted = []
+        for key, size in rows:
+            if self.size <= target_size:
+                break
+            evicted.append((key,))
+            self.size -= size
+        self.connection.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        self.evicted += len(evicted)
+        logger.debug(f"Evicted {len(evicted)} responses from the cache")
+
+    def discard(self, url: str, params: dict | None = None) -> None:
+        """
+        Removes the response which was rejected by the crawler,
+        so the next request for it is not conditional.
+
+        :param url: The URL of the request
+        :param params: The query parameters of the request
+        """
+        key = cache_key(url, params)
+        with self.lock:
+            previous = self.connection.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if previous is None:
+                return
+            self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.connection.commit()
+            self.size -= previous[0]
+
+    def resolve(
+        self, key: str, cached: CachedResponse | None, response: Response
+    ) -> Response:
+        """
+        Resolves the response of the conditional request.
+
+        The not modified response is replaced with the cached one,
+        the fetched page is stored in the cache. The pages rejected
+        by the crawler are removed from the cache with the discard.
+
+        :param key: The key of the response
+        :param cached: The response found in the cache before the request
+        :param response: The fetched response
+        :return: The response passed to the crawler
+        """
+        if cached is not None and response.status == 304:
+            with self.lock:
+                self.hits += 1
+            return cached.to_response()
+        with self.lock:
+            self.misses += 1
+        if response.status == 200:
+            self.put(key, response)
+        return response
+
+    def close(self) -> None:
+        """
+        Close the database.
+        """
+        with self.lock:
+            self.connection.close()
+
+    def stats(self) -> str:
+        """
+        :return: The summary of the cache hits, misses and evictions
+        """
+        return (
+            f"HTTP cache: {self.hits} hits, {self.misses} misses, "
+            f"{self.evicted} evicted, {self.size} bytes stored"
+        )
+
+
+class CachingFetcher:
+    """
+    Fetcher making the conditional requests for the pages stored in the cache.
+    """
+
+    def __init__(self, fetcher: Fetcher, cache: HttpCache):
+        """
+        :param fetcher: The fetcher making the requests
+        :param cache: The cache of the responses
+        """
+        self.fetcher = fetcher
+        self.cache = cache
+
+    def get(
+        self, url: str, params: dict = None, timeout: float = DEFAULT_TIMEOUT
+    ) -> Response:
+        """
+        Fetch the given URL, reading it from the cache if it was not modified.
+
+        :param url: The URL to fetch
+        :param params: The query parameters of the request
+        :param timeout: The timeout of the request in seconds
+        :return: The fetched or cached response
+        """
+        key = cache_key(url, params)
+        cached = self.cache.get(key)
+        response = self.fetcher.get(
+            url,
+            params=params,
+            timeout=timeout,
+            headers=cached.conditional_headers() if cached is not None else None,
+        )
+        return self.cache.resolve(key, cached, response)
+
+    def close(self) -> None:
+        """
+        Close the pooled connections.
+        """
+        self.fetcher.close()
+
+
+class AsyncCachingFetcher:
+    """
+    Asynchronous version of the CachingFetcher.
+
+    The cache is read and written in the default executor,
+    so the event loop is not blocked by the disk.
+    """
+
+    def __init__(self, fetcher: AsyncFetcher, cache: HttpCache):
+        """
+        :param fetcher: The fetcher making the requests
+        :param cache: The cache of the responses
+        """
+        self.fetcher = fetcher
+        self.cache = cache
+
+    async def get(
+        self, url: str, params: dict = None, timeout: float = DEFAULT_TIMEOUT
+    ) -> Response:
+        """
+        Fetch the given URL, reading it from the cache if it was not modified.
+
+        :param url: The URL to fetch
+        :param params: The query parameters of the request
+        :param timeout: The timeout of the request in seconds
+        :return: The fetched or cached response
+        """
+        key = cache_key(url, params)
+        cached = await asyncio.to_thread(self.cache.get, key)
+        response = await self.fetcher.get(
+            url,
+            params=params,
+            timeout=timeout,
+            headers=cached.conditional_headers() if cached is not None else None,
+        )
+        return await asyncio.to_thread(self.cache.resolve, key, cached, response)
@@ -0,0 +1,359 @@
+import json
+import logging
+import sqlite3
+import threading
+from enum import Enum
+
+from crawler.listing import ListingLink
+from settings.s_types import AuctionType
+from settings.s_types import PropertyType
+from settings.s_types import SearchSpec
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS shards (
+    search TEXT PRIMARY KEY,
+    pages_count INTEGER
+);
+CREATE TABLE IF NOT EXISTS pages (
+    search TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    PRIMARY KEY (search, page)
+);
+CREATE TABLE IF NOT EXISTS links (
+    otodom_id INTEGER PRIMARY KEY,
+    link TEXT NOT NULL,
+    promoted INTEGER NOT NULL,
+    price INTEGER,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS links_state ON links (state);
+"""
+
+
+class LinkState(Enum):
+    """
+    State of the listing link in the crawl.
+    """
+
+    DISCOVERED = "discovered"
+    FETCHED = "fetched"
+    FAILED = "failed"
+    SAVED = "saved"
+
+
+def search_key(search: SearchSpec) -> str:
+    """
+    :param search: The search
+    :return: The key of the search in the checkpoint
+    """
+    return json.dumps(
+        [
+            search.price_min,
+            search.price_max,
+            search.province,
+            search.city,
+            search.district,
+            search.property_type.value,
+            search.auction_type.value,
+        ]
+    )
+
+
+def search_from_key(key: str) -> SearchSpec:
+    """
+    :param key: The key of the search in the checkpoint
+    :return: The search
+    """
+    (
+        price_min,
+        price_max,
+        province,
+        city,
+        district,
+        property_type,
+        auction_type,
+    ) = json.loads(key)
+    return SearchSpec(
+        price_min=price_min,
+        price_max=price_max,
+        province=province,
+        city=city,
+        district=district,
+        property_type=PropertyType(property_type),
+        auction_type=AuctionType(auction_type),
+    )
+
+
+class Checkpoint:
+    """
+    Persistent state of the crawl stored in the SQLite database.
+
+    The checkpoint keeps the sharded searches with their pages counts,
+    which are empty for the searches which could not be counted yet,
+    the search pages already crawled and the state of every listing link
+    found at them, so the interrupted crawl is resumed without counting
+    the pages and crawling the search pages again. The links which could not
+    be fetched are kept in the retry queue and retried by the next runs
+    until they run out of the attempts.
+
+    Once every page is crawled and every link is saved, the checkpoint
+    is reset, only the retry queue is kept.
+    """
+
+    def __init__(self, path: str, max_retries: int):
+        """
+        Open the checkpoint, creating the database if it does not exist.
+
+        :param path: The path of the database file
+        :param max_retries: The number of the runs retrying the failed link
+        """
+        self.path = path
+        self.max_retries = max_retries
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+
+    def load_shards(
+        self, searches: list[SearchSpec]
+    ) -> list[tuple[SearchSpec, int | None]]:
+        """
+        Loads the shards of the interrupted crawl.
+
+        The checkpoint of the crawl with different searches is discarded.
+
+        :param searches: The searches from the settings
+        :return: The searches to crawl with their pages counts,
+            None if they could not be counted, empty if there is no crawl to resume
+        """
+        fingerprint = json.dumps([search_key(search) for search in searches])
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT value FROM meta WHERE key = 'searches'"
+            ).fetchone()
+            if row is not None and row[0] != fingerprint:
+                logger.warning("The searches have changed, discarding the checkpoint")
+                self.clear()
+            self.connection.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('searches', ?)", (fingerprint,)
+            )
+            self.connection.commit()
+            rows = self.connection.execute(
+                "SELECT search, pages_count FROM shards"
+            ).fetchall()
+        return [(search_from_key(key), pages_count) for key, pages_count in rows]
+
+    def save_shards(self, shards: list[tuple[SearchSpec, int | None]]) -> None:
+        """
+        Replaces the shards of the crawl.
+
+        :param shards: The searches to crawl with their pages counts,
+            None if they could not be counted
+        """
+        with self.lock:
+            self.connection.execute("DELETE FROM shards")
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO shards VALUES (?, ?)",
+                [(search_key(search), pages_count) for search, pages_count in shards],
+            )
+            self.connection.commit()
+
+    def pages_done(self) -> set[tuple[str, int]]:
+        """
+        :return: The keys of the searches with the numbers of their crawled pages
+        """
+        with self.lock:
+            return set(self.connection.execute("SELECT search, page FROM pages"))
+
+    def add_page(
+        self, search: SearchSpec, page: int, listing_links: list[ListingLink]
+    ) -> None:
+        """
+        Marks the search page as crawled and adds the new listings found at it.
+
+        :param search: The crawled search
+        :param page: The number of the crawled page
+        :param listing_links: The new listings found at the page
+        """
+        with self.lock:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO links (otodom_id, link, promoted, price, state) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        listing_link.otodom_id,
+                        listing_link.link,
+                        listing_link.promoted,
+                        listing_link.price,
+                        LinkState.DISCOVERED.value,
+                    )
+                    for listing_link in listing_links
+                ],
+            )
+            self.connection.execute(
+                "INSERT OR IGNORE INTO pages VALUES (?, ?)", (search_key(search), page)
+            )
+            self.connection.commit()
+
+    def mark_fetched(self, listing_link: ListingLink) -> None:
+        """
+        :param listing_link: The listing fetched and extracted
+        """
+        with self.lock:
+            self.connection.execute(
+                "UPDATE links SET state = ?, error = NULL WHERE otodom_id = ?",
+                (LinkState.FETCHED.value, listing_link.otodom_id),
+            )
+            self.connection.commit()
+
+    def mark_failed(self, listing_link: ListingLink, error: str) -> None:
+        """
+        Moves the listing to the retry queue.
+
+        :param listing_link: The listing which could not be fetched or extracted
+        :param error: The reason of the failure
+        """
+        with self.lock:
+            self.connection.execute(
+                "UPDATE links SET state = ?, attempts = attempts + 1, error = ? "
+                "WHERE otodom_id = ?",
+                (LinkState.FAILED.value, error, listing_link.otodom_id),
+            )
+            self.connection.commit()
+
+    def mark_rejected(self, errors: dict[int, str]) -> None:
+        """
+        Moves the listings which could not be written to the retry queue.
+
+        :param errors: The reasons of the failures keyed by the otodom ids
+        """
+        if not errors:
+            return
+        with self.lock:
+            self.connection.executemany(
+                "UPDATE links SET state = ?, attempts = attempts + 1, error = ? "
+                "WHERE otodom_id = ?",
+                [
+                    (LinkState.FAILED.value, error, otodom_id)
+                    for otodom_id, error in errors.items()
+                ],
+            )
+            self.connection.commit()
+
+    def mark_saved(self, otodom_ids: list[int]) -> None:
+        """
+        :param otodom_ids: The otodom ids of the listings written to the database
+        """
+        with self.lock:
+            self.connection.executemany(
+                "UPDATE links SET state = ?, error = NULL WHERE otodom_id = ?",
+                [(LinkState.SAVED.value, otodom_id) for otodom_id in otodom_ids],
+            )
+            self.connection.commit()
+
+    def pending_links(self) -> list[ListingLink]:
+        """
+        Reads the listings which were not saved by the previous runs.
+
+        The failed listings which ran out of the retries are dropped.
+
+        :return: The listings to extract, the retry queue first
+        """
+        with self.lock:
+            dropped = self.connection.execute(
+                "DELETE FROM links WHERE state = ? AND attempts >= ?",
+                (LinkState.FAILED.value, self.max_retries),
+            ).rowcount
+            self.connection.commit()
+            rows = self.connection.execute(
+                "SELECT otodom_id, link, promoted, price FROM links "
+                "WHERE state != ? ORDER BY state = ? DESC",
+                (LinkState.SAVED.value, LinkState.FAILED.value),
+            ).fetchall()
+        if dropped:
+            logger.warning(f"Gave up {dropped} listings after {self.max_retries} runs")
+        return [
+            ListingLink(
+                otodom_id=otodom_id, link=link, promoted=bool(promoted), price=price
+            )
+            for otodom_id, link, promoted, price in rows
+        ]
+
+    def counts(self) -> dict[str, int]:
+        """
+        :return: The number of the crawled pages, of the searches
+            which could not be counted and of the links in every state
+        """
+        with self.lock:
+            (pages,) = self.connection.execute("SELECT COUNT(*) FROM pages").fetchone()
+            (total_pages, uncounted) = self.connection.execute(
+                "SELECT COALESCE(SUM(pages_count), 0), "
+                "COUNT(*) - COUNT(pages_count) FROM shards"
+            ).fetchone()
+            states = dict(
+                self.connection.execute(
+                    "SELECT state, COUNT(*) FROM links GROUP BY state"
+                )
+            )
+        counts = {"pages": pages, "total_pages": total_pages, "uncounted": uncounted}
+        for state in LinkState:
+            counts[state.value] = states.get(state.value, 0)
+        return counts
+
+    def is_complete(self) -> bool:
+        """
+        :return: True if every search was counted, every page was crawled
+            and every link was saved or moved to the retry queue, False otherwise
+        """
+        counts = self.counts()
+        return (
+            counts["uncounted"] == 0
+            and counts["pages"] >= counts["total_pages"]
+            and counts[LinkState.DISCOVERED.value] == 0
+            and counts[LinkState.FETCHED.value] == 0
+        )
+
+    def clear(self) -> None:
+        """
+        Removes the state of the crawl except the retry queue.
+        Has to be called with the lock held.
+        """
+        self.connection.execute("DELETE FROM shards")
+        self.connection.execute("DELETE FROM pages")
+        self.connection.execute(
+            "DELETE FROM links WHERE state != ?", (LinkState.FAILED.value,)
+        )
+
+    def reset(self) -> None:
+        """
+        Finishes the crawl, so the next run starts a new one.
+        """
+        with self.lock:
+            self.clear()
+            self.connection.commit()
+
+    def close(self) -> None:
+        """
+        Close the database.
+        """
+        with self.lock:
+            self.connection.close()
+
+    def stats(self) -> str:
+        """
+        :return: The summary of the crawled pages and the links
+        """
+        counts = self.counts()
+        return (
+            f"Checkpoint: {counts['pages']} of {counts['total_pages']} pages, "
+            f"{counts['uncounted']} uncounted searches, "
+            f"{counts['discovered']} discovered, {counts['fetched']} fetched, "
+            f"{counts['failed']} failed, {counts['saved']} saved links"
+        )
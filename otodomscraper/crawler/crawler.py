@@ -1,27 +1,56 @@
+import asyncio
 import concurrent.futures
 import csv
 import json
 import logging
+import multiprocessing
+import queue
+import threading
+import time
+from functools import partial
 
-import requests
-from bs4 import BeautifulSoup
-from bs4 import ResultSet
+from bson import DBRef
+from common import ArchiveMode
 from common import Constans
-from common import OfferedBy
+from crawler.archive import ArchiveRecorder
+from crawler.archive import ArchiveReplay
+from crawler.archive import AsyncRecordingFetcher
+from crawler.archive import AsyncReplayFetcher
+from crawler.archive import RecordingFetcher
+from crawler.archive import ReplayFetcher
+from crawler.cache import AsyncCachingFetcher
+from crawler.cache import CachingFetcher
+from crawler.cache import HttpCache
+from crawler.checkpoint import Checkpoint
+from crawler.checkpoint import search_key
 from crawler.exceptions import DataExtractionError
+from crawler.exceptions import FetchError
+from crawler.extractor import extract_page_data
+from crawler.extractor import extract_page_json
+from crawler.extractor import extract_pages_count
+from crawler.extractor import extract_search_results
+from crawler.fetcher import AsyncFetcher
+from crawler.fetcher import Fetcher
+from crawler.index import content_hash
+from crawler.index import SeenIndex
 from crawler.listing import Listing
-from models import AgencyDocument
-from models import PropertyDocument
-from services import AgencyService
+from crawler.listing import ListingLink
+from crawler.parsing import extract_listing
+from crawler.parsing import parse_listing
+from crawler.retry import RetryPolicy
+from crawler.throttle import Throttle
+from crawler.timings import PipelineTimings
+from services import AgencyCache
+from services import BulkWriter
 from services import connect_to_database
 from services import PropertyService
+from services.writer import BulkResult
 from settings import Settings
+from settings.s_types import SearchSpec
 
 logger = logging.getLogger(__name__)
 
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"  # noqa: E501
-}
+COUNT_ROUNDS = 2
 
 
 class Crawler:
@@ -37,82 +66,610 @@ class Crawler:
         Initialize the crawler.
         """
         self.settings: Settings = Settings()
-        self.params: dict = self.generate_params()
         self.listings: list[Listing] = []
+        self.scheduled_ids: set[int] = set()
+        self.index: SeenIndex | None = None
+        self.writer: BulkWriter | None = None
+        self.agency_cache = AgencyCache()
+        if self.settings.incremental:
+            self.index = SeenIndex(self.settings.index_path)
+        self.lock = threading.Lock()
+        self.throttle = Throttle(
+            rate=self.settings.rate_limit,
+            burst=self.settings.rate_burst,
+            initial_concurrency=self.settings.initial_concurrency,
+            min_concurrency=self.settings.min_concurrency,
+            max_concurrency=self.settings.max_concurrent_requests,
+            latency_threshold=self.settings.latency_threshold,
+        )
+        self.retry = RetryPolicy(
+            max_attempts=self.settings.max_attempts,
+            backoff_base=self.settings.backoff_base,
+            backoff_max=self.settings.backoff_max,
+            timeout=self.settings.request_timeout,
+        )
+        self.fetcher = Fetcher(
+            max_connections=self.settings.max_concurrent_requests,
+            throttle=self.throttle,
+        )
+        self.timings = PipelineTimings()
+        self.parse_page = self.timings.timed("parse", extract_page_data)
+        self.find_page_json = self.timings.timed("parse", extract_page_json)
+        self.extract_listing = self.timings.timed("extract", extract_listing)
+        self.parse_pool: concurrent.futures.ProcessPoolExecutor | None = None
+        self.checkpoint: Checkpoint | None = None
+        if self.settings.checkpoint:
+            self.checkpoint = Checkpoint(
+                self.settings.checkpoint_path,
+                max_retries=self.settings.checkpoint_max_retries,
+            )
+        self.http_cache = None
+        self.recorder = None
+        self.replay = None
+        if self.settings.archive_mode == ArchiveMode.REPLAY:
+            self.replay = ArchiveReplay(self.settings.archive_path)
+            self.fetcher = ReplayFetcher(self.replay)
+        else:
+            if self.settings.http_cache:
+                self.http_cache = HttpCache(
+                    self.settings.http_cache_path,
+                    max_size=self.settings.http_cache_max_size * 1024 * 1024,
+                )
+                self.fetcher = CachingFetcher(self.fetcher, self.http_cache)
+                self.retry.on_rejected = self.http_cache.discard
+            if self.settings.archive_mode == ArchiveMode.RECORD:
+                self.recorder = ArchiveRecorder(self.settings.archive_path)
+                self.fetcher = RecordingFetcher(self.fetcher, self.recorder)
         connect_to_database(host=self.settings.mongo_db_host)
 
-    def generate_search_url(self) -> str:
+    def generate_search_url(self, search: SearchSpec) -> str:
         """
         Generate the URL to crawl.
 
+        :param search: The search to crawl
         :return: The URL to crawl
         """
         url = self.settings.base_url
 
         url += "/pl/wyniki/"
-        url += self.settings.auction_type.value + "/"
-        url += self.settings.property_type.value + "/"
-        url += self.settings.province + "/"
-        url += self.settings.city + "/"
-        if self.settings.district is not None:
-            url += self.settings.city + "/"
-            url += self.settings.city + "/"
-            url += self.settings.district + "/"
+        url += search.auction_type.value + "/"
+        url += search.property_type.value + "/"
+        url += search.province + "/"
+        url += search.city + "/"
+        if search.district is not None:
+            url += search.city + "/"
+            url += search.city + "/"
+            url += search.district + "/"
 
         return url
 
-    def generate_params(self) -> dict:
+    @staticmethod
+    def generate_params(search: SearchSpec) -> dict:
         """
         Generate the parameters for the URL.
 
+        :param search: The search to crawl
         :return: The parameters for the URL
         """
         return {
-            "priceMin": self.settings.price_min,
-            "priceMax": self.settings.price_max,
+            "priceMin": search.price_min,
+            "priceMax": search.price_max,
         }
 
-    def count_pages(self) -> int:
+    def count_pages(self, search: SearchSpec) -> int | None:
         """
         Count the number of pages to crawl with given parameters.
 
+        :param search: The search to crawl
+        :return: The number of pages to crawl
+            or None if the search page could not be fetched
+        """
+        logger.info(f"Counting pages to crawl for {search}")
+        try:
+            pages = self.retry.get(
+                self.fetcher,
+                url=self.generate_search_url(search),
+                params=self.generate_params(search),
+                parse=self.extract_pages_count,
+            )
+        except FetchError as e:
+            logger.warning(f"Failed to count pages for {search}: {e}")
+            return None
+        logger.info(f"Found {pages} pages to crawl for {search}")
+        return pages
+
+    async def count_pages_async(
+        self, fetcher: AsyncFetcher, search: SearchSpec
+    ) -> int | None:
+        """
+        Asynchronous version of the count_pages.
+
+        :param fetcher: The fetcher used to make the requests
+        :param search: The search to crawl
         :return: The number of pages to crawl
+            or None if the search page could not be fetched
         """
-        max_retries = 3
-        while max_retries > 0:
-            logger.info("Counting pages to crawl, try: " + str(4 - max_retries) + "/3")
-            response = requests.get(
-                url=self.generate_search_url(), params=self.params, headers=HEADERS
+        logger.info(f"Counting pages to crawl for {search}")
+        try:
+            pages = await self.retry.get_async(
+                fetcher,
+                url=self.generate_search_url(search),
+                params=self.generate_params(search),
+                parse=self.extract_pages_count,
             )
-            soup = BeautifulSoup(response.content, "html.parser")
-            pages_element = soup.select("button[aria-current][data-cy]")
-            if len(pages_element) == 0:
-                max_retries -= 1
+        except FetchError as e:
+            logger.warning(f"Failed to count pages for {search}: {e}")
+            return None
+        logger.info(f"Found {pages} pages to crawl for {search}")
+        return pages
+
+    def split_oversized(
+        self,
+        searches: list[SearchSpec],
+        pages_counts: list[int | None],
+        shards: list[tuple[SearchSpec, int | None]],
+        failures: dict[SearchSpec, int],
+    ) -> list[SearchSpec]:
+        """
+        Split the searches with more pages than the website serves.
+
+        The searches which fit in the max_pages are added to the shards,
+        the other ones are split in halves by the price. The search which
+        cannot be split anymore is crawled up to the max_pages.
+
+        The search whose pages could not be counted is counted again
+        with the next searches. After COUNT_ROUNDS failures it is added
+        to the shards without the pages count, so it is not crawled,
+        but it is counted again when the crawl is resumed from the checkpoint.
+
+        :param searches: The counted searches
+        :param pages_counts: The number of the pages of every search
+            or None if they could not be counted
+        :param shards: The searches ready to be crawled with their pages counts
+        :param failures: The number of the failed counts of the searches
+        :return: The halves of the oversized searches and the searches
+            which failed to be counted, which have to be counted
+        """
+        halves = []
+        for search, pages_count in zip(searches, pages_counts):
+            if pages_count is None:
+                failures[search] = failures.get(search, 0) + 1
+                if failures[search] < COUNT_ROUNDS:
+                    halves.append(search)
+                else:
+                    logger.error(
+                        f"Failed to count pages for {search}, "
+                        f"it is left for the next run"
+                    )
+                    shards.append((search, None))
                 continue
-            pages = pages_element[-1].text
-            logger.info(f"Found {pages} pages to crawl")
-            return int(pages)
-        logger.warning("No listings found with given parameters. Exiting...")
-        exit(1)
+            if pages_count <= self.settings.max_pages:
+                shards.append((search, pages_count))
+                continue
+            split = search.split()
+            if split is None:
+                logger.warning(
+                    f"Search {search} cannot be split anymore, "
+                    f"only {self.settings.max_pages} of {pages_count} pages are crawled"
+                )
+                shards.append((search, self.settings.max_pages))
+                continue
+            logger.info(f"Splitting {search} with {pages_count} pages")
+            halves.extend(split)
+        return halves
+
+    def shard_searches(
+        self, searches: list[SearchSpec]
+    ) -> list[tuple[SearchSpec, int | None]]:
+        """
+        Count the pages of the searches, splitting the oversized ones
+        by the price until every part fits in the pages served by the website.
+
+        The searches of every level of the splitting are counted in parallel.
+
+        :param searches: The searches to count
+        :return: The searches to crawl with their pages counts,
+            None if they could not be counted
+        """
+        shards = []
+        failures = {}
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.settings.max_concurrent_requests
+        ) as executor:
+            while searches:
+                pages_counts = list(executor.map(self.count_pages, searches))
+                searches = self.split_oversized(
+                    searches, pages_counts, shards, failures
+                )
+        return shards
+
+    async def shard_searches_async(
+        self, fetcher: AsyncFetcher, searches: list[SearchSpec]
+    ) -> list[tuple[SearchSpec, int | None]]:
+        """
+        Asynchronous version of the shard_searches.
+
+        :param fetcher: The fetcher used to make the requests
+        :param searches: The searches to count
+        :return: The searches to crawl with their pages counts,
+            None if they could not be counted
+        """
+        shards = []
+        failures = {}
+        while searches:
+            pages_counts = await asyncio.gather(
+                *(self.count_pages_async(fetcher, search) for search in searches)
+            )
+            searches = self.split_oversized(searches, pages_counts, shards, failures)
+        return shards
+
+    def searches_to_count(
+        self, shards: list[tuple[SearchSpec, int | None]]
+    ) -> list[SearchSpec]:
+        """
+        :param shards: The shards resumed from the checkpoint
+        :return: All the searches for the new crawl, only the searches
+            whose pages could not be counted for the resumed one
+        """
+        if not shards:
+            return self.settings.searches
+        return [search for search, pages_count in shards if pages_count is None]
+
+    @staticmethod
+    def counted_shards(
+        shards: list[tuple[SearchSpec, int | None]]
+    ) -> list[tuple[SearchSpec, int]]:
+        """
+        :param shards: The searches with their pages counts
+        :return: The searches whose pages were counted
+        """
+        return [shard for shard in shards if shard[1] is not None]
+
+    @staticmethod
+    def schedule_pages(
+        shards: list[tuple[SearchSpec, int | None]],
+    ) -> tuple[list[SearchSpec], list[int]]:
+        """
+        Schedule the search pages of all the searches.
+
+        The pages are interleaved, the first pages of every search go first,
+        then the second ones and so on, so the large searches
+        do not starve the small ones.
+
+        :param shards: The searches with their pages counts,
+            the searches which could not be counted are skipped
+        :return: The searches and the page numbers in the order of crawling
+        """
+        shards = Crawler.counted_shards(shards)
+        searches = []
+        pages = []
+        max_pages_count = max((pages_count for _, pages_count in shards), default=0)
+        for page in range(1, max_pages_count + 1):
+            for search, pages_count in shards:
+                if page <= pages_count:
+                    searches.append(search)
+                    pages.append(page)
+        if not pages:
+            logger.warning("No listings found with given parameters")
+        logger.info(f"Found {len(pages)} pages to crawl in {len(shards)} searches")
+        return searches, pages
+
+    def resume_shards(self) -> list[tuple[SearchSpec, int | None]]:
+        """
+        Load the shards of the interrupted crawl from the checkpoint.
+
+        :return: The searches to crawl with their pages counts,
+            None if they could not be counted, empty if there is no crawl to resume
+        """
+        if self.checkpoint is None:
+            return []
+        shards = self.checkpoint.load_shards(self.settings.searches)
+        if shards:
+            logger.info(f"Resuming the crawl. {self.checkpoint.stats()}")
+        return shards
+
+    def save_shards(self, shards: list[tuple[SearchSpec, int | None]]) -> None:
+        """
+        Save the shards of the crawl to the checkpoint.
+
+        :param shards: The searches to crawl with their pages counts,
+            None if they could not be counted
+        """
+        if self.checkpoint is not None:
+            self.checkpoint.save_shards(shards)
+
+    def skip_crawled_pages(
+        self, searches: list[SearchSpec], pages: list[int]
+    ) -> tuple[list[SearchSpec], list[int]]:
+        """
+        Remove the search pages crawled before the crawl was interrupted.
+
+        :param searches: The searches in the order of crawling
+        :param pages: The page numbers in the order of crawling
+        :return: The searches and the page numbers which are left to crawl
+        """
+        if self.checkpoint is None:
+            return searches, pages
+        done = self.checkpoint.pages_done()
+        left = [
+            (search, page)
+            for search, page in zip(searches, pages)
+            if (search_key(search), page) not in done
+        ]
+        return [search for search, _ in left], [page for _, page in left]
+
+    def load_pending_listings(self) -> list[ListingLink]:
+        """
+        Load the listings found but not saved before the crawl was interrupted,
+        and the listings from the retry queue.
+
+        The listings which are already in the database are marked as saved.
 
-    def extract_listings_from_page(self, page: int) -> set:
+        :return: The listings to extract
+        """
+        if self.checkpoint is None:
+            return []
+        pending = self.checkpoint.pending_links()
+        if not pending:
+            return []
+        existing = PropertyService.get_many_by_otodom_ids(
+            [listing_link.otodom_id for listing_link in pending], "otodom_id"
+        )
+        self.checkpoint.mark_saved(list(existing))
+        pending = [
+            listing_link
+            for listing_link in pending
+            if listing_link.otodom_id not in existing
+        ]
+        with self.lock:
+            self.scheduled_ids.update(
+                listing_link.otodom_id for listing_link in pending
+            )
+        logger.info(f"Found {len(pending)} pending listings in the checkpoint")
+        return pending
+
+    @staticmethod
+    def extract_pages_count(content: bytes) -> int | None:
+        """
+        Extract the number of pages from the search page.
+
+        :param content: The content of the search page
+        :return: The number of pages or None if the pagination was not found
+        """
+        page_data = extract_page_data(content)
+        if page_data is None:
+            return None
+        return extract_pages_count(page_data)
+
+    def extract_listings_from_page(
+        self, search: SearchSpec, page: int
+    ) -> list[ListingLink]:
         """
         Crawl the given page.
 
+        :param search: The search to crawl
+        :param page: The page number to crawl
+        :return: The listings on the page
+        """
+        params = self.generate_params(search)
+        params["page"] = page
+        page_data = self.retry.get(
+            self.fetcher,
+            url=self.generate_search_url(search),
+            params=params,
+            parse=self.parse_page,
+        )
+        logger.info(f"Extracting listings from page {page} of {search}")
+        return self.extract_listing_links(page_data)
+
+    async def extract_listings_from_page_async(
+        self, fetcher: AsyncFetcher, search: SearchSpec, page: int
+    ) -> list[ListingLink]:
+        """
+        Asynchronous version of the extract_listings_from_page.
+
+        :param fetcher: The fetcher used to make the requests
+        :param search: The search to crawl
         :param page: The page number to crawl
         :return: The listings on the page
         """
-        params = self.params.copy()
+        params = self.generate_params(search)
         params["page"] = page
-        response = requests.get(
-            url=self.generate_search_url(), params=params, headers=HEADERS, timeout=10
+        page_data = await self.retry.get_async(
+            fetcher,
+            url=self.generate_search_url(search),
+            params=params,
+            parse=self.parse_page,
         )
-        logger.info(f"Extracting listings from page {page}")
-        soup = BeautifulSoup(response.content, "html.parser")
-        listings = soup.select("div[data-cy=listing-item]")
-        return listings
+        logger.info(f"Extracting listings from page {page} of {search}")
+        return self.extract_listing_links(page_data)
+
+    @staticmethod
+    def extract_listing_links(page_data: dict) -> list[ListingLink]:
+        """
+        Extract the listings from the search page.
+
+        The listings are read from the JSON embedded in the page,
+        so every one of them is parsed only once.
+
+        :param page_data: The data embedded in the search page
+        :return: The listings on the page
+        """
+        return [
+            ListingLink.from_search_item(item)
+            for item in extract_search_results(page_data)
+        ]
+
+    def load_known_listings(self) -> None:
+        """
+        Load the seen index in the incremental mode.
+
+        The index is built from the database only if it does not exist yet.
+        """
+        if self.index is None:
+            return
+        if self.index.exists():
+            self.index.load()
+            return
+        logger.info("Building the index from the database")
+        for otodom_id, link, price, promoted in PropertyService.get_index_entries():
+            self.index.add(otodom_id, content_hash(link, price, promoted))
 
-    def extract_listing_data(self, listing_data: ResultSet) -> None:
+    def save_known_listings(self) -> None:
+        """
+        Save the seen index to the disk in the incremental mode.
+        """
+        if self.index is not None:
+            self.index.save()
+
+    def register_listing(self, listing_link: ListingLink) -> bool:
+        """
+        Mark the listing as scheduled for the extraction.
+
+        :param listing_link: The listing found at the search page
+        :return: True if the listing is neither unchanged since the previous run
+            nor was already scheduled, False otherwise
+        """
+        if self.index is not None and self.index.is_unchanged(listing_link):
+            return False
+        with self.lock:
+            if listing_link.otodom_id in self.scheduled_ids:
+                return False
+            self.scheduled_ids.add(listing_link.otodom_id)
+            return True
+
+    def select_new_listings(
+        self, listing_links: list[ListingLink]
+    ) -> list[ListingLink]:
+        """
+        Select the listings from the search page which should be extracted.
+
+        The listings found at the page are checked against the database
+        with a single query. With the change tracking enabled, the known
+        listings with a different price at the search page are extracted again.
+
+        :param listing_links: The listings found at the search page
+        :return: The listings which are not in the database yet or changed
+        """
+        candidates = [
+            listing_link
+            for listing_link in listing_links
+            if self.register_listing(listing_link)
+        ]
+        if not candidates:
+            return []
+        existing = PropertyService.get_many_by_otodom_ids(
+            [listing_link.otodom_id for listing_link in candidates],
+            "otodom_id",
+            "price",
+        )
+        new_listings = []
+        for listing_link in candidates:
+            property_ = existing.get(listing_link.otodom_id)
+            if property_ is None or (
+                self.settings.track_changes
+                and property_.get("price") != listing_link.price
+            ):
+                new_listings.append(listing_link)
+            elif self.index is not None:
+                self.index.add_listing(listing_link)
+        return new_listings
+
+    def produce_listings(
+        self, listings_queue: queue.Queue, search: SearchSpec, page: int
+    ) -> None:
+        """
+        Crawl the given search page and put the new listings to the queue.
+
+        The call blocks when the queue is full,
+        so the search pages are not crawled faster than the listings are consumed.
+
+        :param listings_queue: The queue consumed by the listing workers
+        :param search: The search to crawl
+        :param page: The page number to crawl
+        """
+        try:
+            listing_links = self.extract_listings_from_page(search, page)
+        except Exception as e:
+            logger.exception(
+                f"Failed to extract listings from page {page} of {search}: {e}"
+            )
+            return
+        new_listings = self.select_new_listings(listing_links)
+        if self.checkpoint is not None:
+            self.checkpoint.add_page(search, page, new_listings)
+        for listing_link in new_listings:
+            listings_queue.put(listing_link)
+
+    async def produce_listings_async(
+        self,
+        fetcher: AsyncFetcher,
+        listings_queue: asyncio.Queue,
+        search: SearchSpec,
+        page: int,
+    ) -> None:
+        """
+        Asynchronous version of the produce_listings.
+
+        :param fetcher: The fetcher used to make the requests
+        :param listings_queue: The queue consumed by the listing workers
+        :param search: The search to crawl
+        :param page: The page number to crawl
+        """
+        try:
+            listing_links = await self.extract_listings_from_page_async(
+                fetcher, search, page
+            )
+        except Exception as e:
+            logger.exception(
+                f"Failed to extract listings from page {page} of {search}: {e}"
+            )
+            return
+        listing_links = await asyncio.to_thread(self.select_new_listings, listing_links)
+        if self.checkpoint is not None:
+            await asyncio.to_thread(
+                self.checkpoint.add_page, search, page, listing_links
+            )
+        for listing_link in listing_links:
+            await listings_queue.put(listing_link)
+
+    def consume_listings(self, listings_queue: queue.Queue) -> None:
+        """
+        Extract the listings from the queue until None is received.
+
+        The listings which failed with any error are moved
+        to the retry queue of the checkpoint.
+
+        :param listings_queue: The queue filled by the search page producers
+        """
+        while (listing_link := listings_queue.get()) is not None:
+            try:
+                self.extract_listing_data(listing_link)
+            except Exception as e:
+                logger.exception(f"Failed to process {listing_link.link}: {e}")
+                if self.checkpoint is not None:
+                    self.checkpoint.mark_failed(listing_link, repr(e))
+
+    async def consume_listings_async(
+        self, fetcher: AsyncFetcher, listings_queue: asyncio.Queue
+    ) -> None:
+        """
+        Asynchronous version of the consume_listings.
+
+        :param fetcher: The fetcher used to make the requests
+        :param listings_queue: The queue filled by the search page producers
+        """
+        while (listing_link := await listings_queue.get()) is not None:
+            try:
+                await self.extract_listing_data_async(fetcher, listing_link)
+            except Exception as e:
+                logger.exception(f"Failed to process {listing_link.link}: {e}")
+                if self.checkpoint is not None:
+                    await asyncio.to_thread(
+                        self.checkpoint.mark_failed, listing_link, repr(e)
+                    )
+
+    def extract_listing_data(self, listing_link: ListingLink) -> None:
         """
         Extract the data from the given listing.
 
@@ -121,56 +678,243 @@ class Crawler:
 
         It scrapes both the property and the agency data.
 
-        At the end if the the listing is unique (wasn't found earlier)
-        it is added to the self.listing list
+        :param listing_link: The listing found at the search page
+        """
+        try:
+            parsed = self.fetch_listing(listing_link)
+        except DataExtractionError as e:
+            logger.exception(
+                f"Failed to extract data from {listing_link.link}, Error: {e}"
+            )
+            if self.checkpoint is not None:
+                self.checkpoint.mark_failed(listing_link, str(e))
+            return
+        if self.checkpoint is not None:
+            self.checkpoint.mark_fetched(listing_link)
+        self.save_listing(parsed)
+
+    async def extract_listing_data_async(
+        self, fetcher: AsyncFetcher, listing_link: ListingLink
+    ) -> None:
+        """
+        Asynchronous version of the extract_listing_data.
+
+        Only the request is made on the event loop,
+        the database operations are run in the default executor.
 
-        :param listing_data: The HTML part of the listing at the search page.
+        :param fetcher: The fetcher used to make the requests
+        :param listing_link: The listing found at the search page
         """
-        listing = Listing()
-        property_ = PropertyDocument()
-        property_.set_link(listing_data)
-        property_.set_promoted(listing_data)
         try:
-            soup = self.try_get_listing_page(url=property_.link)
+            parsed = await self.fetch_listing_async(fetcher, listing_link)
         except DataExtractionError as e:
             logger.exception(
-                f"Failed to extract data from {property_.link}, Error: {e}"
+                f"Failed to extract data from {listing_link.link}, Error: {e}"
             )
+            if self.checkpoint is not None:
+                await asyncio.to_thread(
+                    self.checkpoint.mark_failed, listing_link, str(e)
+                )
             return
-        property_.extract_data(soup)
-        if property_.offered_by == OfferedBy.ESTATE_AGENCY:
-            agency = AgencyDocument()
-            agency.extract_data(soup)
-            agency_doc = AgencyService.get_by_otodom_id(agency.otodom_id)
-            if agency_doc is None:
-                agency_doc = AgencyService.put(agency)
-            property_.estate_agency = agency_doc.to_dbref()
-            listing.agency = agency_doc
-        if PropertyService.get_by_otodom_id(property_.otodom_id) is None:
-            logger.info(f"Adding new property {property_.link} to database")
-            property_ = PropertyService.put(property_)
-            listing.property_ = property_
+        if self.checkpoint is not None:
+            await asyncio.to_thread(self.checkpoint.mark_fetched, listing_link)
+        await self.save_listing_async(parsed)
+
+    def fetch_listing(self, listing_link: ListingLink) -> dict:
+        """
+        Fetch the listing page and extract the property and the agency from it.
+
+        With the parse workers enabled only the JSON is found in the fetching
+        thread, it is decoded and extracted by the worker process.
+
+        :param listing_link: The listing found at the search page
+        :raises DataExtractionError: If the data extraction fails
+        :return: The raw property and agency
+        """
+        if self.parse_pool is None:
+            page_data = self.try_get_listing_page(url=listing_link.link)
+            parsed = self.extract_listing(
+                page_data, listing_link.link, listing_link.promoted
+            )
+        else:
+            page_json = self.retry.get(
+                self.fetcher, url=listing_link.link, parse=self.find_page_json
+            )
+            started_at = time.perf_counter()
+            parsed = self.parse_pool.submit(
+                parse_listing, page_json, listing_link.link, listing_link.promoted
+            ).result()
+            self.timings.add("extract", time.perf_counter() - started_at)
+        if parsed is None:
+            raise DataExtractionError(url=listing_link.link)
+        return parsed
+
+    async def fetch_listing_async(
+        self, fetcher: AsyncFetcher, listing_link: ListingLink
+    ) -> dict:
+        """
+        Asynchronous version of the fetch_listing.
+
+        Without the parse workers the data is extracted in the default executor.
+
+        :param fetcher: The fetcher used to make the requests
+        :param listing_link: The listing found at the search page
+        :raises DataExtractionError: If the data extraction fails
+        :return: The raw property and agency
+        """
+        if self.parse_pool is None:
+            page_data = await self.try_get_listing_page_async(
+                fetcher, url=listing_link.link
+            )
+            parsed = await asyncio.to_thread(
+                self.extract_listing,
+                page_data,
+                listing_link.link,
+                listing_link.promoted,
+            )
+        else:
+            page_json = await self.retry.get_async(
+                fetcher, url=listing_link.link, parse=self.find_page_json
+            )
+            started_at = time.perf_counter()
+            parsed = await asyncio.wrap_future(
+                self.parse_pool.submit(
+                    parse_listing, page_json, listing_link.link, listing_link.promoted
+                )
+            )
+            self.timings.add("extract", time.perf_counter() - started_at)
+        if parsed is None:
+            raise DataExtractionError(url=listing_link.link)
+        return parsed
+
+    def save_listing(self, parsed: dict) -> None:
+        """
+        Pass the extracted listing to the database writer.
+
+        The agency is looked up in the cache or inserted first. The property
+        is buffered by the writer and added to the self.listing list
+        once it is inserted.
+
+        :param parsed: The raw property and agency extracted from the listing page
+        """
+        agency_ref = None
+        if parsed["agency"] is not None:
+            agency_ref = self.agency_cache.get_or_insert(parsed["agency"])
+        self.buffer_listing(parsed, agency_ref)
+
+    async def save_listing_async(self, parsed: dict) -> None:
+        """
+        Asynchronous version of the save_listing.
+
+        The known agencies are resolved without leaving the event loop,
+        the database operations are run in the default executor.
+
+        :param parsed: The raw property and agency extracted from the listing page
+        """
+        agency_ref = None
+        if parsed["agency"] is not None:
+            agency_ref = await self.agency_cache.get_or_insert_async(parsed["agency"])
+        await asyncio.to_thread(self.buffer_listing, parsed, agency_ref)
+
+    def buffer_listing(self, parsed: dict, agency_ref: DBRef | None) -> None:
+        """
+        Link the property to its agency and pass it to the database writer.
+
+        :param parsed: The raw property and agency extracted from the listing page
+        :param agency_ref: The reference of the stored agency
+            or None if the property has no agency or it could not be inserted
+        """
+        listing = Listing()
+        property_ = parsed["property"]
+        agency = parsed["agency"]
+        if agency is not None and agency_ref is not None:
+            agency["_id"] = agency_ref.id
+            property_["estate_agency"] = agency_ref.id
+            listing.agency = agency
+        listing.property_ = property_
+        self.writer.add_raw(property_, listing)
+
+    def on_properties_inserted(self, inserted: list[tuple[dict, Listing]]) -> None:
+        """
+        Called by the writer after the properties were inserted to the database.
+
+        The inserted listings are added to the self.listings list.
+
+        :param inserted: The inserted property documents with their listings
+        """
+        for document, listing in inserted:
+            logger.info(f"Added new property {document['link']} to database")
+            listing.property_ = document
             self.listings.append(listing)
 
-    def try_get_listing_page(self, url: str) -> BeautifulSoup:
+    def write_properties(self, properties: list[dict]) -> BulkResult:
+        """
+        Write the batch of the properties to the database, mark them as saved
+        in the checkpoint and add them to the seen index.
+
+        The properties rejected by the database are moved
+        to the retry queue of the checkpoint instead,
+        so they are extracted again by the next run.
+
+        :param properties: The raw properties to write
+        :return: The ids of the inserted properties and the errors
+            of the rejected ones keyed by their index in the batch
+        """
+        result = PropertyService.bulk_upsert(properties)
+        saved = [
+            property_
+            for index, property_ in enumerate(properties)
+            if index not in result.errors
+        ]
+        if self.index is not None:
+            for property_ in saved:
+                self.index.add_property(property_)
+        if self.checkpoint is not None:
+            self.checkpoint.mark_saved([property_["otodom_id"] for property_ in saved])
+            self.checkpoint.mark_rejected(
+                {
+                    properties[index]["otodom_id"]: error
+                    for index, error in result.errors.items()
+                }
+            )
+        return result
+
+    def create_writer(self) -> BulkWriter:
+        """
+        Create the buffered writer of the properties.
+
+        :return: The writer flushing the properties in batches
+        """
+        return BulkWriter(
+            flush=self.timings.timed("write", self.write_properties),
+            batch_size=self.settings.write_batch_size,
+            flush_interval=self.settings.write_flush_interval,
+            on_inserted=self.on_properties_inserted,
+        )
+
+    def try_get_listing_page(self, url: str) -> dict:
         """
         Tries to get the listing page.
 
-        After 3 failures raises DataExtractionError
+        The failed attempts are retried according to the retry policy,
+        after the last one FetchError is raised.
 
         :param url: The URL of the listing page
         :raises DataExtractionError: If the data extraction fails
-        :return: The data from the listing
-        """
-        max_retries = 3
-        while max_retries > 0:
-            response = requests.get(url=url, headers=HEADERS)
-            soup = BeautifulSoup(response.content, "html.parser")
-            if not PropertyDocument.informational_json_exists(soup):
-                max_retries -= 1
-                continue
-            return soup
-        raise DataExtractionError(url=url)
+        :return: The data embedded in the listing page
+        """
+        return self.retry.get(self.fetcher, url=url, parse=self.parse_page)
+
+    async def try_get_listing_page_async(self, fetcher: AsyncFetcher, url: str) -> dict:
+        """
+        Asynchronous version of the try_get_listing_page.
+
+        :param fetcher: The fetcher used to make the requests
+        :param url: The URL of the listing page
+        :raises DataExtractionError: If the data extraction fails
+        :return: The data embedded in the listing page
+        """
+        return await self.retry.get_async(fetcher, url=url, parse=self.parse_page)
 
     def to_csv_file(self, filename: str) -> None:
         """
@@ -202,25 +946,182 @@ class Crawler:
                 indent=4,
             )
 
+    def wrap_async_fetcher(self, fetcher: AsyncFetcher):
+        """
+        Wrap the asynchronous fetcher with the HTTP cache and the archive
+        the same way as the synchronous one.
+
+        :param fetcher: The opened fetcher
+        :return: The fetcher used by the crawl
+        """
+        if self.replay is not None:
+            return AsyncReplayFetcher(self.replay)
+        if self.http_cache is not None:
+            fetcher = AsyncCachingFetcher(fetcher, self.http_cache)
+        if self.recorder is not None:
+            fetcher = AsyncRecordingFetcher(fetcher, self.recorder)
+        return fetcher
+
+    def create_parse_pool(self) -> concurrent.futures.ProcessPoolExecutor | None:
+        """
+        Create the pool of the parse worker processes if they are enabled.
+
+        The workers are spawned, not forked, so they do not inherit
+        the threads and the database connections of the crawler.
+
+        :return: The pool or None if the listings are extracted in the threads
+        """
+        if self.settings.parse_workers == 0:
+            return None
+        return concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.settings.parse_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    def finish(self) -> None:
+        """
+        Log the statistics of the crawl and close the HTTP cache, the archive,
+        the parse workers and the checkpoint.
+
+        The checkpoint of the finished crawl is reset,
+        so the next run starts a new one.
+        """
+        if self.parse_pool is not None:
+            self.parse_pool.shutdown()
+            self.parse_pool = None
+        logger.info(self.agency_cache.stats())
+        logger.info(self.retry.metrics.stats())
+        logger.info(self.timings.report(len(self.listings)))
+        if self.http_cache is not None:
+            logger.info(self.http_cache.stats())
+            self.http_cache.close()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.checkpoint is not None:
+            logger.info(self.checkpoint.stats())
+            if self.checkpoint.is_complete():
+                self.checkpoint.reset()
+            self.checkpoint.close()
+
     def start(self) -> None:
         """
         Starts the crawler.
 
         The crawler starts crawling the website and extracting the data.
+
+        The search pages are crawled by the producers, which put the new listings
+        to the bounded queue, while the listing workers extract them at the same time.
+        The size of the queue is defined by the queue_size setting.
+        The number of the requests made at once is adjusted to the responses
+        of the website by the throttle, up to the max_concurrent_requests.
+
+        All of the searches share the connections, the seen listings
+        and the database writer, their pages are crawled interleaved.
+        The searches with more pages than the website serves are split
+        by the price range.
+
+        In the incremental mode only the listings which are new or changed
+        since the previous run are extracted.
+
+        With the checkpoint enabled the interrupted crawl is resumed,
+        the pending listings and the retry queue are extracted first.
         """
-        pages = self.count_pages()
-        with concurrent.futures.ThreadPoolExecutor(max_workers=25) as executor:
-            listings = list(
-                executor.map(self.extract_listings_from_page, range(1, pages + 1))
-            )
+        shards = self.resume_shards()
+        searches = self.searches_to_count(shards)
+        if searches:
+            shards = self.counted_shards(shards) + self.shard_searches(searches)
+            self.save_shards(shards)
+        searches, pages = self.skip_crawled_pages(*self.schedule_pages(shards))
+        self.load_known_listings()
+        self.agency_cache.warm()
+        pending = self.load_pending_listings()
+        self.parse_pool = self.create_parse_pool()
+        self.writer = self.create_writer()
+        listings_queue = queue.Queue(maxsize=self.settings.queue_size)
+        workers = self.settings.max_concurrent_requests
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            consumers = [
+                executor.submit(self.consume_listings, listings_queue)
+                for _ in range(workers)
+            ]
+            try:
+                for listing_link in pending:
+                    listings_queue.put(listing_link)
+                with concurrent.futures.ThreadPoolExecutor(
+                    max_workers=workers
+                ) as search_executor:
+                    # Iterating the results raises the errors of the producers
+                    for _ in search_executor.map(
+                        partial(self.produce_listings, listings_queue),
+                        searches,
+                        pages,
+                    ):
+                        pass
+            finally:
+                for _ in consumers:
+                    listings_queue.put(None)
+            for consumer in consumers:
+                consumer.result()
+        self.writer.close()
+        self.fetcher.close()
+        self.save_known_listings()
+        self.finish()
 
-        existing_links = PropertyService.get_all_links()
-        listings = {
-            listing_data
-            for sublist in listings
-            for listing_data in sublist
-            if Constans.DEFAULT_URL + PropertyDocument.extract_link(listing_data)
-            not in existing_links
-        }
-        with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-            executor.map(self.extract_listing_data, listings)
+    def start_async(self) -> None:
+        """
+        Starts the crawler in the asyncio mode.
+
+        All of the requests are made from a single event loop
+        over one pooled keep-alive session, so hundreds of them can be in flight
+        at once. The limit is defined by the max_concurrent_requests setting.
+        """
+        asyncio.run(self.crawl_async())
+
+    async def crawl_async(self) -> None:
+        """
+        Crawls the website using the asyncio event loop.
+        """
+        async with AsyncFetcher(
+            max_connections=self.settings.max_concurrent_requests,
+            throttle=self.throttle,
+        ) as fetcher:
+            fetcher = self.wrap_async_fetcher(fetcher)
+            shards = await asyncio.to_thread(self.resume_shards)
+            searches = self.searches_to_count(shards)
+            if searches:
+                counted = await self.shard_searches_async(fetcher, searches)
+                shards = self.counted_shards(shards) + counted
+                await asyncio.to_thread(self.save_shards, shards)
+            searches, pages = await asyncio.to_thread(
+                self.skip_crawled_pages, *self.schedule_pages(shards)
+            )
+            await asyncio.to_thread(self.load_known_listings)
+            await asyncio.to_thread(self.agency_cache.warm)
+            pending = await asyncio.to_thread(self.load_pending_listings)
+            self.parse_pool = self.create_parse_pool()
+            self.writer = self.create_writer()
+            listings_queue = asyncio.Queue(maxsize=self.settings.queue_size)
+            consumers = [
+                asyncio.create_task(
+                    self.consume_listings_async(fetcher, listings_queue)
+                )
+                for _ in range(self.settings.max_concurrent_requests)
+            ]
+            try:
+                for listing_link in pending:
+                    await listings_queue.put(listing_link)
+                await asyncio.gather(
+                    *(
+                        self.produce_listings_async(
+                            fetcher, listings_queue, search, page
+                        )
+                        for search, page in zip(searches, pages)
+                    )
+                )
+            finally:
+                for _ in consumers:
+                    await listings_queue.put(None)
+            await asyncio.gather(*consumers)
+        await asyncio.to_thread(self.writer.close)
+        await asyncio.to_thread(self.save_known_listings)
+        self.finish()
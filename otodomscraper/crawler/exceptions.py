@@ -10,3 +10,22 @@ class DataExtractionError(Exception):
         if url is not None:
             message += f" URL: {url}"
         super().__init__(message)
+
+
+class FetchError(DataExtractionError):
+    """
+    Exception raised when the page could not be fetched after the retries.
+
+    Attributes:
+        reason -- the reason of the last failed attempt
+        attempts -- the number of the attempts made
+    """
+
+    def __init__(self, url=None, reason="", attempts=0) -> None:
+        self.reason = reason
+        self.attempts = attempts
+        super().__init__(
+            url=url,
+            message=f"Failed to fetch the page after {attempts} attempts"
+            f" ({reason})!",
+        )
@@ -0,0 +1,65 @@
+import json
+import re
+
+NEXT_DATA_REGEX = re.compile(
+    rb"<script[^>]*\stype=\"application/json\"[^>]*>(.*?)</script>", re.DOTALL
+)
+
+
+def extract_page_json(content: bytes) -> bytes | None:
+    """
+    Finds the JSON with the page data embedded by the otodom.pl
+    (the __NEXT_DATA__ script) in the raw response without decoding it.
+
+    :param content: The raw content of the page
+    :return: The raw JSON or None if the script was not found
+    """
+    match = NEXT_DATA_REGEX.search(content)
+    if match is None:
+        return None
+    return match.group(1)
+
+
+def extract_page_data(content: bytes) -> dict | None:
+    """
+    Extracts the JSON with the page data embedded by the otodom.pl
+    (the __NEXT_DATA__ script) straight from the raw response.
+
+    The page is not parsed to the DOM tree, the script is located
+    with the regular expression and decoded only once.
+
+    :param content: The raw content of the page
+    :return: The decoded page data or None if the JSON was not found
+    """
+    page_json = extract_page_json(content)
+    if page_json is None:
+        return None
+    try:
+        return json.loads(page_json)
+    except ValueError:
+        return None
+
+
+def extract_search_results(page_data: dict) -> list[dict]:
+    """
+    Extracts the listings embedded in the search results page.
+
+    :param page_data: The data embedded in the search page
+    :return: The listings found at the search page
+    """
+    search_ads = page_data["props"]["pageProps"]["data"]["searchAds"]
+    return search_ads.get("items") or []
+
+
+def extract_pages_count(page_data: dict) -> int | None:
+    """
+    Extracts the number of the search results pages.
+
+    :param page_data: The data embedded in the search page
+    :return: The number of pages or None if the pagination was not found
+    """
+    try:
+        search_ads = page_data["props"]["pageProps"]["data"]["searchAds"]
+        return int(search_ads["pagination"]["totalPages"])
+    except (KeyError, TypeError, ValueError):
+        return None
@@ -0,0 +1,167 @@
+import asyncio
+import time
+from typing import Mapping
+from typing import NamedTuple
+
+import aiohttp
+import requests
+from crawler.throttle import Throttle
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"  # noqa: E501
+}
+
+DEFAULT_TIMEOUT = 10
+
+TIMEOUT_ERRORS = (requests.Timeout, asyncio.TimeoutError)
+REQUEST_ERRORS = (requests.RequestException, aiohttp.ClientError)
+
+
+class Response(NamedTuple):
+    """
+    Transport independent representation of a fetched page.
+
+    The headers are case insensitive.
+    """
+
+    url: str
+    status: int
+    headers: Mapping[str, str]
+    content: bytes
+
+
+class Fetcher:
+    """
+    Synchronous HTTP client used by the threaded crawl.
+
+    All of the requests share one pooled session, so the connections
+    to the otodom.pl are kept alive and reused between the worker threads.
+    The requests wait for the throttle of their host before they are made.
+    """
+
+    def __init__(self, max_connections: int, throttle: Throttle):
+        """
+        Initialize the fetcher.
+
+        :param max_connections: The maximum number of pooled connections
+        :param throttle: The rate and concurrency limits of the hosts
+        """
+        self.throttle = throttle
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=max_connections, pool_maxsize=max_connections
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(HEADERS)
+
+    def get(
+        self,
+        url: str,
+        params: dict = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        headers: dict = None,
+    ) -> Response:
+        """
+        Fetch the given URL.
+
+        :param url: The URL to fetch
+        :param params: The query parameters of the request
+        :param timeout: The timeout of the request in seconds
+        :param headers: The additional headers of the request
+        :return: The fetched response
+        """
+        host_throttle = self.throttle.for_url(url)
+        host_throttle.acquire()
+        started_at = time.monotonic()
+        status = None
+        try:
+            response = self.session.get(
+                url=url, params=params, headers=headers, timeout=timeout
+            )
+            status = response.status_code
+        finally:
+            host_throttle.release(time.monotonic() - started_at, status)
+        return Response(
+            url=response.url,
+            status=response.status_code,
+            headers=CaseInsensitiveDict(response.headers),
+            content=response.content,
+        )
+
+    def close(self) -> None:
+        """
+        Close the pooled connections.
+        """
+        self.session.close()
+
+
+class AsyncFetcher:
+    """
+    Asynchronous HTTP client used by the asyncio crawl.
+
+    It has to be used as an async context manager, which opens
+    a single keep-alive session limited to the given number of connections.
+    The requests wait for the throttle of their host before they are made.
+    """
+
+    def __init__(self, max_connections: int, throttle: Throttle):
+        """
+        Initialize the fetcher.
+
+        :param max_connections: The maximum number of concurrent connections
+        :param throttle: The rate and concurrency limits of the hosts
+        """
+        self.max_connections = max_connections
+        self.throttle = throttle
+        self.session: aiohttp.ClientSession | None = None
+
+    async def __aenter__(self) -> "AsyncFetcher":
+        connector = aiohttp.TCPConnector(
+            limit=self.max_connections, limit_per_host=self.max_connections
+        )
+        self.session = aiohttp.ClientSession(connector=connector, headers=HEADERS)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.session.close()
+
+    async def get(
+        self,
+        url: str,
+        params: dict = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        headers: dict = None,
+    ) -> Response:
+        """
+        Fetch the given URL.
+
+        :param url: The URL to fetch
+        :param params: The query parameters of the request
+        :param timeout: The timeout of the request in seconds
+        :param headers: The additional headers of the request
+        :return: The fetched response
+        """
+        host_throttle = self.throttle.for_url(url)
+        await host_throttle.acquire_async()
+        started_at = time.monotonic()
+        status = None
+        try:
+            async with self.session.get(
+                url,
+                params=params,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=timeout),
+            ) as response:
+                content = await response.read()
+                status = response.status
+                return Response(
+                    url=str(response.url),
+                    status=response.status,
+                    headers=CaseInsensitiveDict(response.headers),
+                    content=content,
+                )
+        finally:
+            host_throttle.release(time.monotonic() - started_at, status)
@@ -0,0 +1,131 @@
+import logging
+import os
+import threading
+from array import array
+from hashlib import blake2b
+
+from crawler.listing import ListingLink
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(link: str, price: int | None, promoted: bool) -> int:
+    """
+    Computes the compact hash of the listing content visible at the search page.
+
+    :param link: The link of the listing
+    :param price: The price of the listing
+    :param promoted: Whether the listing is promoted
+    :return: The hash as the signed 64-bit integer
+    """
+    digest = blake2b(f"{link}|{price}|{promoted}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+class SeenIndex:
+    """
+    Persistent index of the already crawled listings.
+
+    The index maps the otodom id of every listing to the hash of its content
+    found at the search page. On disk it is stored as a flat array
+    of 64-bit integer pairs, so it can be loaded in milliseconds
+    even for hundreds of thousands of listings.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the index.
+
+        :param path: The path of the index file
+        """
+        self.path = path
+        self.entries: dict[int, int] = {}
+        self.lock = threading.Lock()
+
+    def exists(self) -> bool:
+        """
+        :return: True if the index file exists, False otherwise
+        """
+        return os.path.exists(self.path)
+
+    def load(self) -> None:
+        """
+        Loads the index from the file.
+
+        If the file does not exist the index stays empty.
+        """
+        if not self.exists():
+            logger.info(f"Index {self.path} does not exist, starting with empty one")
+            return
+        data = array("q")
+        with open(self.path, "rb") as file:
+            data.frombytes(file.read())
+        self.entries = dict(zip(data[::2], data[1::2]))
+        logger.info(f"Loaded {len(self.entries)} listings from index {self.path}")
+
+    def save(self) -> None:
+        """
+        Saves the index to the file.
+
+        The index is written to the temporary file first and then moved,
+        so the file is never left partially written.
+        """
+        with self.lock:
+            data = array("q")
+            for otodom_id, hash_ in self.entries.items():
+                data.append(otodom_id)
+                data.append(hash_)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as file:
+            data.tofile(file)
+        os.replace(tmp_path, self.path)
+        logger.info(f"Saved {len(self.entries)} listings to index {self.path}")
+
+    def is_unchanged(self, listing_link: ListingLink) -> bool:
+        """
+        :param listing_link: The listing found at the search page
+        :return: True if the listing is known and its content did not change,
+            False otherwise
+        """
+        return self.entries.get(listing_link.otodom_id) == self.hash(listing_link)
+
+    def add(self, otodom_id: int, hash_: int) -> None:
+        """
+        Adds the listing to the index or updates its hash.
+
+        :param otodom_id: The otodom id of the listing
+        :param hash_: The hash of the listing content
+        """
+        with self.lock:
+            self.entries[otodom_id] = hash_
+
+    def add_listing(self, listing_link: ListingLink) -> None:
+        """
+        Adds the listing found at the search page to the index.
+
+        :param listing_link: The listing found at the search page
+        """
+        self.add(listing_link.otodom_id, self.hash(listing_link))
+
+    def add_property(self, property_: dict) -> None:
+        """
+        Adds the property written to the database to the index.
+
+        :param property_: The raw property document
+        """
+        self.add(
+            property_["otodom_id"],
+            content_hash(
+                property_["link"], property_.get("price"), property_["promoted"]
+            ),
+        )
+
+    @staticmethod
+    def hash(listing_link: ListingLink) -> int:
+        """
+        :param listing_link: The listing found at the search page
+        :return: The hash of the listing content
+        """
+        return content_hash(
+            listing_link.link, listing_link.price, listing_link.promoted
+        )
@@ -1,12 +1,44 @@
-from common import flatten_dict
-from models import AgencyDocument
-from models import PropertyDocument
+from typing import NamedTuple
+
+from common import Constans
+from models.schema import CSV_FLATTENER
+
+
+class ListingLink(NamedTuple):
+    """
+    Lightweight record of the listing found at the search page.
+    """
+
+    otodom_id: int
+    link: str
+    promoted: bool
+    price: int | None
+
+    @classmethod
+    def from_search_item(cls, item: dict) -> "ListingLink":
+        """
+        Create the record from the listing embedded in the search page.
+
+        :param item: The listing data from the search page
+        :return: The record of the listing
+        """
+        total_price = item.get("totalPrice") or {}
+        return cls(
+            otodom_id=item["id"],
+            link=Constans.DEFAULT_URL + "/pl/oferta/" + item["slug"],
+            promoted=bool(item.get("isPromoted")),
+            price=total_price.get("value"),
+        )
 
 
 class Listing:
+    """
+    The saved listing, the property and its agency as the raw documents.
+    """
+
     def __init__(self):
-        self.property_: PropertyDocument = None
-        self.agency: AgencyDocument | None = None
+        self.property_: dict | None = None
+        self.agency: dict | None = None
 
     def to_dict(self) -> dict:
         """
@@ -14,10 +46,7 @@ class Listing:
 
         :return: The listing as a python dictionary instance
         """
-        res = dict()
-        property_ = self.property_.to_mongo().to_dict()
-        res.update(property_)
+        res = dict(self.property_)
         if self.agency is not None:
-            agency = self.agency.to_mongo().to_dict()
-            res["agency"] = agency
-        return flatten_dict(res)
+            res["agency"] = self.agency
+        return CSV_FLATTENER(res)
@@ -0,0 +1,65 @@
+import json
+import logging
+
+from common import OfferedBy
+from models import PropertyDocument
+from models.records import AgencyRecord
+from models.records import PropertyRecord
+from models.records import to_raw
+from models.schema import missing_fields
+
+logger = logging.getLogger(__name__)
+
+
+def extract_listing(page_data: dict, link: str, promoted: bool) -> dict | None:
+    """
+    Extracts the property and its agency from the data of the listing page.
+
+    The page is extracted to the slotted records, which are converted
+    straight to the raw dictionaries ready to be written to the database,
+    so no documents are constructed and the result can be sent
+    between the processes. Only the required fields are checked.
+    The hash of the property content is added, so its changes can be detected.
+
+    :param page_data: The data embedded in the listing page
+    :param link: The link of the listing
+    :param promoted: Whether the listing is promoted
+    :return: The dictionary with the raw property and agency,
+        the agency is None if the property is not offered by the estate agency.
+        None if the extracted property misses any of the required fields
+    """
+    property_ = PropertyRecord.from_page(page_data, link, promoted)
+    document = to_raw(property_)
+    missing = missing_fields(PropertyDocument, document)
+    if missing:
+        logger.error(
+            f"""Failed to validate {PropertyDocument.__name__}
+        Missing fields: {missing}
+        Data: {document}
+        """
+        )
+        return None
+    agency = None
+    if property_.offered_by == OfferedBy.ESTATE_AGENCY:
+        agency = to_raw(AgencyRecord.from_page(page_data))
+    document["content_hash"] = PropertyDocument.hash_content(document)
+    return {"property": document, "agency": agency}
+
+
+def parse_listing(page_json: bytes, link: str, promoted: bool) -> dict | None:
+    """
+    Decodes the JSON of the listing page and extracts the listing from it.
+
+    It is run by the parse worker processes.
+
+    :param page_json: The JSON embedded in the listing page
+    :param link: The link of the listing
+    :param promoted: Whether the listing is promoted
+    :return: The raw property and agency or None if the JSON
+        or the extracted property is not valid
+    """
+    try:
+        page_data = json.loads(page_json)
+    except ValueError:
+        return None
+    return extract_listing(page_data, link, promoted)
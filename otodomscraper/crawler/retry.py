@@ -0,0 +1,257 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from enum import Enum
+from typing import Callable
+
+from crawler.exceptions import FetchError
+from crawler.fetcher import REQUEST_ERRORS
+from crawler.fetcher import Response
+from crawler.fetcher import TIMEOUT_ERRORS
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+HTML_CONTENT_TYPE = "text/html"
+MIN_BODY_SIZE = 1024
+MAX_BODY_SIZE = 20 * 1024 * 1024
+
+
+class Verdict(Enum):
+    """
+    Classification of the fetched response.
+    """
+
+    OK = "ok"
+    RETRY = "retry"
+    GIVE_UP = "give_up"
+
+
+class RetryMetrics:
+    """
+    Thread safe counters of the requests made with the retry policy.
+    """
+
+    def __init__(self):
+        """
+        Initialize the counters with zeros.
+        """
+        self.requests = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.giveups = 0
+        self.lock = threading.Lock()
+
+    def increment(self, name: str) -> None:
+        """
+        :param name: The name of the counter
+        """
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def as_dict(self) -> dict:
+        """
+        :return: The current values of the counters
+        """
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "timeouts": self.timeouts,
+                "giveups": self.giveups,
+            }
+
+    def stats(self) -> str:
+        """
+        :return: The summary of the counters
+        """
+        metrics = self.as_dict()
+        return (
+            f"Requests: {metrics['requests']} made, {metrics['retries']} retries, "
+            f"{metrics['timeouts']} timeouts, {metrics['giveups']} giveups"
+        )
+
+
+class RetryPolicy:
+    """
+    Policy of retrying the requests shared by the whole crawl.
+
+    Every response is classified by its status, content type and body size
+    before it is parsed, so the blocked and broken pages are retried without
+    decoding them. The retries wait for the exponential backoff with the full
+    jitter, or for the Retry-After of the server if it is longer.
+
+    >>> policy = RetryPolicy(max_attempts=3, backoff_base=0.5, backoff_max=30,
+    ...     timeout=10)
+    >>> page_data = policy.get(fetcher, url, parse=extract_page_data)
+    """
+
+    def __init__(
+        self,
+        max_attempts: int,
+        backoff_base: float,
+        backoff_max: float,
+        timeout: float,
+        metrics: RetryMetrics | None = None,
+        on_rejected: Callable[[str, dict | None], None] | None = None,
+    ):
+        """
+        Initialize the policy.
+
+        :param max_attempts: The number of the attempts made before giving up
+        :param backoff_base: The delay in seconds before the first retry
+        :param backoff_max: The highest delay in seconds between the attempts
+        :param timeout: The timeout of every request in seconds
+        :param metrics: The counters updated by the policy
+        :param on_rejected: The function called with the URL and the parameters
+            of the request whose response was rejected by the classification
+            or the parsing
+        """
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.metrics = metrics if metrics is not None else RetryMetrics()
+        self.on_rejected = on_rejected
+
+    @staticmethod
+    def classify(response: Response) -> tuple[Verdict, str]:
+        """
+        Classifies the response without parsing its body.
+
+        :param response: The fetched response
+        :return: The verdict and its reason
+        """
+        if response.status in RETRYABLE_STATUSES:
+            return Verdict.RETRY, f"status {response.status}"
+        if response.status != 200:
+            return Verdict.GIVE_UP, f"status {response.status}"
+        content_type = response.headers.get("Content-Type", "")
+        if not content_type.startswith(HTML_CONTENT_TYPE):
+            return Verdict.RETRY, f"content type {content_type!r}"
+        if len(response.content) < MIN_BODY_SIZE:
+            return Verdict.RETRY, f"body of {len(response.content)} bytes"
+        if len(response.content) > MAX_BODY_SIZE:
+            return Verdict.GIVE_UP, f"body of {len(response.content)} bytes"
+        return Verdict.OK, ""
+
+    def backoff(self, attempt: int, response: Response | None = None) -> float:
+        """
+        Computes the delay before the next attempt.
+
+        :param attempt: The number of the failed attempts
+        :param response: The last response, if any
+        :return: The number of seconds to wait
+        """
+        delay = random.uniform(
+            0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        )
+        if response is not None:
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                delay = max(delay, min(self.backoff_max, float(retry_after)))
+        return delay
+
+    def check(self, response: Response, parse: Callable[[bytes], object]) -> tuple:
+        """
+        Classifies and parses the response.
+
+        :param response: The fetched response
+        :param parse: The function parsing the body, returning None on failure
+        :return: The verdict, its reason and the parsed body
+        """
+        verdict, reason = self.classify(response)
+        if verdict is not Verdict.OK:
+            return verdict, reason, None
+        parsed = parse(response.content)
+        if parsed is None:
+            return Verdict.RETRY, "no data in the page", None
+        return Verdict.OK, "", parsed
+
+    def on_failure(self, url: str, attempt: int, verdict: Verdict, reason: str) -> None:
+        """
+        Updates the metrics after the failed attempt.
+
+        :param url: The URL of the request
+        :param attempt: The number of the failed attempts
+        :param verdict: The verdict of the attempt
+        :param reason: The reason of the failure
+        :raises FetchError: If the request should not be retried anymore
+        """
+        if verdict is Verdict.GIVE_UP or attempt >= self.max_attempts:
+            self.metrics.increment("giveups")
+            raise FetchError(url=url, reason=reason, attempts=attempt)
+        self.metrics.increment("retries")
+        logger.debug(f"Retrying {url} after {reason}, attempt {attempt}")
+
+    def get(
+        self,
+        fetcher,
+        url: str,
+        params: dict = None,
+        parse: Callable[[bytes], object] = bytes,
+    ) -> object:
+        """
+        Fetches and parses the page, retrying the failed attempts.
+
+        :param fetcher: The synchronous fetcher
+        :param url: The URL of the page
+        :param params: The query parameters of the request
+        :param parse: The function parsing the body, returning None on failure
+        :raises FetchError: If all of the attempts failed
+        :return: The parsed body
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            response = None
+            self.metrics.increment("requests")
+            try:
+                response = fetcher.get(url, params=params, timeout=self.timeout)
+                verdict, reason, parsed = self.check(response, parse)
+            except TIMEOUT_ERRORS:
+                self.metrics.increment("timeouts")
+                verdict, reason = Verdict.RETRY, "timeout"
+            except REQUEST_ERRORS as e:
+                verdict, reason = Verdict.RETRY, f"request error {e}"
+            if verdict is Verdict.OK:
+                return parsed
+            if response is not None and self.on_rejected is not None:
+                self.on_rejected(url, params)
+            self.on_failure(url, attempt, verdict, reason)
+            time.sleep(self.backoff(attempt, response))
+
+    async def get_async(
+        self,
+        fetcher,
+        url: str,
+        params: dict = None,
+        parse: Callable[[bytes], object] = bytes,
+    ) -> object:
+        """
+        Asynchronous version of the get.
+
+        :param fetcher: The asynchronous fetcher
+        :param url: The URL of the page
+        :param params: The query parameters of the request
+        :param parse: The function parsing the body, returning None on failure
+        :raises FetchError: If all of the attempts failed
+        :return: The parsed body
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            response = None
+            self.metrics.increment("requests")
+            try:
+                response = await fetcher.get(url, params=params, timeout=self.timeout)
+                verdict, reason, parsed = self.check(response, parse)
+            except TIMEOUT_ERRORS:
+                self.metrics.increment("timeouts")
+                verdict, reason = Verdict.RETRY, "timeout"
+            except REQUEST_ERRORS as e:
+                verdict, reason = Verdict.RETRY, f"request error {e}"
+            if verdict is Verdict.OK:
+                return parsed
+            if response is not None and self.on_rejected is not None:
+                await asyncio.to_thread(self.on_rejected, url, params)
+            self.on_failure(url, attempt, verdict, reason)
+            await asyncio.sleep(self.backoff(attempt, response))
@@ -0,0 +1,283 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+THROTTLED_STATUSES = {408, 429}
+
+
+def is_unhealthy(status: int | None) -> bool:
+    """
+    :param status: The status of the response or None if the request failed
+    :return: True if the request failed, was throttled or the server failed,
+        False otherwise
+    """
+    return status is None or status in THROTTLED_STATUSES or status >= 500
+
+
+class TokenBucket:
+    """
+    Token bucket limiting the rate of the requests.
+
+    Every request takes one token, the tokens are refilled with the given rate
+    up to the capacity of the bucket.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Initialize the full bucket.
+
+        :param rate: The number of the tokens refilled every second
+        :param capacity: The maximum number of the tokens
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Takes the token from the bucket.
+
+        When the bucket is empty the token is borrowed from the future,
+        so the caller has to wait the returned time before making the request.
+
+        :return: The number of seconds to wait
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated_at) * self.rate
+            )
+            self.updated_at = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0
+            return -self.tokens / self.rate
+
+
+class AdaptiveLimiter:
+    """
+    Limiter of the concurrent requests adjusted with the AIMD algorithm.
+
+    The limit is increased by one every round trip while the requests succeed
+    in time, and multiplied by the decrease factor when the server throttles
+    the requests or the latency exceeds the threshold.
+
+    The coroutines waiting for the request are queued in the order
+    they came and woken up by the release, one per free slot.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        minimum: int,
+        maximum: int,
+        latency_threshold: float,
+        decrease_factor: float = 0.5,
+    ):
+        """
+        Initialize the limiter.
+
+        :param initial: The initial limit of the concurrent requests
+        :param minimum: The lowest possible limit
+        :param maximum: The highest possible limit
+        :param latency_threshold: The latency in seconds considered unhealthy
+        :param decrease_factor: The factor the limit is multiplied by on backoff
+        """
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_threshold = latency_threshold
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self.decreased_at = 0.0
+        self.condition = threading.Condition()
+        self.waiters: deque[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+
+    def acquire(self) -> None:
+        """
+        Blocks until the request may be made.
+        """
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+
+    async def acquire_async(self) -> None:
+        """
+        Waits without blocking the event loop until the request may be made.
+
+        The slot is handed over to the waiter by the release,
+        so the waiters are served in the order they came.
+        """
+        with self.condition:
+            if not self.waiters and self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return
+            loop = asyncio.get_running_loop()
+            waiter = loop.create_future()
+            self.waiters.append((loop, waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            with self.condition:
+                if (loop, waiter) in self.waiters:
+                    self.waiters.remove((loop, waiter))
+                else:
+                    self.cancel()
+            raise
+
+    def wake_waiters(self) -> None:
+        """
+        Hands over the free slots to the waiting coroutines.
+        Has to be called with the lock held.
+        """
+        while self.waiters and self.in_flight < int(self.limit):
+            loop, waiter = self.waiters.popleft()
+            self.in_flight += 1
+            loop.call_soon_threadsafe(self.wake, waiter)
+
+    @staticmethod
+    def wake(waiter: asyncio.Future) -> None:
+        """
+        :param waiter: The future of the waiting coroutine
+        """
+        if not waiter.done():
+            waiter.set_result(None)
+
+    def cancel(self) -> None:
+        """
+        Gives back the slot of the request which was not made,
+        without adjusting the limit.
+        """
+        with self.condition:
+            self.in_flight -= 1
+            self.wake_waiters()
+            self.condition.notify_all()
+
+    def release(self, latency: float, throttled: bool) -> None:
+        """
+        Marks the request as finished and adjusts the limit.
+
+        The limit is decreased at most once per the latency threshold,
+        so a burst of the failed requests does not collapse it to the minimum.
+
+        :param latency: The duration of the request in seconds
+        :param throttled: Whether the request was throttled or failed
+        """
+        with self.condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled or latency > self.latency_threshold:
+                if now - self.decreased_at > self.latency_threshold:
+                    self.limit = max(self.minimum, self.limit * self.decrease_factor)
+                    self.decreased_at = now
+                    logger.info(f"Backing off, concurrency limit: {int(self.limit)}")
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self.wake_waiters()
+            self.condition.notify_all()
+
+
+class HostThrottle:
+    """
+    Rate and concurrency limits of the requests made to a single host.
+    """
+
+    def __init__(self, bucket: TokenBucket, limiter: AdaptiveLimiter):
+        self.bucket = bucket
+        self.limiter = limiter
+
+    def acquire(self) -> None:
+        """
+        Blocks until the request may be made.
+        """
+        self.limiter.acquire()
+        try:
+            time.sleep(self.bucket.reserve())
+        except BaseException:
+            self.limiter.cancel()
+            raise
+
+    async def acquire_async(self) -> None:
+        """
+        Waits without blocking the event loop until the request may be made.
+
+        The slot of the limiter is given back if the wait for the token
+        is cancelled.
+        """
+        await self.limiter.acquire_async()
+        try:
+            await asyncio.sleep(self.bucket.reserve())
+        except BaseException:
+            self.limiter.cancel()
+            raise
+
+    def release(self, latency: float, status: int | None) -> None:
+        """
+        Marks the request as finished.
+
+        :param latency: The duration of the request in seconds
+        :param status: The status of the response or None if the request failed
+        """
+        self.limiter.release(latency, is_unhealthy(status))
+
+
+class Throttle:
+    """
+    Registry of the per host throttles sharing the same settings.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        initial_concurrency: int,
+        min_concurrency: int,
+        max_concurrency: int,
+        latency_threshold: float,
+    ):
+        """
+        Initialize the registry.
+
+        :param rate: The number of the requests per second made to the host
+        :param burst: The number of the requests which may exceed the rate at once
+        :param initial_concurrency: The initial limit of the concurrent requests
+        :param min_concurrency: The lowest limit of the concurrent requests
+        :param max_concurrency: The highest limit of the concurrent requests
+        :param latency_threshold: The latency in seconds considered unhealthy
+        """
+        self.rate = rate
+        self.burst = burst
+        self.initial_concurrency = initial_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_threshold = latency_threshold
+        self.hosts: dict[str, HostThrottle] = {}
+        self.lock = threading.Lock()
+
+    def for_url(self, url: str) -> HostThrottle:
+        """
+        :param url: The URL of the request
+        :return: The throttle of the host of the URL
+        """
+        host = urlsplit(url).netloc
+        with self.lock:
+            throttle = self.hosts.get(host)
+            if throttle is None:
+                throttle = self.hosts[host] = HostThrottle(
+                    TokenBucket(self.rate, self.burst),
+                    AdaptiveLimiter(
+                        self.initial_concurrency,
+                        self.min_concurrency,
+                        self.max_concurrency,
+                        self.latency_threshold,
+                    ),
+                )
+            return throttle
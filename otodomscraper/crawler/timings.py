@@ -0,0 +1,71 @@
+import functools
+import threading
+import time
+from typing import Callable
+
+
+class PipelineTimings:
+    """
+    Thread safe timings of the stages of the crawl.
+
+    Every stage sums the time spent in it and the number of its calls,
+    so the report shows the time per page and per batch, and the throughput
+    of the whole pipeline.
+
+    >>> timings = PipelineTimings()
+    >>> parse = timings.timed("parse", extract_page_data)
+    """
+
+    def __init__(self):
+        """
+        Initialize the timings and start the clock of the whole crawl.
+        """
+        self.totals: dict[str, float] = {}
+        self.counts: dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.started_at = time.perf_counter()
+
+    def add(self, stage: str, seconds: float) -> None:
+        """
+        :param stage: The name of the stage
+        :param seconds: The time spent in the stage
+        """
+        with self.lock:
+            self.totals[stage] = self.totals.get(stage, 0.0) + seconds
+            self.counts[stage] = self.counts.get(stage, 0) + 1
+
+    def timed(self, stage: str, function: Callable) -> Callable:
+        """
+        :param stage: The name of the stage
+        :param function: The function run in the stage
+        :return: The function adding its duration to the stage
+        """
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            started_at = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - started_at)
+
+        return wrapper
+
+    def report(self, listings: int) -> str:
+        """
+        :param listings: The number of the listings saved by the crawl
+        :return: The summary of the throughput and the time of every stage
+        """
+        elapsed = time.perf_counter() - self.started_at
+        lines = [
+            f"Crawled {listings} listings in {elapsed:.2f}s "
+            f"({listings / elapsed if elapsed else 0:.1f} listings/s)"
+        ]
+        with self.lock:
+            for stage, total in sorted(self.totals.items()):
+                count = self.counts[stage]
+                lines.append(
+                    f"{stage}: {count} calls, {total:.3f}s total, "
+                    f"{total / count * 1000:.2f}ms per call"
+                )
+        return "\n".join(lines)
@@ -0,0 +1,34 @@
+import argparse
+import logging
+import sys
+
+from services import connect_to_database
+from services.indexes import ensure_indexes
+from services.indexes import explain_service_queries
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Create the indexes declared by the models in the database."
+    )
+    parser.add_argument(
+        "--explain",
+        action="store_true",
+        help="explain the queries of the services and fail if any of them "
+        "scans the whole collection",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    connect_to_database()
+    ensure_indexes()
+    if not args.explain:
+        return 0
+    failed = False
+    for query, stages in explain_service_queries():
+        print(f"{query.name}: {' -> '.join(stages)}")
+        failed = failed or "COLLSCAN" in stages
+    return 1 if failed else 0
+
+
+if "__main__" == __name__:
+    sys.exit(main())
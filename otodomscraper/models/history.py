@@ -0,0 +1,17 @@
+from mongoengine import DateTimeField
+from mongoengine import DictField
+from mongoengine import EmbeddedDocument
+from mongoengine import IntField
+
+
+class HistoryEntryDocument(EmbeddedDocument):
+    """
+    Class representing a single change of a property in the MongoDB database.
+
+    Only the previous values of the changed fields are stored,
+    the current ones are kept in the property itself.
+    """
+
+    changed_at = DateTimeField(required=True)
+    price = IntField()
+    changes = DictField()
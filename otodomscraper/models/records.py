@@ -0,0 +1,483 @@
+import re
+from dataclasses import dataclass
+from dataclasses import field
+from datetime import datetime
+from enum import Enum
+
+from common import AUCTION_TYPE_MAP
+from common import AuctionType
+from common import ConstructionStatus
+from common import MarketType
+from common import OfferedBy
+from common import PROPERTY_TYPE_MAP
+from common import PropertyType
+
+
+def as_int(value: object) -> object:
+    """
+    Converts the value to the integer the same way as the IntField does.
+
+    :param value: The value extracted from the page
+    :return: The integer or the value itself if it cannot be converted
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+@dataclass(slots=True)
+class BuildingRecord:
+    """
+    Building of the property extracted from the listing page.
+
+    It has the same fields as the BuildingDocument.
+    """
+
+    type: str | None = None
+    floors: int | None = None
+    build_year: int | None = None
+
+    @classmethod
+    def from_page(cls, properties: dict) -> "BuildingRecord | None":
+        """
+        Extracts data about building from already converted JSON
+        from the page to the dictionary.
+
+        :param properties: The dict containing the building information
+        :return: The building or None if the page has no building information
+        """
+        if (
+            properties.get("Building_floors_num") is None
+            and properties.get("Building_type") is None
+            and properties.get("Build_year") is None
+        ):
+            return None
+        return cls(
+            type=properties.get("Building_type", [None])[0],
+            floors=as_int(properties.get("Building_floors_num", [None])[0]),
+            build_year=as_int(properties.get("Build_year")),
+        )
+
+
+@dataclass(slots=True)
+class LocalizationRecord:
+    """
+    Location of the property extracted from the listing page.
+
+    It has the same fields as the LocalizationDocument,
+    the location is already the GeoJSON point.
+    """
+
+    province: str
+    city: str
+    district: str | None = None
+    street: str | None = None
+    county: str | None = None
+    latitude: float | None = None
+    longitude: float | None = None
+    location: dict | None = None
+
+    @classmethod
+    def from_page(cls, properties: dict) -> "LocalizationRecord":
+        """
+        Extracts data about localization from already converted JSON
+        from the page to the dictionary.
+
+        :param properties: The dict containing the localization information
+        :return: The localization
+        """
+        address = properties["address"]
+        latitude, longitude = cls.extract_coordinates(properties)
+        location = None
+        if latitude is not None and longitude is not None:
+            location = {"type": "Point", "coordinates": [longitude, latitude]}
+        return cls(
+            province=address["province"]["code"],
+            city=address["city"]["code"],
+            district=cls.extract_district(address),
+            street=cls.extract_street(address),
+            county=cls.extract_county(address),
+            latitude=latitude,
+            longitude=longitude,
+            location=location,
+        )
+
+    @staticmethod
+    def extract_district(properties: dict) -> str:
+        """
+        Extracts the district from the properties.
+
+        :param properties: The properties containing the district
+        :return: The district
+        """
+        district = properties.get("district")
+        if isinstance(district, dict):
+            district = district["name"]
+        return district
+
+    @staticmethod
+    def extract_street(properties: dict) -> str:
+        """
+        Extracts the street from the properties.
+
+        :param properties: The properties containing the street
+        :return: The street
+        """
+        street = properties.get("street")
+        if isinstance(street, dict):
+            street = street["name"]
+            number = properties.get("number")
+            if number is not None:
+                street += " " + properties.get("number", "")
+        return street
+
+    @staticmethod
+    def extract_county(properties: dict) -> str:
+        """
+        Extracts the county from the properties.
+
+        :param properties: The properties containing the county
+        :return: The county
+        """
+        county = properties.get("county")
+        if isinstance(county, dict):
+            county = county["code"]
+        return county
+
+    @staticmethod
+    def extract_coordinates(properties: dict) -> tuple[float, float]:
+        """
+        Extracts the coordinates from the properties.
+
+        :param properties: The properties containing the coordinates
+        :return: The coordinates
+        """
+        coordinates = properties.get("coordinates")
+        if coordinates is None:
+            return None, None
+        latitude = coordinates.get("latitude")
+        longitude = coordinates.get("longitude")
+        return latitude, longitude
+
+
+@dataclass(slots=True)
+class PropertyRecord:
+    """
+    Property extracted from the listing page.
+
+    It has the same fields as the PropertyDocument which are known
+    from the page and the empty history, so it is converted
+    to the raw document without constructing the PropertyDocument.
+    """
+
+    link: str
+    promoted: bool
+    otodom_id: int
+    created_at: datetime | None
+    title: str
+    area: float | None
+    floor: str | None
+    price: int | None
+    price_per_meter: int | None
+    rooms: str | None
+    heating: str | None
+    extras: str | None
+    security_types: str | None
+    rent: int | None
+    property_type: PropertyType
+    market_type: MarketType
+    auction_type: AuctionType
+    localization: LocalizationRecord
+    construction_status: ConstructionStatus | None
+    building: BuildingRecord | None
+    offered_by: OfferedBy
+    history: list = field(default_factory=list)
+
+    @classmethod
+    def from_page(
+        cls, listing_information: dict, link: str, promoted: bool
+    ) -> "PropertyRecord":
+        """
+        Extracts the property from the data embedded in the listing page,
+        which is already decoded to the dictionary.
+
+        :param listing_information: The data embedded in the listing page
+        :param link: The link of the listing
+        :param promoted: Whether the listing is promoted
+        :return: The property
+        """
+        listing_properties = listing_information["props"]["pageProps"]["ad"]
+        target = listing_properties["target"]
+        return cls(
+            link=link,
+            promoted=promoted,
+            otodom_id=as_int(listing_properties["id"]),
+            created_at=cls.extract_created_at(listing_properties),
+            title=listing_properties["title"],
+            area=cls.extract_area(listing_properties),
+            floor=cls.extract_property_floor(target),
+            price=as_int(target.get("Price", None)),
+            price_per_meter=as_int(target.get("Price_per_m", None)),
+            rooms=cls.extract_rooms(target),
+            heating=cls.extract_heating(target),
+            extras=cls.extract_extras(target),
+            security_types=cls.extract_security_types(target),
+            rent=as_int(target.get("Rent", None)),
+            property_type=PROPERTY_TYPE_MAP[target["ProperType"]],
+            market_type=MarketType(target["MarketType"]),
+            auction_type=AUCTION_TYPE_MAP[target["OfferType"]],
+            localization=LocalizationRecord.from_page(listing_properties["location"]),
+            construction_status=cls.extract_construction_status(target),
+            building=BuildingRecord.from_page(target),
+            offered_by=cls.extract_offered_by(listing_properties),
+        )
+
+    @staticmethod
+    def extract_construction_status(properties: dict) -> ConstructionStatus | None:
+        """
+        Determines the construction status from the properties.
+
+        :param properties: The properties containing the construction status
+        :return: The construction status
+        """
+        if properties.get("ConstructionStatus") is None:
+            return None
+        return ConstructionStatus(properties["ConstructionStatus"])
+
+    @staticmethod
+    def extract_offered_by(properties: dict) -> OfferedBy:
+        """
+        Determines the offer type from the properties.
+
+        :param properties: The properties containing the offer type
+        :return: The offer type
+        """
+        return (
+            OfferedBy.PRIVATE
+            if properties["agency"] is None
+            else OfferedBy.ESTATE_AGENCY
+        )
+
+    @staticmethod
+    def extract_property_floor(properties: dict) -> str | None:
+        """
+        Extracts the floor of the property from the properties.
+
+        :param properties: The properties containing the floor of the property
+        :return: The floor of the property
+        """
+        floor = properties.get("Floor_no")
+        if floor is None:
+            return None
+        res = ""
+        for f in floor:
+            if "ground" in f:
+                res += "0" + ","
+            elif "higher_" in f:
+                res += "<" + f.split("_")[-1] + ","
+            elif "_" in f:
+                res += f.split("_")[-1] + ","
+            else:
+                res += f + ","
+        return res.removesuffix(",")
+
+    @staticmethod
+    def extract_extras(properties: dict) -> str | None:
+        """
+        Extracts the extras of the property from the properties.
+
+        :param properties: The properties containing the extras of the property
+        :return: The extras of the property
+        """
+        extras = properties.get("Extras_types")
+        if extras is None:
+            return None
+        return ",".join(extras)
+
+    @staticmethod
+    def extract_created_at(properties: dict) -> datetime | None:
+        """
+        Extracts the creation date of the property from the properties.
+
+        :param properties: The properties containing the creation date of the property
+        :return: The creation date of the property
+        """
+        created_at = properties.get("createdAt")
+        if created_at is None:
+            return None
+        return datetime.strptime(created_at, "%Y-%m-%dT%H:%M:%S%z")
+
+    @staticmethod
+    def extract_area(properties: dict) -> float | None:
+        """
+        Extracts the area of the property from the properties
+
+        :param properties: The properties containing the creation date of the property
+        :return: The area of the property
+        """
+        area = properties["target"].get("Area", None)
+        if area is None:
+            return None
+        return float(area)
+
+    @staticmethod
+    def extract_rooms(properties: dict) -> str | None:
+        """
+        Extracts the number of rooms of the property from the properties.
+
+        :param properties: The properties containing the number of rooms of the property
+        :return: The number of rooms of the property
+        """
+        rooms = properties.get("Rooms_num")
+        if rooms is None:
+            return None
+        return ",".join(rooms)
+
+    @staticmethod
+    def extract_heating(properties: dict) -> str | None:
+        """
+        Extracts the heating of the property from the properties.
+
+        :param properties: The properties containing the heating of the property
+        :return: The heating of the property
+        """
+        heating = properties.get("Heating")
+        if heating is None:
+            return None
+        return ",".join(heating)
+
+    @staticmethod
+    def extract_security_types(properties: dict) -> str | None:
+        """
+        Extracts the security types of the property from the properties.
+
+        :param properties: The properties containing the security types of the property
+        :return: The security types of the property
+        """
+        security_types = properties.get("Security_types")
+        if security_types is None:
+            return None
+        return ",".join(security_types)
+
+
+@dataclass(slots=True)
+class AgencyRecord:
+    """
+    Estate agency extracted from the listing page.
+
+    It has the same fields as the AgencyDocument.
+    """
+
+    name: str
+    otodom_id: int
+    street: str
+    city: str | None = None
+    province: str | None = None
+    postal_code: str | None = None
+    county: str | None = None
+
+    @classmethod
+    def from_page(cls, listing_information: dict) -> "AgencyRecord":
+        """
+        Extracts the agency from the data embedded in the listing page,
+        which is already decoded to the dictionary.
+
+        :param listing_information: The data embedded in the listing page
+        :return: The agency
+        """
+        agency_data = listing_information["props"]["pageProps"]["ad"]["agency"]
+        (
+            street,
+            postal_code,
+            city,
+            county,
+            province,
+        ) = cls.extract_estate_agency_address(agency_data)
+        return cls(
+            name=agency_data["name"],
+            otodom_id=as_int(agency_data["id"]),
+            street=street,
+            city=city,
+            province=province,
+            postal_code=postal_code,
+            county=county,
+        )
+
+    @staticmethod
+    def extract_estate_agency_address(
+        agency_data: dict,
+    ) -> tuple[str, str, str, str, str]:
+        """
+        Extracts the details of the estate agency from the properties.
+
+        There are three possible formats of the address:
+        1. city, postal_code, street, county, province
+        2. city, postal_code, street, province
+        3. _ , street, city, postal_code
+
+        :param properties: The properties containing the estate agency details
+        :return: The details of the estate agency
+        """
+        address_regex = r"^(.*?), (\d{2}-\d{3}), (.*), (.*), (.*)$"
+        address = agency_data["address"]
+        address_data = re.findall(address_regex, address)
+        if not address_data:
+            address_regex = r"^(.*?), (\d{2}-\d{3}), (.*), (.*)$"
+            address_data = re.findall(address_regex, address)
+            if not address_data:
+                address_regex = r"^(.*), (.*?), (.*), (\d{2}-\d{3})$"
+                address_data = re.findall(address_regex, address)
+                if not address_data:
+                    return address, None, None, None, None
+                address_data = address_data[0]
+                return (
+                    address_data[1],
+                    address_data[3],
+                    address_data[2],
+                    None,
+                    None,
+                )
+            address_data = address_data[0]
+            return (
+                address_data[0],
+                address_data[1],
+                address_data[2],
+                None,
+                address_data[3],
+            )
+        address_data = address_data[0]
+        return (
+            address_data[0],
+            address_data[1],
+            address_data[2],
+            address_data[3],
+            address_data[4],
+        )
+
+
+RECORD_TYPES = (PropertyRecord, LocalizationRecord, BuildingRecord, AgencyRecord)
+
+
+def to_raw(record: object) -> dict:
+    """
+    Converts the record to the raw document, the same as produced
+    by the to_mongo of the matching document.
+
+    The missing values are skipped, the enums are stored by their values
+    and the nested records are converted to the embedded documents.
+
+    :param record: The record extracted from the listing page
+    :return: The raw document ready to be written to the database
+    """
+    raw = {}
+    for name in record.__slots__:
+        value = getattr(record, name)
+        if value is None:
+            continue
+        if isinstance(value, Enum):
+            value = value.value
+        elif isinstance(value, RECORD_TYPES):
+            value = to_raw(value)
+        raw[name] = value
+    return raw
@@ -0,0 +1,174 @@
+from typing import Callable
+from typing import NamedTuple
+
+from common import Constans
+from models.agency import AgencyDocument
+from models.property import PropertyDocument
+from mongoengine import Document
+from mongoengine import EmbeddedDocument
+from mongoengine import EmbeddedDocumentField
+from mongoengine import PointField
+from mongoengine.base import BaseField
+
+
+class Column(NamedTuple):
+    """
+    Single column of the flattened document.
+
+    Attributes:
+        name (str): The name of the column, the same as produced by flatten_dict
+        path (tuple[str, ...]): The keys leading to the value in the raw document
+        field (BaseField): The field of the document holding the value
+    """
+
+    name: str
+    path: tuple[str, ...]
+    field: BaseField
+
+
+def document_columns(
+    document_cls: type[Document] | type[EmbeddedDocument],
+) -> list[Column]:
+    """
+    Lists the columns of the flattened document based on its schema.
+
+    The embedded documents are expanded to the columns prefixed
+    with the name of the field holding them. The GeoJSON points are skipped,
+    their coordinates have their own columns.
+
+    :param document_cls: The class of the document
+    :return: The columns of the document
+    """
+    columns = []
+    for name in document_cls._fields_ordered:
+        field = document_cls._fields[name]
+        if isinstance(field, PointField):
+            continue
+        if isinstance(field, EmbeddedDocumentField):
+            for column in document_columns(field.document_type):
+                columns.append(
+                    Column(
+                        name=field.db_field + "_" + column.name,
+                        path=(field.db_field,) + column.path,
+                        field=column.field,
+                    )
+                )
+        else:
+            columns.append(Column(field.db_field, (field.db_field,), field))
+    return columns
+
+
+def missing_fields(
+    document_cls: type[Document] | type[EmbeddedDocument], raw: dict
+) -> list[str]:
+    """
+    Lists the required fields missing in the raw document,
+    including the ones of its embedded documents.
+
+    It is the cheap replacement of the document validation
+    for the raw documents built without constructing the documents.
+
+    :param document_cls: The class of the document
+    :param raw: The raw document
+    :return: The paths of the missing fields
+    """
+    missing = []
+    for name, field in document_cls._fields.items():
+        value = raw.get(field.db_field)
+        if value is None:
+            if field.required:
+                missing.append(name)
+        elif isinstance(field, EmbeddedDocumentField):
+            missing.extend(
+                name + "." + path for path in missing_fields(field.document_type, value)
+            )
+    return missing
+
+
+def property_columns(include_agencies: bool = False) -> list[Column]:
+    """
+    Lists the columns of the flattened property,
+    optionally joined with its agency under the agency key.
+
+    :param include_agencies: Whether to include the columns of the agency
+    :return: The columns of the property
+    """
+    columns = document_columns(PropertyDocument)
+    if include_agencies:
+        columns += [
+            Column("agency_" + column.name, ("agency",) + column.path, column.field)
+            for column in document_columns(AgencyDocument)
+        ]
+    return columns
+
+
+def csv_columns() -> list[Column]:
+    """
+    Lists the columns of the flattened property joined with its agency
+    in the order of the Constans.CSV_KEYS.
+
+    :return: The columns of the csv files
+    """
+    columns = {column.name: column for column in property_columns(True)}
+    return [columns[name] for name in Constans.CSV_KEYS]
+
+
+EMPTY = {}
+
+
+def column_getter(path: tuple[str, ...]) -> Callable[[dict], object]:
+    """
+    Creates the function reading the value at the given path of the raw document.
+
+    The missing values and embedded documents are read as None.
+
+    :param path: The keys leading to the value
+    :return: The function reading the value
+    """
+    if len(path) == 1:
+        (key,) = path
+        return lambda document: document.get(key)
+    if len(path) == 2:
+        outer, inner = path
+        return lambda document: (document.get(outer) or EMPTY).get(inner)
+
+    def getter(document: dict) -> object:
+        for key in path:
+            document = (document or EMPTY).get(key)
+        return document
+
+    return getter
+
+
+class RowFlattener:
+    """
+    Flattens the raw documents to the fixed set of columns.
+
+    The accessors of the columns are compiled once from the document schema,
+    so every row is produced without the recursion and building of the keys.
+
+    >>> flatten = RowFlattener(property_columns())
+    >>> flatten({"title": "Flat", "localization": {"city": "warszawa"}})
+        {"_id": None, "link": None, ..., "localization_city": "warszawa", ...}
+    """
+
+    def __init__(self, columns: list[Column]):
+        """
+        Compile the accessors of the columns.
+
+        :param columns: The columns of the flattened rows
+        """
+        self.names = tuple(column.name for column in columns)
+        self.accessors = tuple(
+            (column.name, column_getter(column.path)) for column in columns
+        )
+
+    def __call__(self, document: dict) -> dict:
+        """
+        :param document: The raw document
+        :return: The flattened document
+        """
+        return {name: getter(document) for name, getter in self.accessors}
+
+
+CSV_FLATTENER = RowFlattener(csv_columns())
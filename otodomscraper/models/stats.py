@@ -0,0 +1,22 @@
+from mongoengine import DateTimeField
+from mongoengine import DictField
+from mongoengine import Document
+from mongoengine import ListField
+from mongoengine import StringField
+
+
+class StatsDocument(Document):
+    """
+    Class representing the cached market statistics in the MongoDB database.
+
+    The statistics are stored with the version of the properties
+    they were computed from, so they are computed again only
+    after the properties were written by the next crawl.
+    """
+
+    key = StringField(required=True, unique=True)
+    version = DateTimeField()
+    computed_at = DateTimeField(required=True)
+    groups = ListField(DictField())
+
+    meta = {"collection": "Stats"}
@@ -1,3 +1,6 @@
 from services.agency import AgencyService  # noqa F401
+from services.agency_cache import AgencyCache  # noqa F401
 from services.database import connect_to_database  # noqa F401
 from services.property import PropertyService  # noqa F401
+from services.stats import StatsService  # noqa F401
+from services.writer import BulkWriter  # noqa F401
@@ -1,6 +1,11 @@
 import logging
 
+from bson import DBRef
+from bson import ObjectId
 from models import AgencyDocument
+from models.schema import missing_fields
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +23,17 @@ class AgencyService:
         logger.info("Getting all agencies from database")
         return AgencyDocument.objects.all()
 
+    @classmethod
+    def get_all_raw(cls) -> list[dict]:
+        """
+        Reads the agencies with the raw pymongo cursor,
+        so no documents are constructed.
+
+        :return: All the agencies in the database as the raw dictionaries
+        """
+        logger.info("Getting all raw agencies from database")
+        return list(AgencyDocument._get_collection().find({}))
+
     @classmethod
     def get_by_otodom_id(cls, otodom_id: int) -> AgencyDocument | None:
         """
@@ -28,6 +44,57 @@ class AgencyService:
         """
         return AgencyDocument.objects(otodom_id=otodom_id).first()
 
+    @classmethod
+    def get_all_refs(cls) -> dict[int, DBRef]:
+        """
+        Reads only the otodom id and the id of the agencies
+        with the raw pymongo cursor.
+
+        :return: The references of all the agencies keyed by their otodom id
+        """
+        logger.info("Getting all agency references from database")
+        collection = AgencyDocument._get_collection()
+        return {
+            agency["otodom_id"]: DBRef(collection.name, agency["_id"])
+            for agency in collection.find({}, {"otodom_id": True})
+        }
+
+    @classmethod
+    def upsert_raw(cls, agency: dict) -> ObjectId | None:
+        """
+        Inserts the raw agency if it is not in the database yet.
+
+        The lookup and the insert are made with a single atomic operation,
+        so the agency is never inserted twice by the concurrent workers.
+
+        :param agency: The raw agency document
+        :return: The id of the stored agency
+            or None if the agency misses any of the required fields
+        """
+        missing = missing_fields(AgencyDocument, agency)
+        if missing:
+            logging.error(
+                f"""Failed to insert agency {agency.get("name")} to database
+            Missing fields: {missing}
+            Agency data: {agency}
+            """
+            )
+            return None
+        collection = AgencyDocument._get_collection()
+        try:
+            document = collection.find_one_and_update(
+                {"otodom_id": agency["otodom_id"]},
+                {"$setOnInsert": agency},
+                projection={"_id": True},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            document = collection.find_one(
+                {"otodom_id": agency["otodom_id"]}, {"_id": True}
+            )
+        return document["_id"]
+
     @classmethod
     def put(cls, agency: AgencyDocument) -> AgencyDocument:
         try:
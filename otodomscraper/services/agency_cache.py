@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+
+from bson import DBRef
+from models import AgencyDocument
+from services.agency import AgencyService
+
+logger = logging.getLogger(__name__)
+
+
+class AgencyCache:
+    """
+    In-process cache of the agency references keyed by their otodom id.
+
+    The cache is safe to be used from many threads at once. When many workers
+    find the same new agency, only one of them inserts it to the database
+    while the others wait for its reference.
+    """
+
+    def __init__(self):
+        """
+        Initialize the empty cache.
+        """
+        self.refs: dict[int, DBRef] = {}
+        self.inflight: dict[int, Future] = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def warm(self) -> None:
+        """
+        Loads the references of all the agencies in the database.
+        """
+        refs = AgencyService.get_all_refs()
+        with self.lock:
+            self.refs.update(refs)
+        logger.info(f"Loaded {len(refs)} agencies to the cache")
+
+    def lookup(self, agency: dict) -> tuple[DBRef | Future | None, bool]:
+        """
+        Looks up the agency, registering the insert of the unknown one.
+
+        :param agency: The raw agency extracted from the listing page
+        :return: The reference of the known agency, the future of the insert
+            in flight and whether the caller owns the insert
+        """
+        with self.lock:
+            ref = self.refs.get(agency["otodom_id"])
+            if ref is not None:
+                self.hits += 1
+                return ref, False
+            future = self.inflight.get(agency["otodom_id"])
+            if future is not None:
+                self.hits += 1
+                return future, False
+            self.misses += 1
+            future = self.inflight[agency["otodom_id"]] = Future()
+            return future, True
+
+    def insert(self, agency: dict, future: Future) -> DBRef | None:
+        """
+        Inserts the agency and resolves the future its waiters hold.
+
+        :param agency: The raw agency extracted from the listing page
+        :param future: The future of the insert registered by the lookup
+        :return: The reference of the stored agency
+            or None if the agency could not be inserted
+        """
+        ref = None
+        try:
+            inserted = AgencyService.upsert_raw(agency)
+            if inserted is not None:
+                ref = DBRef(AgencyDocument._get_collection_name(), inserted)
+        finally:
+            with self.lock:
+                if ref is not None:
+                    self.refs[agency["otodom_id"]] = ref
+                del self.inflight[agency["otodom_id"]]
+            future.set_result(ref)
+        return ref
+
+    def get_or_insert(self, agency: dict) -> DBRef | None:
+        """
+        Returns the reference of the agency, inserting it if it is not known yet.
+
+        :param agency: The raw agency extracted from the listing page
+        :return: The reference of the stored agency
+            or None if the agency could not be inserted
+        """
+        found, owner = self.lookup(agency)
+        if owner:
+            return self.insert(agency, found)
+        if isinstance(found, Future):
+            return found.result()
+        return found
+
+    async def get_or_insert_async(self, agency: dict) -> DBRef | None:
+        """
+        Asynchronous version of the get_or_insert.
+
+        The known agencies are returned without leaving the event loop and
+        the insert in flight is awaited on the loop, so only the insert itself
+        occupies a thread of the default executor.
+
+        :param agency: The raw agency extracted from the listing page
+        :return: The reference of the stored agency
+            or None if the agency could not be inserted
+        """
+        found, owner = self.lookup(agency)
+        if owner:
+            return await asyncio.to_thread(self.insert, agency, found)
+        if isinstance(found, Future):
+            return await asyncio.wrap_future(found)
+        return found
+
+    def stats(self) -> str:
+        """
+        :return: The summary of the cache hits and misses
+        """
+        return f"Agency cache: {self.hits} hits, {self.misses} misses"
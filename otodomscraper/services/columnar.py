@@ -0,0 +1,221 @@
+import json
+import logging
+from typing import Iterable
+
+from models.schema import Column
+from mongoengine import BooleanField
+from mongoengine import DateTimeField
+from mongoengine import EmbeddedDocumentField
+from mongoengine import EnumField
+from mongoengine import FloatField
+from mongoengine import IntField
+from mongoengine import ListField
+from mongoengine.base import BaseField
+
+try:
+    import pyarrow
+    import pyarrow.compute
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+
+def arrow_type(field: BaseField) -> "pyarrow.DataType":
+    """
+    Maps the field of the document to the Arrow data type.
+
+    The enums are dictionary encoded, the references and ids
+    are stored as strings. The lists of the embedded documents,
+    like the history of the property, are stored as the lists of the structs
+    and the dictionaries inside them as the JSON strings.
+
+    :param field: The field of the document
+    :return: The Arrow data type of the field
+    """
+    if isinstance(field, EnumField):
+        return pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+    if isinstance(field, BooleanField):
+        return pyarrow.bool_()
+    if isinstance(field, IntField):
+        return pyarrow.int64()
+    if isinstance(field, FloatField):
+        return pyarrow.float64()
+    if isinstance(field, DateTimeField):
+        return pyarrow.timestamp("ms", tz="UTC")
+    if isinstance(field, ListField):
+        return pyarrow.list_(arrow_type(field.field))
+    if isinstance(field, EmbeddedDocumentField):
+        document_cls = field.document_type
+        return pyarrow.struct(
+            [
+                pyarrow.field(
+                    document_cls._fields[name].db_field,
+                    arrow_type(document_cls._fields[name]),
+                )
+                for name in document_cls._fields_ordered
+            ]
+        )
+    return pyarrow.string()
+
+
+def arrow_schema(columns: list[Column]) -> "pyarrow.Schema":
+    """
+    :param columns: The columns of the flattened document
+    :return: The Arrow schema of the columns
+    """
+    return pyarrow.schema(
+        [pyarrow.field(column.name, arrow_type(column.field)) for column in columns]
+    )
+
+
+def enum_dictionaries(columns: list[Column]) -> dict[str, "pyarrow.Array"]:
+    """
+    Lists the values of the enums of the dictionary encoded columns.
+
+    Every batch is encoded against the same dictionary of all the enum values,
+    the Arrow IPC file does not allow the dictionary to change between batches.
+
+    :param columns: The columns of the flattened document
+    :return: The dictionaries of the enum columns keyed by their names
+    """
+    return {
+        column.name: pyarrow.array(
+            [str(member.value) for member in column.field._enum_cls],
+            type=pyarrow.string(),
+        )
+        for column in columns
+        if isinstance(column.field, EnumField)
+    }
+
+
+def to_arrow_value(value: object, data_type: "pyarrow.DataType") -> object:
+    """
+    Converts the raw value to the value of the nested Arrow type.
+
+    :param value: The raw value
+    :param data_type: The Arrow type of the value
+    :return: The value accepted by the Arrow array of the type
+    """
+    if value is None:
+        return None
+    if pyarrow.types.is_list(data_type):
+        return [to_arrow_value(item, data_type.value_type) for item in value]
+    if pyarrow.types.is_struct(data_type):
+        return {
+            field.name: to_arrow_value(value.get(field.name), field.type)
+            for field in data_type
+        }
+    if pyarrow.types.is_string(data_type):
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, ensure_ascii=False, default=str)
+        return str(value)
+    return value
+
+
+def to_record_batch(
+    rows: list[dict],
+    schema: "pyarrow.Schema",
+    dictionaries: dict[str, "pyarrow.Array"],
+) -> "pyarrow.RecordBatch":
+    """
+    Converts the flattened rows to the Arrow record batch.
+
+    :param rows: The flattened rows
+    :param schema: The Arrow schema of the rows
+    :param dictionaries: The dictionaries of the enum columns
+    :return: The record batch
+    """
+    arrays = []
+    for field in schema:
+        values = [row.get(field.name) for row in rows]
+        if pyarrow.types.is_dictionary(field.type):
+            dictionary = dictionaries[field.name]
+            values = [None if value is None else str(value) for value in values]
+            indices = pyarrow.compute.index_in(
+                pyarrow.array(values, type=pyarrow.string()), value_set=dictionary
+            )
+            arrays.append(pyarrow.DictionaryArray.from_arrays(indices, dictionary))
+            continue
+        if pyarrow.types.is_string(field.type):
+            values = [None if value is None else str(value) for value in values]
+        elif pyarrow.types.is_nested(field.type):
+            values = [to_arrow_value(value, field.type) for value in values]
+        arrays.append(pyarrow.array(values, type=field.type))
+    return pyarrow.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def write_batches(
+    writer, rows: Iterable[dict], columns: list[Column], schema, batch_size: int
+) -> int:
+    """
+    Writes the rows to the writer in the record batches.
+
+    :param writer: The Parquet or Arrow IPC writer
+    :param rows: The flattened rows
+    :param columns: The columns of the rows
+    :param schema: The Arrow schema of the rows
+    :param batch_size: The number of the rows in every batch
+    :return: The number of the written rows
+    """
+    dictionaries = enum_dictionaries(columns)
+    written = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            writer.write_batch(to_record_batch(batch, schema, dictionaries))
+            written += len(batch)
+            batch = []
+    if batch:
+        writer.write_batch(to_record_batch(batch, schema, dictionaries))
+        written += len(batch)
+    return written
+
+
+def require_pyarrow() -> None:
+    """
+    :raises ImportError: If the pyarrow is not installed
+    """
+    if pyarrow is None:
+        raise ImportError(
+            "The columnar export requires pyarrow. Install it with: pip install pyarrow"
+        )
+
+
+def write_parquet(
+    filename: str, columns: list[Column], rows: Iterable[dict], batch_size: int
+) -> None:
+    """
+    Writes the rows to the Parquet file, every batch as a separate row group.
+
+    :param filename: The name of the file
+    :param columns: The columns of the rows
+    :param rows: The flattened rows
+    :param batch_size: The number of the rows in every row group
+    """
+    require_pyarrow()
+    schema = arrow_schema(columns)
+    with pyarrow.parquet.ParquetWriter(filename, schema) as writer:
+        written = write_batches(writer, rows, columns, schema, batch_size)
+    logger.info(f"Written {written} rows to {filename}")
+
+
+def write_arrow(
+    filename: str, columns: list[Column], rows: Iterable[dict], batch_size: int
+) -> None:
+    """
+    Writes the rows to the Arrow IPC file in the record batches.
+
+    :param filename: The name of the file
+    :param columns: The columns of the rows
+    :param rows: The flattened rows
+    :param batch_size: The number of the rows in every batch
+    """
+    require_pyarrow()
+    schema = arrow_schema(columns)
+    with pyarrow.ipc.new_file(filename, schema) as writer:
+        written = write_batches(writer, rows, columns, schema, batch_size)
+    logger.info(f"Written {written} rows to {filename}")
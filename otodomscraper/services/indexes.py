@@ -0,0 +1,142 @@
+import logging
+from datetime import datetime
+from typing import NamedTuple
+
+from models import AgencyDocument
+from models import PropertyDocument
+from mongoengine import Document
+
+logger = logging.getLogger(__name__)
+
+INDEXED_DOCUMENTS = (PropertyDocument, AgencyDocument)
+
+
+class ServiceQuery(NamedTuple):
+    """
+    Query made by the services, which should be served by an index.
+
+    Attributes:
+        name (str): The description of the query
+        document (type[Document]): The document queried
+        filter (dict): The filter of the query
+        sort (list[tuple[str, int]] | None): The sort of the query
+    """
+
+    name: str
+    document: type[Document]
+    filter: dict
+    sort: list[tuple[str, int]] | None = None
+
+
+SERVICE_QUERIES = [
+    ServiceQuery(
+        "properties by otodom ids", PropertyDocument, {"otodom_id": {"$in": [0]}}
+    ),
+    ServiceQuery("property by link", PropertyDocument, {"link": ""}),
+    ServiceQuery(
+        "properties by city and price",
+        PropertyDocument,
+        {"localization.city": "", "price": {"$gte": 0, "$lte": 0}},
+    ),
+    ServiceQuery(
+        "properties by city, type and price",
+        PropertyDocument,
+        {
+            "localization.city": "",
+            "property_type": "",
+            "price": {"$gte": 0, "$lte": 0},
+        },
+    ),
+    ServiceQuery("properties by price", PropertyDocument, {"price": {"$lte": 0}}),
+    ServiceQuery("newest properties", PropertyDocument, {}, [("created_at", -1)]),
+    ServiceQuery("data version", PropertyDocument, {}, [("updated_at", -1)]),
+    ServiceQuery(
+        "properties changed since",
+        PropertyDocument,
+        {"updated_at": {"$gte": datetime(1970, 1, 1)}},
+    ),
+    ServiceQuery(
+        "properties by title", PropertyDocument, {"$text": {"$search": "mieszkanie"}}
+    ),
+    ServiceQuery(
+        "properties near a point",
+        PropertyDocument,
+        {
+            "localization.location": {
+                "$nearSphere": {
+                    "$geometry": {"type": "Point", "coordinates": [21.0, 52.2]},
+                    "$maxDistance": 1000,
+                }
+            }
+        },
+    ),
+    ServiceQuery("agencies by otodom ids", AgencyDocument, {"otodom_id": {"$in": [0]}}),
+]
+
+
+def ensure_indexes() -> None:
+    """
+    Creates the indexes declared by the documents which do not exist yet.
+
+    The indexes which exist in the database but are not declared
+    are only reported, they are never dropped.
+    """
+    for document in INDEXED_DOCUMENTS:
+        collection = document._get_collection()
+        logger.info(f"Ensuring indexes of {collection.name}")
+        document.ensure_indexes()
+        extra = document.compare_indexes()["extra"]
+        if extra:
+            logger.warning(f"Indexes of {collection.name} not declared: {extra}")
+        for name in collection.index_information():
+            logger.info(f"{collection.name} has index {name}")
+
+
+def plan_stages(plan: dict | list) -> list[str]:
+    """
+    Lists the stages of the query plan with the indexes they use.
+
+    :param plan: The query plan or any of its parts
+    :return: The stages, the index scans followed by the name of the index
+    """
+    stages = []
+    if isinstance(plan, list):
+        for part in plan:
+            stages.extend(plan_stages(part))
+        return stages
+    if "stage" in plan:
+        stage = plan["stage"]
+        if "indexName" in plan:
+            stage += " " + plan["indexName"]
+        stages.append(stage)
+    for value in plan.values():
+        if isinstance(value, (dict, list)):
+            stages.extend(plan_stages(value))
+    return stages
+
+
+def explain_query(query: ServiceQuery) -> list[str]:
+    """
+    :param query: The query made by the services
+    :return: The stages of the winning plan of the query
+    """
+    cursor = query.document._get_collection().find(query.filter)
+    if query.sort is not None:
+        cursor = cursor.sort(query.sort)
+    return plan_stages(cursor.explain()["queryPlanner"]["winningPlan"])
+
+
+def explain_service_queries() -> list[tuple[ServiceQuery, list[str]]]:
+    """
+    Explains the queries made by the services and checks
+    that none of them scans the whole collection.
+
+    :return: The queries with the stages of their winning plans
+    """
+    explained = []
+    for query in SERVICE_QUERIES:
+        stages = explain_query(query)
+        if "COLLSCAN" in stages:
+            logger.warning(f"Query {query.name} scans the whole collection")
+        explained.append((query, stages))
+    return explained
@@ -1,16 +1,65 @@
+import base64
 import csv
 import json
 import logging
+from datetime import datetime
+from datetime import timezone
+from textwrap import indent
+from typing import Iterable
+from typing import Iterator
+from typing import NamedTuple
 
+from bson import ObjectId
 from common import Constans
-from common import flatten_dict
 from models import PropertyDocument
+from models.schema import CSV_FLATTENER
+from models.schema import property_columns
+from models.schema import RowFlattener
 from mongoengine import QuerySet
+from pymongo import UpdateOne
 from services import AgencyService
+from services import columnar
+from services.writer import bulk_upsert
+from services.writer import BulkResult
 
 logger = logging.getLogger(__name__)
 
 
+class NearbyPage(NamedTuple):
+    """
+    Single page of the properties found near the point.
+
+    Attributes:
+        properties (list[dict]): The raw properties ordered by the distance,
+            every one of them with the distance in meters
+        cursor (str | None): The cursor of the next page
+            or None if there are no more properties
+    """
+
+    properties: list[dict]
+    cursor: str | None
+
+
+def encode_cursor(distance: float, ids: list[ObjectId]) -> str:
+    """
+    :param distance: The distance of the last property of the page
+    :param ids: The ids of the returned properties at that distance
+    :return: The opaque cursor of the next page
+    """
+    data = json.dumps({"distance": distance, "ids": [str(_id) for _id in ids]})
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[float, list[ObjectId]]:
+    """
+    :param cursor: The cursor of the page
+    :return: The distance of the last property of the previous page
+        and the ids of the returned properties at that distance
+    """
+    data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return data["distance"], [ObjectId(_id) for _id in data["ids"]]
+
+
 class PropertyService:
     """
     Service responsible for interacting with the property documents in the database.
@@ -37,11 +86,50 @@ class PropertyService:
     @classmethod
     def get_all_links(cls) -> set[PropertyDocument.link]:
         """
+        :return: All the links of the properties in the database
+        """
+        return cls.get_links_projection()
+
+    @classmethod
+    def get_links_projection(cls) -> set[PropertyDocument.link]:
+        """
+        Reads only the link field with the raw pymongo cursor,
+        so no documents are constructed.
+
         :return: All the links of the properties in the database
         """
         logger.info("Getting all property links from database")
-        properties: QuerySet = PropertyDocument.objects.all()
-        return {property_.link for property_ in properties}
+        cursor = PropertyDocument._get_collection().find({}, {"link": 1, "_id": 0})
+        return {property_["link"] for property_ in cursor}
+
+    @classmethod
+    def get_many_by_otodom_ids(
+        cls, otodom_ids: list[int], *fields: str
+    ) -> dict[int, dict]:
+        """
+        Resolves the batch of the properties with a single query
+        with the raw pymongo cursor, so no documents are constructed.
+
+        :param otodom_ids: The otodom ids of the properties
+        :param fields: The fields to load, all of them if not given
+        :return: The found raw properties keyed by their otodom id
+        """
+        projection = None
+        if fields:
+            projection = dict.fromkeys(fields + ("otodom_id",), 1)
+        cursor = PropertyDocument._get_collection().find(
+            {"otodom_id": {"$in": otodom_ids}}, projection
+        )
+        return {property_["otodom_id"]: property_ for property_ in cursor}
+
+    @classmethod
+    def get_index_entries(cls) -> QuerySet:
+        """
+        :return: The otodom id, link, price and promotion status
+            of every property in the database
+        """
+        logger.info("Getting property index entries from database")
+        return PropertyDocument.objects.scalar("otodom_id", "link", "price", "promoted")
 
     @classmethod
     def put(cls, property_: PropertyDocument) -> PropertyDocument:
@@ -61,65 +149,366 @@ class PropertyService:
             )
 
     @classmethod
-    def to_csv_file(cls, filename: str, include_agencies: bool = False) -> None:
+    def bulk_upsert(cls, properties: list[dict]) -> BulkResult:
         """
-        Saves the properties in the database to a csv file.
+        Inserts the properties which are not in the database yet
+        with a single bulk operation keyed on the otodom id.
 
-        :param filename: The name of the file
+        The changes of the properties which were already in the database
+        are recorded in their history.
+
+        :param properties: The raw property documents
+        :return: The ids of the inserted properties and the errors
+            of the rejected ones keyed by their index
         """
-        logger.info(f"Saving properties to {filename}. Format: csv")
-        properties = cls.get_all()
-        properties = [property_.to_mongo().to_dict() for property_ in properties]
+        now = datetime.now(timezone.utc)
+        for property_ in properties:
+            property_["updated_at"] = now
+        result = bulk_upsert(PropertyDocument._get_collection(), properties)
+        known = [
+            property_
+            for index, property_ in enumerate(properties)
+            if index not in result.inserted_ids and index not in result.errors
+        ]
+        if known:
+            cls.record_changes(known, now)
+        return result
+
+    @classmethod
+    def record_changes(cls, properties: list[dict], changed_at: datetime) -> int:
+        """
+        Updates the properties which changed since they were stored.
+
+        The stored properties are compared by their content hash first,
+        only the changed fields are set and the compact entry with the previous
+        values of the fields is pushed to the history, so the whole document
+        is not rewritten.
+
+        :param properties: The raw properties extracted again
+        :param changed_at: The time of the change
+        :return: The number of the changed properties
+        """
+        collection = PropertyDocument._get_collection()
+        stored = {
+            property_["otodom_id"]: property_
+            for property_ in collection.find(
+                {"otodom_id": {"$in": [p["otodom_id"] for p in properties]}},
+                {"history": 0},
+            )
+        }
+        operations = []
+        for property_ in properties:
+            previous = stored.get(property_["otodom_id"])
+            if previous is None or previous.get("content_hash") == property_.get(
+                "content_hash"
+            ):
+                continue
+            changes = PropertyDocument.diff_content(previous, property_)
+            update = {
+                "$set": {
+                    **{key: property_.get(key) for key in changes},
+                    "content_hash": property_.get("content_hash"),
+                    "updated_at": changed_at,
+                }
+            }
+            if changes:
+                update["$push"] = {
+                    "history": {
+                        "changed_at": changed_at,
+                        "price": property_.get("price"),
+                        "changes": changes,
+                    }
+                }
+            operations.append(UpdateOne({"_id": previous["_id"]}, update))
+        if operations:
+            collection.bulk_write(operations, ordered=False)
+            logger.info(f"Recorded changes of {len(operations)} properties")
+        return len(operations)
+
+    @classmethod
+    def iter_changed_since(
+        cls, since: datetime, batch_size: int = 1000
+    ) -> Iterator[dict]:
+        """
+        Iterates over the properties inserted or changed since the given time.
+
+        The query is served by the index of the update time and only
+        the identifying fields, the current price and the history are read.
+        The history is limited to the changes made since the given time.
+
+        :param since: The time from which the changes are returned
+        :param batch_size: The number of the properties fetched at once
+        :return: The raw properties with their recent history
+        """
+        if since.tzinfo is not None:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        cursor = PropertyDocument._get_collection().find(
+            {"updated_at": {"$gte": since}},
+            {"otodom_id": 1, "link": 1, "price": 1, "updated_at": 1, "history": 1},
+            batch_size=batch_size,
+        )
+        for property_ in cursor:
+            property_["history"] = [
+                entry
+                for entry in property_.get("history", [])
+                if entry["changed_at"] >= since
+            ]
+            yield property_
+
+    @classmethod
+    def backfill_locations(cls) -> int:
+        """
+        Sets the GeoJSON location of the properties stored before it was extracted.
+
+        The location is built from the coordinates by the database server
+        with a single update, so no property is transferred.
+
+        :return: The number of the updated properties
+        """
+        logger.info("Backfilling property locations")
+        result = PropertyDocument._get_collection().update_many(
+            {
+                "localization.location": {"$exists": False},
+                "localization.latitude": {"$type": "number"},
+                "localization.longitude": {"$type": "number"},
+            },
+            [
+                {
+                    "$set": {
+                        "localization.location": {
+                            "type": "Point",
+                            "coordinates": [
+                                "$localization.longitude",
+                                "$localization.latitude",
+                            ],
+                        }
+                    }
+                }
+            ],
+        )
+        logger.info(f"Backfilled locations of {result.modified_count} properties")
+        return result.modified_count
+
+    @classmethod
+    def find_near(
+        cls,
+        latitude: float,
+        longitude: float,
+        radius: float,
+        filters: dict | None = None,
+        cursor: str | None = None,
+        limit: int = 100,
+    ) -> NearbyPage:
+        """
+        Finds the properties within the radius of the point, the nearest first.
+
+        The query is served by the 2dsphere index of the location.
+        The pages are chained with the cursor holding the distance
+        of the last returned property, so every page starts where
+        the previous one ended instead of skipping the returned properties.
+
+        :param latitude: The latitude of the point
+        :param longitude: The longitude of the point
+        :param radius: The radius in meters
+        :param filters: The additional filter of the raw properties,
+            e.g. {"price": {"$lte": 500000}}
+        :param cursor: The cursor of the page, None for the first one
+        :param limit: The maximum number of the properties in the page
+        :return: The page of the properties with the distance in meters
+        """
+        query = dict(filters or {})
+        min_distance = 0.0
+        seen_ids = []
+        if cursor is not None:
+            min_distance, seen_ids = decode_cursor(cursor)
+            query["_id"] = {"$nin": seen_ids}
+        properties = list(
+            PropertyDocument._get_collection().aggregate(
+                [
+                    {
+                        "$geoNear": {
+                            "near": {
+                                "type": "Point",
+                                "coordinates": [longitude, latitude],
+                            },
+                            "key": "localization.location",
+                            "distanceField": "distance",
+                            "spherical": True,
+                            "minDistance": min_distance,
+                            "maxDistance": radius,
+                            "query": query,
+                        }
+                    },
+                    {"$limit": limit},
+                    {"$project": {"history": 0}},
+                ]
+            )
+        )
+        if len(properties) < limit:
+            return NearbyPage(properties, None)
+        last_distance = properties[-1]["distance"]
+        ids = [
+            property_["_id"]
+            for property_ in properties
+            if property_["distance"] == last_distance
+        ]
+        if last_distance == min_distance:
+            ids += seen_ids
+        return NearbyPage(properties, encode_cursor(last_distance, ids))
 
+    @staticmethod
+    def join_agencies(
+        properties: Iterable[dict], agencies: Iterable[dict]
+    ) -> Iterator[dict]:
+        """
+        Joins the raw properties with their raw agencies.
+
+        The agencies are kept in the dictionary keyed by their id,
+        so every property is joined with a single lookup.
+
+        :param properties: The raw properties
+        :param agencies: The raw agencies
+        :return: The properties with their agency under the agency key
+        """
+        agencies = {agency["_id"]: agency for agency in agencies}
+        for property_ in properties:
+            agency = agencies.get(property_.get("estate_agency"))
+            if agency is not None:
+                property_["agency"] = agency
+                property_.pop("estate_agency")
+            yield property_
+
+    @classmethod
+    def iter_export_rows(
+        cls,
+        include_agencies: bool = False,
+        batch_size: int = 1000,
+        flattener: RowFlattener = CSV_FLATTENER,
+    ) -> Iterator[dict]:
+        """
+        Iterates over the flattened properties with the raw pymongo cursor.
+
+        The properties are fetched from the database in batches,
+        so the memory usage does not depend on the size of the collection.
+        The agencies are joined with the dictionary keyed by their id
+        and every row is flattened to the columns of the flattener,
+        the columns of the csv files by default.
+
+        :param include_agencies: Whether to include the agencies of the properties
+        :param batch_size: The number of the properties fetched at once
+        :param flattener: The flattener of the rows
+        :return: The flattened properties
+        """
+        properties = PropertyDocument._get_collection().find({}, batch_size=batch_size)
         if include_agencies:
-            logger.info("Including agencies in the csv file")
-            agencies = AgencyService.get_all()
-            agencies = [agency.to_mongo().to_dict() for agency in agencies]
-            for property_ in properties:
-                estate_agency = property_.get("estate_agency")
-                if estate_agency is not None:
-                    agency_id = str(estate_agency)
-                    for agency in agencies:
-                        if str(agency["_id"]) == agency_id:
-                            property_["agency"] = agency
-                            property_.pop("estate_agency")
-                            break
+            logger.info("Including agencies in the export")
+            properties = cls.join_agencies(properties, AgencyService.get_all_raw())
+        for property_ in properties:
+            yield flattener(property_)
 
+    @classmethod
+    def to_csv_file(
+        cls, filename: str, include_agencies: bool = False, batch_size: int = 1000
+    ) -> None:
+        """
+        Saves the properties in the database to a csv file.
+
+        Every property is written as soon as it is read from the database.
+
+        :param filename: The name of the file
+        :param include_agencies: Whether to include the agencies of the properties
+        :param batch_size: The number of the properties fetched at once
+        """
+        logger.info(f"Saving properties to {filename}. Format: csv")
         with open(filename, "w", newline="", encoding="utf-8") as output_file:
             dict_writer = csv.DictWriter(output_file, Constans.CSV_KEYS)
             dict_writer.writeheader()
-            dict_writer.writerows([flatten_dict(property_) for property_ in properties])
+            for row in cls.iter_export_rows(include_agencies, batch_size):
+                dict_writer.writerow(row)
 
     @classmethod
-    def to_json_file(cls, filename: str, include_agencies: bool = False) -> None:
+    def to_json_file(
+        cls,
+        filename: str,
+        include_agencies: bool = False,
+        batch_size: int = 1000,
+        json_lines: bool = False,
+    ) -> None:
         """
         Saves the properties in the database to a json file.
 
+        Every property is written as soon as it is read from the database,
+        either as the element of the JSON array or as the separate line
+        in the JSON Lines format.
+
         :param filename: The name of the file
+        :param include_agencies: Whether to include the agencies of the properties
+        :param batch_size: The number of the properties fetched at once
+        :param json_lines: Whether to use the JSON Lines format
         """
         logger.info(f"Saving properties to {filename}. Format: json")
-        properties = cls.get_all()
-        properties = [listing.to_mongo().to_dict() for listing in properties]
+        rows = cls.iter_export_rows(include_agencies, batch_size)
+        with open(filename, "w", encoding="utf-8") as file:
+            if json_lines:
+                for row in rows:
+                    file.write(json.dumps(row, ensure_ascii=False, default=str))
+                    file.write("\n")
+                return
+            file.write("[")
+            separator = "\n"
+            for row in rows:
+                file.write(separator)
+                file.write(
+                    indent(
+                        json.dumps(row, ensure_ascii=False, default=str, indent=4),
+                        "    ",
+                    )
+                )
+                separator = ",\n"
+            file.write("\n]" if separator != "\n" else "]")
 
-        if include_agencies:
-            logger.info("Including agencies in the json file")
-            agencies = AgencyService.get_all()
-            agencies = [agency.to_mongo().to_dict() for agency in agencies]
-            for property_ in properties:
-                estate_agency = property_.get("estate_agency")
-                if estate_agency is not None:
-                    agency_id = str(estate_agency)
-                    for agency in agencies:
-                        if str(agency["_id"]) == agency_id:
-                            property_["agency"] = agency
-                            property_.pop("estate_agency")
-                            break
+    @classmethod
+    def to_parquet_file(
+        cls, filename: str, include_agencies: bool = False, batch_size: int = 10000
+    ) -> None:
+        """
+        Saves the properties in the database to a typed Parquet file.
 
-        with open(filename, "w", encoding="utf-8") as file:
-            json.dump(
-                [flatten_dict(property_) for property_ in properties],
-                file,
-                ensure_ascii=False,
-                default=str,
-                indent=4,
-            )
+        The properties are streamed from the database and written
+        in row groups of the batch size. Requires the pyarrow package.
+
+        :param filename: The name of the file
+        :param include_agencies: Whether to include the agencies of the properties
+        :param batch_size: The number of the properties in every row group
+        """
+        logger.info(f"Saving properties to {filename}. Format: parquet")
+        columns = property_columns(include_agencies)
+        columnar.write_parquet(
+            filename,
+            columns,
+            cls.iter_export_rows(include_agencies, batch_size, RowFlattener(columns)),
+            batch_size,
+        )
+
+    @classmethod
+    def to_arrow_file(
+        cls, filename: str, include_agencies: bool = False, batch_size: int = 10000
+    ) -> None:
+        """
+        Saves the properties in the database to a typed Arrow IPC file.
+
+        The properties are streamed from the database and written
+        in record batches of the batch size. Requires the pyarrow package.
+
+        :param filename: The name of the file
+        :param include_agencies: Whether to include the agencies of the properties
+        :param batch_size: The number of the properties in every record batch
+        """
+        logger.info(f"Saving properties to {filename}. Format: arrow")
+        columns = property_columns(include_agencies)
+        columnar.write_arrow(
+            filename,
+            columns,
+            cls.iter_export_rows(include_agencies, batch_size, RowFlattener(columns)),
+            batch_size,
+        )
@@ -0,0 +1,203 @@
+import json
+import logging
+from datetime import datetime
+from datetime import timezone
+
+from models import PropertyDocument
+from models.stats import StatsDocument
+
+logger = logging.getLogger(__name__)
+
+BUILD_YEAR_BUCKET = 10
+PERCENTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+METRICS = ("price", "price_per_meter")
+GROUP_FIELDS = {
+    "city": "$localization.city",
+    "district": "$localization.district",
+    "rooms": "$rooms",
+    "market_type": "$market_type",
+    "build_year": {
+        "$multiply": [
+            {"$floor": {"$divide": ["$building.build_year", BUILD_YEAR_BUCKET]}},
+            BUILD_YEAR_BUCKET,
+        ]
+    },
+}
+
+
+def percentile_name(percentile: float) -> str:
+    """
+    :param percentile: The percentile as the fraction
+    :return: The name of the percentile, e.g. p50 for 0.5
+    """
+    return f"p{round(percentile * 100)}"
+
+
+def nearest_rank(percentile: float) -> dict:
+    """
+    :param percentile: The percentile as the fraction
+    :return: The expression of the nearest rank of the percentile,
+        the smallest 1-based rank covering the fraction of the sorted values
+    """
+    return {"$max": [1, {"$ceil": {"$multiply": ["$count", percentile]}}]}
+
+
+def metric_pipeline(metric: str, group_by: tuple[str, ...], filters: dict) -> list:
+    """
+    Builds the pipeline computing the percentiles of the metric in every group.
+
+    The values are ranked within their group by the window stage,
+    and only the ones at the nearest ranks of the percentiles are kept
+    for the final group stage, so the values of a group are never
+    collected into one array. The window stage requires MongoDB 5.0+.
+
+    :param metric: The field of the property
+    :param group_by: The names of the group fields
+    :param filters: The filter of the raw properties
+    :return: The aggregation pipeline
+    """
+    whole_group = {"documents": ["unbounded", "unbounded"]}
+    return [
+        {"$match": {**filters, metric: {"$type": "number"}}},
+        {
+            "$project": {
+                "_id": 0,
+                "key": {name: GROUP_FIELDS[name] for name in group_by},
+                "value": "$" + metric,
+            }
+        },
+        {
+            "$setWindowFields": {
+                "partitionBy": "$key",
+                "sortBy": {"value": 1},
+                "output": {
+                    "rank": {"$documentNumber": {}},
+                    "count": {"$count": {}, "window": whole_group},
+                    "mean": {"$avg": "$value", "window": whole_group},
+                },
+            }
+        },
+        {
+            "$match": {
+                "$expr": {
+                    "$in": [
+                        "$rank",
+                        [1, "$count", *map(nearest_rank, PERCENTILES)],
+                    ]
+                }
+            }
+        },
+        {
+            "$group": {
+                "_id": "$key",
+                "count": {"$first": "$count"},
+                "mean": {"$first": "$mean"},
+                "min": {"$min": "$value"},
+                "max": {"$max": "$value"},
+                **{
+                    percentile_name(percentile): {
+                        "$max": {
+                            "$cond": [
+                                {"$eq": ["$rank", nearest_rank(percentile)]},
+                                "$value",
+                                None,
+                            ]
+                        }
+                    }
+                    for percentile in PERCENTILES
+                },
+            }
+        },
+    ]
+
+
+class StatsService:
+    """
+    Service computing the market statistics of the properties in the database.
+
+    The statistics are computed by the aggregation pipelines on the server
+    and cached in the database until the properties are written again,
+    so they are computed once per crawl run.
+
+    >>> StatsService.get_stats(("city", "district"), {"auction_type": "sale"})
+        [{"city": "warszawa", "district": "Mokotow",
+          "price": {"count": 120, "mean": ..., "min": ..., "p50": ..., ...},
+          "price_per_meter": {...}}, ...]
+    """
+
+    @classmethod
+    def data_version(cls) -> datetime | None:
+        """
+        :return: The time the properties were last written
+            or None if there are no properties
+        """
+        latest = (
+            PropertyDocument._get_collection()
+            .find({}, {"updated_at": 1})
+            .sort("updated_at", -1)
+            .limit(1)
+        )
+        for property_ in latest:
+            return property_.get("updated_at")
+        return None
+
+    @classmethod
+    def compute_stats(
+        cls, group_by: tuple[str, ...], filters: dict | None = None
+    ) -> list[dict]:
+        """
+        Computes the percentiles of the price and the price per meter
+        in every group.
+
+        :param group_by: The names of the group fields, any of the city,
+            district, rooms, market_type and build_year (bucketed by decades)
+        :param filters: The filter of the raw properties
+        :raises ValueError: If any of the group fields is not known
+        :return: The statistics of every group
+        """
+        unknown = set(group_by) - GROUP_FIELDS.keys()
+        if unknown:
+            raise ValueError(f"Unknown group fields: {sorted(unknown)}")
+        collection = PropertyDocument._get_collection()
+        groups = {}
+        for metric in METRICS:
+            pipeline = metric_pipeline(metric, group_by, filters or {})
+            for result in collection.aggregate(pipeline, allowDiskUse=True):
+                key = tuple(result["_id"].get(name) for name in group_by)
+                group = groups.setdefault(key, dict(zip(group_by, key)))
+                result.pop("_id")
+                group[metric] = result
+        return list(groups.values())
+
+    @classmethod
+    def get_stats(
+        cls, group_by: tuple[str, ...] = ("city",), filters: dict | None = None
+    ) -> list[dict]:
+        """
+        Reads the statistics from the cache or computes them
+        if the properties were written since they were cached.
+
+        :param group_by: The names of the group fields, any of the city,
+            district, rooms, market_type and build_year (bucketed by decades)
+        :param filters: The filter of the raw properties
+        :raises ValueError: If any of the group fields is not known
+        :return: The statistics of every group
+        """
+        key = json.dumps(
+            {"group_by": list(group_by), "filters": filters or {}},
+            sort_keys=True,
+            default=str,
+        )
+        version = cls.data_version()
+        cached = StatsDocument.objects(key=key).first()
+        if cached is not None and cached.version == version:
+            return cached.groups
+        logger.info(f"Computing statistics {key}")
+        groups = cls.compute_stats(group_by, filters)
+        StatsDocument.objects(key=key).update_one(
+            set__version=version,
+            set__computed_at=datetime.now(timezone.utc),
+            set__groups=groups,
+            upsert=True,
+        )
+        return groups
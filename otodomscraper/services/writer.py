@@ -0,0 +1,176 @@
+import logging
+import threading
+from typing import Any
+from typing import Callable
+from typing import NamedTuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+
+class BulkResult(NamedTuple):
+    """
+    Result of the bulk write of the batch of the documents.
+
+    Attributes:
+        inserted_ids (dict[int, ObjectId]): The ids of the inserted documents
+            keyed by their index in the batch
+        errors (dict[int, str]): The errors of the documents which
+            could not be written keyed by their index in the batch
+    """
+
+    inserted_ids: dict[int, ObjectId]
+    errors: dict[int, str]
+
+
+def bulk_upsert(
+    collection: Collection, documents: list[dict], key: str = "otodom_id"
+) -> BulkResult:
+    """
+    Inserts the documents which do not exist yet with a single bulk operation.
+
+    Every document is upserted by the given key, so the documents
+    which are already in the collection are left untouched.
+    The documents rejected by the database are reported in the errors,
+    the rest of the batch is still written.
+
+    :param collection: The collection to write to
+    :param documents: The raw documents to write
+    :param key: The field identifying the document
+    :return: The ids of the inserted documents and the errors
+        of the rejected ones keyed by their index in the batch
+    """
+    operations = [
+        UpdateOne({key: document[key]}, {"$setOnInsert": document}, upsert=True)
+        for document in documents
+    ]
+    try:
+        result = collection.bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        errors = {error["index"]: error["errmsg"] for error in e.details["writeErrors"]}
+        logger.error(f"Failed to write {len(errors)} documents to {collection.name}")
+        return BulkResult(
+            {
+                upserted["index"]: upserted["_id"]
+                for upserted in e.details["upserted"]
+                if upserted["index"] not in errors
+            },
+            errors,
+        )
+    return BulkResult(result.upserted_ids, {})
+
+
+class BulkWriter:
+    """
+    Buffered writer of the documents to the database.
+
+    The raw documents are collected in the buffer, which is flushed
+    with a single bulk operation when it reaches the batch size or when
+    the flush interval passes. The batch which could not be written
+    is put back to the buffer and written again by the next flush.
+    The writer is safe to be used from many threads at once.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[list[dict]], BulkResult],
+        batch_size: int,
+        flush_interval: float,
+        on_inserted: Callable[[list[tuple[dict, Any]]], None] = None,
+    ):
+        """
+        Initialize the writer and start the background flushing.
+
+        :param flush: The function writing the batch of the documents, which returns
+            the ids of the inserted documents and the errors of the rejected ones
+        :param batch_size: The number of the documents flushed at once
+        :param flush_interval: The maximum number of seconds between the flushes
+        :param on_inserted: The function called with the inserted documents
+            and their contexts after every flush
+        """
+        self.flush_fn = flush
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_inserted = on_inserted
+        self.buffer: list[tuple[dict, Any]] = []
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.flush_periodically, daemon=True)
+        self.thread.start()
+
+    def add_raw(self, document: dict, context: Any = None) -> None:
+        """
+        Adds the already validated raw document to the buffer.
+
+        :param document: The raw document to write
+        :param context: The object passed back to on_inserted with the document
+        """
+        with self.lock:
+            self.buffer.append((document, context))
+            if len(self.buffer) < self.batch_size:
+                return
+            batch, self.buffer = self.buffer, []
+        self.write(batch)
+
+    def flush(self) -> None:
+        """
+        Writes all of the buffered documents.
+        """
+        with self.lock:
+            batch, self.buffer = self.buffer, []
+        if batch:
+            self.write(batch)
+
+    def write(self, batch: list[tuple[dict, Any]]) -> None:
+        """
+        Writes the batch of the documents to the database.
+
+        If the write fails, the batch is put back to the front of the buffer.
+
+        :param batch: The documents with their contexts
+        """
+        documents = [document for document, _ in batch]
+        try:
+            result = self.flush_fn(documents)
+        except Exception as e:
+            logger.exception(f"Failed to write {len(documents)} documents: {e}")
+            with self.lock:
+                self.buffer[:0] = batch
+            return
+        logger.info(
+            f"Flushed {len(documents)} documents, "
+            f"{len(result.inserted_ids)} were inserted, "
+            f"{len(result.errors)} were rejected"
+        )
+        if self.on_inserted is None:
+            return
+        inserted = []
+        for index, _id in result.inserted_ids.items():
+            document, context = batch[index]
+            document["_id"] = _id
+            inserted.append((document, context))
+        self.on_inserted(inserted)
+
+    def flush_periodically(self) -> None:
+        """
+        Flushes the buffer every flush interval until the writer is closed.
+        """
+        while not self.stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.exception(f"Failed to flush the documents: {e}")
+
+    def close(self) -> None:
+        """
+        Stops the background flushing and writes the remaining documents.
+        """
+        self.stopped.set()
+        self.thread.join()
+        self.flush()
+        if self.buffer:
+            logger.error(f"Failed to write {len(self.buffer)} documents")
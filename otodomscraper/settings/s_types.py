@@ -1,4 +1,5 @@
 from enum import Enum
+from typing import NamedTuple
 
 
 class PropertyType(Enum):
@@ -16,3 +17,52 @@ class PropertyType(Enum):
 class AuctionType(Enum):
     SALE = "sprzedaz"
     RENT = "wynajem"
+
+
+class SearchSpec(NamedTuple):
+    """
+    Single search crawled by the crawler.
+
+    Attributes:
+        price_min (int): The minimum property price filter.
+        price_max (int): The maximum property price filter.
+        province (str): The province of the search.
+        city (str): The city of the search.
+        district (str | None): The district of the search.
+        property_type (PropertyType): The property type of the search.
+        auction_type (AuctionType): The auction type of the search.
+    """
+
+    price_min: int
+    price_max: int
+    province: str
+    city: str
+    district: str | None
+    property_type: PropertyType
+    auction_type: AuctionType
+
+    def split(self) -> tuple["SearchSpec", "SearchSpec"] | None:
+        """
+        Splits the price range of the search in halves.
+
+        :return: The searches of the lower and the upper half of the price range
+            or None if the range cannot be split anymore
+        """
+        if self.price_max - self.price_min < 1:
+            return None
+        middle = (self.price_min + self.price_max) // 2
+        return (
+            self._replace(price_max=middle),
+            self._replace(price_min=middle + 1),
+        )
+
+    def __str__(self) -> str:
+        parts = [
+            self.auction_type.value,
+            self.property_type.value,
+            self.province,
+            self.city,
+            self.district,
+        ]
+        search = "/".join(part for part in parts if part)
+        return f"{search} ({self.price_min}-{self.price_max})"
@@ -1,9 +1,11 @@
 import json
 import logging
 
+from common import ArchiveMode
 from common import Constans
 from settings.s_types import AuctionType
 from settings.s_types import PropertyType
+from settings.s_types import SearchSpec
 from settings.utils import AVAILABLE_PROVINCES
 from settings.utils import get_auction_type
 from settings.utils import get_property_type
@@ -30,6 +32,66 @@ class Settings:
         district (str): The selected district for property search. Defaults to None.
         property_type (str): The selected property type for filtering.
         Defaults to "mieszkanie".
+        searches (list[SearchSpec]): The searches crawled in one run.
+        Every search may override the price, province, city, district,
+        property type and auction type above. Defaults to the single search
+        defined by them.
+        max_pages (int): The number of the search pages served by the website
+        for a single search. The searches with more pages are split
+        by the price. Defaults to 100.
+        max_concurrent_requests (int): The limit of the requests made at once
+        to the website. Defaults to 100.
+        queue_size (int): The number of the listings found at the search pages
+        which may wait for the extraction. Defaults to 1000.
+        parse_workers (int): The number of the processes extracting
+        the listings from the fetched pages. If 0, the listings are extracted
+        in the fetching threads. Defaults to 0.
+        incremental (bool): Whether only the listings which are new or changed
+        since the previous run are extracted. Defaults to False.
+        index_path (str): The path of the seen listings index used
+        in the incremental mode. Defaults to "seen_index.bin".
+        track_changes (bool): Whether the known listings with a different price
+        at the search page are extracted again and their changes are recorded
+        in the history. Defaults to False.
+        write_batch_size (int): The number of the properties written
+        to the database at once. Defaults to 100.
+        write_flush_interval (float): The maximum number of seconds the properties
+        wait to be written to the database. Defaults to 5.
+        rate_limit (float): The number of the requests per second made
+        to the website. Defaults to 20.
+        rate_burst (int): The number of the requests which may exceed
+        the rate limit at once. Defaults to 40.
+        initial_concurrency (int): The number of the requests made at once
+        at the start of the crawl. Defaults to 10.
+        min_concurrency (int): The lowest number of the requests made at once.
+        Defaults to 1.
+        latency_threshold (float): The latency in seconds after which
+        the number of the requests made at once is decreased. Defaults to 5.
+        max_attempts (int): The number of the attempts made to fetch the page
+        before giving up. Defaults to 3.
+        backoff_base (float): The delay in seconds before the first retry,
+        doubled with every next attempt. Defaults to 0.5.
+        backoff_max (float): The highest delay in seconds between the attempts.
+        Defaults to 30.
+        request_timeout (float): The timeout of the request in seconds.
+        Defaults to 10.
+        http_cache (bool): Whether the fetched pages are cached on the disk
+        and requested again conditionally. Defaults to False.
+        http_cache_path (str): The path of the HTTP cache.
+        Defaults to "http_cache.sqlite".
+        http_cache_max_size (int): The maximum size of the HTTP cache
+        in megabytes. Defaults to 1024.
+        archive_mode (ArchiveMode): Whether the responses are recorded
+        to the archive, or replayed from it instead of making the requests.
+        Defaults to ArchiveMode.OFF.
+        archive_path (str): The path of the crawl archive.
+        Defaults to "crawl_archive.tar.gz".
+        checkpoint (bool): Whether the state of the crawl is checkpointed,
+        so the interrupted crawl is resumed by the next run. Defaults to False.
+        checkpoint_path (str): The path of the crawl checkpoint.
+        Defaults to "crawl_checkpoint.sqlite".
+        checkpoint_max_retries (int): The number of the runs retrying
+        the listing which could not be fetched. Defaults to 3.
 
     These default values are defined in the Defaults class.
 
@@ -60,6 +122,46 @@ class Settings:
                 self.district = self.__init_district(crawler_settings)
                 self.property_type = self.__init_property_type(crawler_settings)
                 self.auction_type = self.__init_auction_type(crawler_settings)
+                self.searches = self.__init_searches(crawler_settings)
+                self.max_pages = self.__init_max_pages(crawler_settings)
+                self.max_concurrent_requests = self.__init_max_concurrent_requests(
+                    crawler_settings
+                )
+                self.queue_size = self.__init_queue_size(crawler_settings)
+                self.parse_workers = self.__init_parse_workers(crawler_settings)
+                self.incremental = self.__init_incremental(crawler_settings)
+                self.index_path = self.__init_index_path(crawler_settings)
+                self.track_changes = self.__init_track_changes(crawler_settings)
+                self.write_batch_size = self.__init_write_batch_size(crawler_settings)
+                self.write_flush_interval = self.__init_write_flush_interval(
+                    crawler_settings
+                )
+                (
+                    self.rate_limit,
+                    self.rate_burst,
+                    self.initial_concurrency,
+                    self.min_concurrency,
+                    self.latency_threshold,
+                ) = self.__init_throttle(crawler_settings, self.max_concurrent_requests)
+                (
+                    self.max_attempts,
+                    self.backoff_base,
+                    self.backoff_max,
+                    self.request_timeout,
+                ) = self.__init_retry(crawler_settings)
+                (
+                    self.http_cache,
+                    self.http_cache_path,
+                    self.http_cache_max_size,
+                ) = self.__init_http_cache(crawler_settings)
+                self.archive_mode, self.archive_path = self.__init_archive(
+                    crawler_settings
+                )
+                (
+                    self.checkpoint,
+                    self.checkpoint_path,
+                    self.checkpoint_max_retries,
+                ) = self.__init_checkpoint(crawler_settings)
                 self.mongo_db_host = self.__init_mongo_db_host(settings["database"])
 
         except Exception as e:
@@ -215,6 +317,460 @@ class Settings:
             return Constans.DEFAULT_AUCTION_TYPE
         return auction_type
 
+    @classmethod
+    def __init_search(cls, settings: dict) -> SearchSpec:
+        """
+        Initialize the single search from the settings dictionary.
+
+        :param settings: A dictionary containing the settings of the search
+        :return: The search
+        """
+        price_min, price_max = cls.__init_price(settings)
+        return SearchSpec(
+            price_min=price_min,
+            price_max=price_max,
+            province=cls.__init_province(settings),
+            city=cls.__init_city(settings),
+            district=cls.__init_district(settings),
+            property_type=cls.__init_property_type(settings),
+            auction_type=cls.__init_auction_type(settings),
+        )
+
+    def __init_searches(self, settings: dict) -> list[SearchSpec]:
+        """
+        Initialize the searches from the settings dictionary.
+
+        Every search is a dictionary overriding the search defined
+        at the top level of the settings. If the searches are not defined
+        or empty, only the top level search is crawled. If the searches are not a list
+        of dictionaries, a warning message is logged and the incorrect ones
+        are skipped.
+
+        :param settings: A dictionary containing the settings
+        :return: The searches
+        """
+        default_search = SearchSpec(
+            price_min=self.price_min,
+            price_max=self.price_max,
+            province=self.province,
+            city=self.city,
+            district=self.district,
+            property_type=self.property_type,
+            auction_type=self.auction_type,
+        )
+        searches = settings.get("searches")
+        if not searches:
+            return [default_search]
+        if not isinstance(searches, list):
+            logger.warning("Searches is not of list type. Searches are set to default")
+            return [default_search]
+
+        result = []
+        for search in searches:
+            if not isinstance(search, dict):
+                logger.warning(f"Search {search} is not of dict type. Skipping")
+                continue
+            result.append(self.__init_search({**settings, **search}))
+        if not result:
+            logger.warning("No correct searches. Searches are set to default")
+            return [default_search]
+        return list(dict.fromkeys(result))
+
+    @staticmethod
+    def __init_max_pages(settings: dict) -> int:
+        """
+        Initialize the number of the pages served for a single search
+        from the settings dictionary.
+
+        If the number is not a positive integer,
+        a warning message is logged and the default number is returned.
+
+        :param settings: A dictionary containing the settings
+        :return: The number of the pages served for a single search
+        """
+        max_pages = settings.get("max_pages")
+        if not isinstance(max_pages, int) or max_pages < 1:
+            logger.warning("Max pages is not correct. Max pages is set to default")
+            return Constans.DEFAULT_MAX_PAGES
+        return max_pages
+
+    @staticmethod
+    def __init_max_concurrent_requests(settings: dict) -> int:
+        """
+        Initialize the limit of the concurrent requests from the settings dictionary.
+
+        If the limit is not a positive integer,
+        a warning message is logged and the default limit is returned.
+
+        :param settings: A dictionary containing the settings
+        :return: The limit of the concurrent requests
+        """
+        max_concurrent_requests = settings.get("max_concurrent_requests")
+        if not isinstance(max_concurrent_requests, int) or max_concurrent_requests < 1:
+            logger.warning(
+                "Max concurrent requests is not correct. "
+                "Max concurrent requests is set to default"
+            )
+            return Constans.DEFAULT_MAX_CONCURRENT_REQUESTS
+        return max_concurrent_requests
+
+    @staticmethod
+    def __init_queue_size(settings: dict) -> int:
+        """
+        Initialize the size of the listings queue from the settings dictionary.
+
+        If the size is not a positive integer,
+        a warning message is logged and the default size is returned.
+
+        :param settings: A dictionary containing the settings
+        :return: The size of the listings queue
+        """
+        queue_size = settings.get("queue_size")
+        if not isinstance(queue_size, int) or queue_size < 1:
+            logger.warning("Queue size is not correct. Queue size is set to default")
+            return Constans.DEFAULT_QUEUE_SIZE
+        return queue_size
+
+    @staticmethod
+    def __init_parse_workers(settings: dict) -> int:
+        """
+        Initialize the number of the parse worker processes
+        from the settings dictionary.
+
+        If the number is not a non-negative integer,
+        a warning message is logged and the default number is returned.
+
+        :param settings: A dictionary containing the settings
+        :return: The number of the parse worker processes
+        """
+        parse_workers = settings.get("parse_workers")
+        if (
+            not isinstance(parse_workers, int)
+            or isinstance(parse_workers, bool)
+            or parse_workers < 0
+        ):
+            logger.warning(
+                "Parse workers is not correct. Parse workers is set to default"
+            )
+            return Constans.DEFAULT_PARSE_WORKERS
+        return parse_workers
+
+    @staticmethod
+    def __init_incremental(settings: dict) -> bool:
+        """
+        Initialize the incremental mode flag from the settings dictionary.
+
+        If the flag is not a boolean,
+        a warning message is logged and the default flag is returned.
+
+        :param settings: A dictionary containing the settings
+        :return: Whether the incremental mode is enabled
+        """
+        incremental = settings.get("incremental")
+        if not isinstance(incremental, bool):
+            logger.warning("Incremental is not correct. Incremental is set to default")
+            return Constans.DEFAULT_INCREMENTAL
+        return incremental
+
+    @staticmethod
+    def __init_track_changes(settings: dict) -> bool:
+        """
+        Initialize the change tracking flag from the settings dictionary.
+
+        If the flag is not a boolean,
+        a warning message is logged and the default flag is returned.
+
+        :param settings: A dictionary containing the settings
+        :return: Whether the changes of the known listings are recorded
+        """
+        track_changes = settings.get("track_changes")
+        if not isinstance(track_changes, bool):
+            logger.warning(
+                "Track changes is not correct. Track changes is set to default"
+            )
+            return Constans.DEFAULT_TRACK_CHANGES
+        return track_changes
+
+    @staticmethod
+    def __init_index_path(settings: dict) -> str:
+        """
+        Initialize the path of the seen listings index from the settings dictionary.
+
+        If the path is not a string,
+        a warning message is logged and the default path is returned.
+
+        :param settings: A dictionary containing the settings
+        :return: The path of the index
+        """
+        index_path = settings.get("index_path")
+        if not isinstance(index_path, str) or index_path == "":
+            logger.warning("Index path is not correct. Index path is set to default")
+            return Constans.DEFAULT_INDEX_PATH
+        return index_path
+
+    @staticmethod
+    def __init_write_batch_size(settings: dict) -> int:
+        """
+        Initialize the size of the database writes from the settings dictionary.
+
+        If the size is not a positive integer,
+        a warning message is logged and the default size is returned.
+
+        :param settings: A dictionary containing the settings
+        :return: The number of the properties written at once
+        """
+        write_batch_size = settings.get("write_batch_size")
+        if not isinstance(write_batch_size, int) or write_batch_size < 1:
+            logger.warning(
+                "Write batch size is not correct. Write batch size is set to default"
+            )
+            return Constans.DEFAULT_WRITE_BATCH_SIZE
+        return write_batch_size
+
+    @staticmethod
+    def __init_write_flush_interval(settings: dict) -> float:
+        """
+        Initialize the interval of the database writes from the settings dictionary.
+
+        If the interval is not a positive number,
+        a warning message is logged and the default interval is returned.
+
+        :param settings: A dictionary containing the settings
+        :return: The maximum number of seconds between the writes
+        """
+        write_flush_interval = settings.get("write_flush_interval")
+        if (
+            not isinstance(write_flush_interval, (int, float))
+            or write_flush_interval <= 0
+        ):
+            logger.warning(
+                "Write flush interval is not correct. "
+                "Write flush interval is set to default"
+            )
+            return Constans.DEFAULT_WRITE_FLUSH_INTERVAL
+        return float(write_flush_interval)
+
+    @staticmethod
+    def __init_throttle(
+        settings: dict, max_concurrent_requests: int
+    ) -> (float, int, int, int, float):
+        """
+        Initialize the throttle of the requests from the settings dictionary.
+
+        If the throttle is not a dictionary, a warning message is logged
+        and the default values are returned. Every value which is not
+        a positive number is set to default separately. The concurrency limits
+        cannot exceed the max_concurrent_requests.
+
+        :param settings: A dictionary containing the settings
+        :param max_concurrent_requests: The highest number of the concurrent requests
+        :return: A tuple containing the rate limit, the rate burst,
+            the initial concurrency, the minimum concurrency
+            and the latency threshold
+        """
+        throttle = settings.get("throttle")
+        if not isinstance(throttle, dict):
+            logger.warning("Throttle is not of dict type. Throttle is set to default")
+            throttle = {}
+
+        def positive(key: str, default: float, types: tuple) -> float:
+            value = throttle.get(key)
+            if value is None:
+                return default
+            if not isinstance(value, types) or value <= 0:
+                logger.warning(
+                    f"Throttle {key} is not correct. Throttle {key} is set to default"
+                )
+                return default
+            return value
+
+        rate_limit = float(positive("rate", Constans.DEFAULT_RATE_LIMIT, (int, float)))
+        rate_burst = positive("burst", Constans.DEFAULT_RATE_BURST, (int,))
+        min_concurrency = min(
+            positive("min_concurrency", Constans.DEFAULT_MIN_CONCURRENCY, (int,)),
+            max_concurrent_requests,
+        )
+        initial_concurrency = min(
+            max(
+                positive(
+                    "initial_concurrency", Constans.DEFAULT_INITIAL_CONCURRENCY, (int,)
+                ),
+                min_concurrency,
+            ),
+            max_concurrent_requests,
+        )
+        latency_threshold = float(
+            positive(
+                "latency_threshold", Constans.DEFAULT_LATENCY_THRESHOLD, (int, float)
+            )
+        )
+        return (
+            rate_limit,
+            rate_burst,
+            initial_concurrency,
+            min_concurrency,
+            latency_threshold,
+        )
+
+    @staticmethod
+    def __init_retry(settings: dict) -> (int, float, float, float):
+        """
+        Initialize the retry policy of the requests from the settings dictionary.
+
+        If the retry is not a dictionary, a warning message is logged
+        and the default values are returned. Every value which is not
+        a positive number is set to default separately.
+
+        :param settings: A dictionary containing the settings
+        :return: A tuple containing the maximum number of the attempts,
+            the base and the maximum backoff and the timeout of the request
+        """
+        retry = settings.get("retry")
+        if not isinstance(retry, dict):
+            logger.warning("Retry is not of dict type. Retry is set to default")
+            retry = {}
+
+        def positive(key: str, default: float, types: tuple) -> float:
+            value = retry.get(key)
+            if value is None:
+                return default
+            if not isinstance(value, types) or value <= 0:
+                logger.warning(
+                    f"Retry {key} is not correct. Retry {key} is set to default"
+                )
+                return default
+            return value
+
+        max_attempts = positive("max_attempts", Constans.DEFAULT_MAX_ATTEMPTS, (int,))
+        backoff_base = float(
+            positive("backoff_base", Constans.DEFAULT_BACKOFF_BASE, (int, float))
+        )
+        backoff_max = float(
+            positive("backoff_max", Constans.DEFAULT_BACKOFF_MAX, (int, float))
+        )
+        request_timeout = float(
+            positive("timeout", Constans.DEFAULT_REQUEST_TIMEOUT, (int, float))
+        )
+        return (
+            max_attempts,
+            backoff_base,
+            max(backoff_base, backoff_max),
+            request_timeout,
+        )
+
+    @staticmethod
+    def __init_http_cache(settings: dict) -> (bool, str, int):
+        """
+        Initialize the HTTP cache from the settings dictionary.
+
+        If the HTTP cache is not a dictionary or any of its values
+        is not correct, a warning message is logged
+        and the default value is returned.
+
+        :param settings: A dictionary containing the settings
+        :return: A tuple containing whether the cache is enabled,
+            its path and its maximum size in megabytes
+        """
+        http_cache = settings.get("http_cache")
+        if not isinstance(http_cache, dict):
+            logger.warning(
+                "Http cache is not of dict type. Http cache is set to default"
+            )
+            return (
+                Constans.DEFAULT_HTTP_CACHE,
+                Constans.DEFAULT_HTTP_CACHE_PATH,
+                Constans.DEFAULT_HTTP_CACHE_MAX_SIZE,
+            )
+
+        enabled = http_cache.get("enabled")
+        path = http_cache.get("path")
+        max_size = http_cache.get("max_size_mb")
+
+        if not isinstance(enabled, bool):
+            logger.warning("Http cache enabled is not of bool type. Set to default")
+            enabled = Constans.DEFAULT_HTTP_CACHE
+        if not isinstance(path, str) or not path:
+            logger.warning("Http cache path is not correct. Set to default")
+            path = Constans.DEFAULT_HTTP_CACHE_PATH
+        if not isinstance(max_size, int) or max_size <= 0:
+            logger.warning("Http cache max size is not correct. Set to default")
+            max_size = Constans.DEFAULT_HTTP_CACHE_MAX_SIZE
+
+        return enabled, path, max_size
+
+    @staticmethod
+    def __init_archive(settings: dict) -> (ArchiveMode, str):
+        """
+        Initialize the crawl archive from the settings dictionary.
+
+        If the archive is not a dictionary or any of its values
+        is not correct, a warning message is logged
+        and the default value is returned.
+
+        :param settings: A dictionary containing the settings
+        :return: A tuple containing the mode and the path of the archive
+        """
+        archive = settings.get("archive")
+        if not isinstance(archive, dict):
+            logger.warning("Archive is not of dict type. Archive is set to default")
+            return Constans.DEFAULT_ARCHIVE_MODE, Constans.DEFAULT_ARCHIVE_PATH
+
+        path = archive.get("path")
+        if not isinstance(path, str) or not path:
+            logger.warning("Archive path is not correct. Set to default")
+            path = Constans.DEFAULT_ARCHIVE_PATH
+        try:
+            mode = ArchiveMode(archive.get("mode"))
+        except ValueError:
+            logger.warning("Archive mode is not correct. Set to default")
+            mode = Constans.DEFAULT_ARCHIVE_MODE
+
+        return mode, path
+
+    @staticmethod
+    def __init_checkpoint(settings: dict) -> (bool, str, int):
+        """
+        Initialize the crawl checkpoint from the settings dictionary.
+
+        If the checkpoint is not a dictionary or any of its values
+        is not correct, a warning message is logged
+        and the default value is returned.
+
+        :param settings: A dictionary containing the settings
+        :return: A tuple containing whether the checkpoint is enabled,
+            its path and the number of the runs retrying the failed listing
+        """
+        checkpoint = settings.get("checkpoint")
+        if not isinstance(checkpoint, dict):
+            logger.warning(
+                "Checkpoint is not of dict type. Checkpoint is set to default"
+            )
+            return (
+                Constans.DEFAULT_CHECKPOINT,
+                Constans.DEFAULT_CHECKPOINT_PATH,
+                Constans.DEFAULT_CHECKPOINT_MAX_RETRIES,
+            )
+
+        enabled = checkpoint.get("enabled")
+        path = checkpoint.get("path")
+        max_retries = checkpoint.get("max_retries")
+
+        if not isinstance(enabled, bool):
+            logger.warning("Checkpoint enabled is not of bool type. Set to default")
+            enabled = Constans.DEFAULT_CHECKPOINT
+        if not isinstance(path, str) or not path:
+            logger.warning("Checkpoint path is not correct. Set to default")
+            path = Constans.DEFAULT_CHECKPOINT_PATH
+        if (
+            not isinstance(max_retries, int)
+            or isinstance(max_retries, bool)
+            or max_retries <= 0
+        ):
+            logger.warning("Checkpoint max retries is not correct. Set to default")
+            max_retries = Constans.DEFAULT_CHECKPOINT_MAX_RETRIES
+
+        return enabled, path, max_retries
+
     def __init_mongo_db_host(self, settings: dict) -> str:
         """
         Initialize the mongo db host from the settings dictionary.
@@ -245,3 +801,40 @@ class Settings:
         self.district = Constans.DEFAULT_DISTRICT
         self.property_type = Constans.DEFAULT_PROPERTY_TYPE
         self.auction_type = Constans.DEFAULT_AUCTION_TYPE
+        self.searches = [
+            SearchSpec(
+                price_min=self.price_min,
+                price_max=self.price_max,
+                province=self.province,
+                city=self.city,
+                district=self.district,
+                property_type=self.property_type,
+                auction_type=self.auction_type,
+            )
+        ]
+        self.max_pages = Constans.DEFAULT_MAX_PAGES
+        self.max_concurrent_requests = Constans.DEFAULT_MAX_CONCURRENT_REQUESTS
+        self.queue_size = Constans.DEFAULT_QUEUE_SIZE
+        self.parse_workers = Constans.DEFAULT_PARSE_WORKERS
+        self.incremental = Constans.DEFAULT_INCREMENTAL
+        self.index_path = Constans.DEFAULT_INDEX_PATH
+        self.track_changes = Constans.DEFAULT_TRACK_CHANGES
+        self.write_batch_size = Constans.DEFAULT_WRITE_BATCH_SIZE
+        self.write_flush_interval = Constans.DEFAULT_WRITE_FLUSH_INTERVAL
+        self.rate_limit = Constans.DEFAULT_RATE_LIMIT
+        self.rate_burst = Constans.DEFAULT_RATE_BURST
+        self.initial_concurrency = Constans.DEFAULT_INITIAL_CONCURRENCY
+        self.min_concurrency = Constans.DEFAULT_MIN_CONCURRENCY
+        self.latency_threshold = Constans.DEFAULT_LATENCY_THRESHOLD
+        self.max_attempts = Constans.DEFAULT_MAX_ATTEMPTS
+        self.backoff_base = Constans.DEFAULT_BACKOFF_BASE
+        self.backoff_max = Constans.DEFAULT_BACKOFF_MAX
+        self.request_timeout = Constans.DEFAULT_REQUEST_TIMEOUT
+        self.http_cache = Constans.DEFAULT_HTTP_CACHE
+        self.http_cache_path = Constans.DEFAULT_HTTP_CACHE_PATH
+        self.http_cache_max_size = Constans.DEFAULT_HTTP_CACHE_MAX_SIZE
+        self.archive_mode = Constans.DEFAULT_ARCHIVE_MODE
+        self.archive_path = Constans.DEFAULT_ARCHIVE_PATH
+        self.checkpoint = Constans.DEFAULT_CHECKPOINT
+        self.checkpoint_path = Constans.DEFAULT_CHECKPOINT_PATH
+        self.checkpoint_max_retries = Constans.DEFAULT_CHECKPOINT_MAX_RETRIES
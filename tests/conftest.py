@@ -0,0 +1,269 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs
+from urllib.parse import urlsplit
+
+import crawler.crawler
+import mongoengine
+import mongomock
+import pytest
+from common import Constans
+from crawler import Crawler
+from crawler.parsing import extract_listing
+from models import AgencyDocument
+from models import PropertyDocument
+from models.stats import StatsDocument
+from services import PropertyService
+
+SETTINGS_PATH = Path(__file__).parent.parent / "settings.json"
+LISTINGS_PER_PAGE = 6
+
+
+@pytest.fixture
+def database():
+    """
+    Connects the documents to the in-memory mongomock database,
+    which is dropped after the test.
+    """
+    connection = mongoengine.connect(
+        "otodomscraper_test",
+        host="mongodb://localhost",
+        mongo_client_class=mongomock.MongoClient,
+        uuidRepresentation="standard",
+    )
+    yield connection
+    for document in (PropertyDocument, AgencyDocument, StatsDocument):
+        document.drop_collection()
+    mongoengine.disconnect()
+
+
+def listing_page(
+    otodom_id: int, price: int = 500000, agency_id: int | None = None
+) -> dict:
+    """
+    :param otodom_id: The otodom id of the listing
+    :param price: The price of the property
+    :param agency_id: The otodom id of the agency offering the property
+    :return: The data embedded in the listing page
+    """
+    agency = None
+    if agency_id is not None:
+        agency = {
+            "id": agency_id,
+            "name": f"Agency {agency_id}",
+            "address": "Warszawa, 00-001, Prosta 1, warszawski, mazowieckie",
+        }
+    return {
+        "props": {
+            "pageProps": {
+                "ad": {
+                    "id": otodom_id,
+                    "createdAt": "2024-01-02T10:00:00+0100",
+                    "title": f"Flat {otodom_id}",
+                    "target": {
+                        "Area": "50.5",
+                        "Price": price,
+                        "Price_per_m": price // 50,
+                        "Rooms_num": ["2"],
+                        "ProperType": "mieszkanie",
+                        "MarketType": "secondary",
+                        "OfferType": "sprzedaz",
+                        "Floor_no": ["floor_2"],
+                        "Building_type": ["block"],
+                        "Build_year": 1990,
+                        "Heating": ["urban"],
+                    },
+                    "location": {
+                        "address": {
+                            "province": {"code": "mazowieckie"},
+                            "city": {"code": "warszawa"},
+                            "district": {"name": "Mokotow"},
+                            "street": {"name": "ul. Prosta"},
+                            "number": "5",
+                            "county": {"code": "warszawa"},
+                        },
+                        "coordinates": {"latitude": 52.2, "longitude": 21.0},
+                    },
+                    "agency": agency,
+                }
+            }
+        }
+    }
+
+
+@pytest.fixture
+def make_page():
+    """
+    :return: The function creating the data embedded in the listing page
+    """
+    return listing_page
+
+
+@pytest.fixture
+def make_property(make_page):
+    """
+    :return: The function creating the raw property extracted from the listing page
+    """
+
+    def make(otodom_id: int, price: int = 500000) -> dict:
+        link = f"https://www.otodom.pl/pl/oferta/flat-{otodom_id}-ID{otodom_id}"
+        return extract_listing(make_page(otodom_id, price), link, False)["property"]
+
+    return make
+
+
+def search_page(otodom_ids: list[int], page: int, prices: dict[int, int]) -> dict:
+    """
+    :param otodom_ids: The otodom ids of all the listings found by the search
+    :param page: The number of the search page
+    :param prices: The prices of the listings which are not the default one
+    :return: The data embedded in the search page
+    """
+    pages_count = max(1, -(-len(otodom_ids) // LISTINGS_PER_PAGE))
+    start = (page - 1) * LISTINGS_PER_PAGE
+    end = page * LISTINGS_PER_PAGE
+    found = otodom_ids[start:end]
+    items = [
+        {
+            "id": otodom_id,
+            "slug": f"flat-{otodom_id}-ID{otodom_id}",
+            "isPromoted": False,
+            "totalPrice": {"value": prices.get(otodom_id, 500000)},
+        }
+        for otodom_id in found
+    ]
+    return {
+        "props": {
+            "pageProps": {
+                "data": {
+                    "searchAds": {
+                        "items": items,
+                        "pagination": {"totalPages": pages_count, "page": page},
+                    }
+                }
+            }
+        }
+    }
+
+
+def page_html(page_data: dict) -> bytes:
+    """
+    :param page_data: The data embedded in the page
+    :return: The page with the data in the __NEXT_DATA__ script
+    """
+    return (
+        "<html><body><div>" + "x" * 2048 + "</div>"
+        '<script id="__NEXT_DATA__" type="application/json">'
+        + json.dumps(page_data)
+        + "</script></body></html>"
+    ).encode()
+
+
+class OtodomHandler(BaseHTTPRequestHandler):
+    """
+    Serves the search pages listing the otodom ids of the server
+    and their listing pages, every third one offered by an agency.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        url = urlsplit(self.path)
+        with server.lock:
+            server.connections.add(self.client_address)
+            server.requests.append(url.path)
+        status = 200
+        if url.path.startswith("/pl/wyniki/"):
+            page = int(parse_qs(url.query).get("page", ["1"])[0])
+            body = page_html(search_page(server.otodom_ids, page, server.prices))
+        elif url.path.startswith("/pl/oferta/"):
+            otodom_id = int(url.path.rsplit("ID", 1)[1])
+            agency_id = 900 + otodom_id % 2 if otodom_id % 3 == 0 else None
+            price = server.prices.get(otodom_id, 500000)
+            body = page_html(listing_page(otodom_id, price, agency_id))
+        else:
+            status, body = 404, b"Not found"
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def otodom():
+    """
+    :return: The local server serving the otodom.pl pages
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), OtodomHandler)
+    server.otodom_ids = list(range(1, 25))
+    server.prices = {}
+    server.requests = []
+    server.connections = set()
+    server.lock = threading.Lock()
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def make_crawler(database, otodom, tmp_path, monkeypatch):
+    """
+    :return: The function creating the crawler of the local otodom server
+        with the settings of the repository overridden by the given ones
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(Constans, "DEFAULT_URL", otodom.url)
+    monkeypatch.setattr(crawler.crawler, "connect_to_database", lambda host: None)
+
+    def make(**crawler_settings) -> Crawler:
+        with open(SETTINGS_PATH, encoding="utf-8") as f:
+            settings = json.load(f)
+        settings["crawler"].update(crawler_settings)
+        settings["database"]["host"] = "mongodb://localhost/otodomscraper_test"
+        with open(tmp_path / "settings.json", "w", encoding="utf-8") as f:
+            json.dump(settings, f)
+        return Crawler()
+
+    return make
+
+
+@pytest.fixture
+def rejected_ids(monkeypatch):
+    """
+    :return: The set of the otodom ids of the properties
+        which are rejected by the bulk writes of the PropertyService
+    """
+    rejected = set()
+    bulk_upsert = PropertyService.bulk_upsert
+
+    def rejecting(properties):
+        positions = [
+            index
+            for index, property_ in enumerate(properties)
+            if property_["otodom_id"] not in rejected
+        ]
+        result = bulk_upsert([properties[index] for index in positions])
+        return result._replace(
+            inserted_ids={
+                positions[index]: _id for index, _id in result.inserted_ids.items()
+            },
+            errors={
+                index: "rejected"
+                for index, property_ in enumerate(properties)
+                if property_["otodom_id"] in rejected
+            },
+        )
+
+    monkeypatch.setattr(PropertyService, "bulk_upsert", rejecting)
+    return rejected
@@ -0,0 +1,84 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from crawler.parsing import extract_listing
+from models import AgencyDocument
+from services.agency import AgencyService
+from services.agency_cache import AgencyCache
+
+WORKERS = 8
+
+
+@pytest.fixture
+def agency(make_page):
+    link = "https://www.otodom.pl/pl/oferta/flat-1-ID1"
+    return extract_listing(make_page(1, agency_id=7), link, False)["agency"]
+
+
+@pytest.fixture
+def inserts(monkeypatch):
+    """
+    :return: The calls of the agency upsert, which waits until they are released
+    """
+    inserts = SimpleNamespace(calls=[], release=threading.Event())
+    upsert_raw = AgencyService.upsert_raw
+
+    def blocked(agency):
+        inserts.calls.append(agency["otodom_id"])
+        assert inserts.release.wait(5)
+        return upsert_raw(agency)
+
+    monkeypatch.setattr(AgencyService, "upsert_raw", blocked)
+    return inserts
+
+
+def wait_for_waiters(cache: AgencyCache, waiters: int) -> None:
+    deadline = time.monotonic() + 5
+    while cache.hits < waiters:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_concurrent_workers_insert_new_agency_once(database, agency, inserts):
+    cache = AgencyCache()
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+        refs = [executor.submit(cache.get_or_insert, agency) for _ in range(WORKERS)]
+        wait_for_waiters(cache, WORKERS - 1)
+        inserts.release.set()
+        refs = [ref.result() for ref in refs]
+
+    assert inserts.calls == [7]
+    assert refs[0] is not None and all(ref == refs[0] for ref in refs)
+    assert AgencyDocument._get_collection().count_documents({}) == 1
+    assert cache.misses == 1 and not cache.inflight
+    assert cache.get_or_insert(agency) == refs[0]
+    assert inserts.calls == [7]
+
+
+def test_concurrent_coroutines_insert_new_agency_once(database, agency, inserts):
+    cache = AgencyCache()
+
+    async def crawl():
+        # The waiters must not hold the only thread the insert needs
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=1))
+        tasks = [
+            asyncio.create_task(cache.get_or_insert_async(agency))
+            for _ in range(WORKERS)
+        ]
+        while cache.hits < WORKERS - 1:
+            await asyncio.sleep(0.001)
+        inserts.release.set()
+        return await asyncio.gather(*tasks)
+
+    refs = asyncio.run(crawl())
+
+    assert inserts.calls == [7]
+    assert refs[0] is not None and all(ref == refs[0] for ref in refs)
+    assert AgencyDocument._get_collection().count_documents({}) == 1
+    assert cache.misses == 1 and not cache.inflight
@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+import pytest
+from crawler.cache import AsyncCachingFetcher
+from crawler.cache import CachingFetcher
+from crawler.cache import HttpCache
+from crawler.exceptions import FetchError
+from crawler.fetcher import AsyncFetcher
+from crawler.fetcher import Fetcher
+from crawler.retry import MIN_BODY_SIZE
+from crawler.retry import RetryPolicy
+from crawler.throttle import Throttle
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    """
+    Serves the page of the server with its ETag,
+    answering 304 to the requests with the matching one.
+    """
+
+    def do_GET(self):
+        server = self.server
+        etag = f'"{server.version}"'
+        server.requests.append(self.headers.get("If-None-Match"))
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        body = f"page {server.version}".encode() + b" " * server.padding
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+    server.version = 1
+    server.padding = 0
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_port}/pl/oferta/flat-1-ID1"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = HttpCache(str(tmp_path / "http_cache.sqlite"), max_size=1024 * 1024)
+    yield cache
+    cache.close()
+
+
+def make_throttle() -> Throttle:
+    return Throttle(1000, 100, 4, 1, 4, latency_threshold=5)
+
+
+def test_unchanged_page_is_revalidated(server, cache):
+    fetcher = CachingFetcher(Fetcher(4, make_throttle()), cache)
+
+    first = fetcher.get(server.url)
+    second = fetcher.get(server.url)
+    server.version = 2
+    third = fetcher.get(server.url)
+    fetcher.close()
+
+    assert server.requests == [None, '"1"', '"1"']
+    assert (first.status, first.content) == (200, b"page 1")
+    assert (second.status, second.content) == (200, b"page 1")
+    assert second.headers["ETag"] == '"1"'
+    assert (third.status, third.content) == (200, b"page 2")
+    assert cache.get(server.url).etag == '"2"'
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_unchanged_page_is_revalidated_async(server, cache):
+    async def crawl():
+        async with AsyncFetcher(4, make_throttle()) as fetcher:
+            caching_fetcher = AsyncCachingFetcher(fetcher, cache)
+            return [await caching_fetcher.get(server.url) for _ in range(2)]
+
+    first, second = asyncio.run(crawl())
+
+    assert server.requests == [None, '"1"']
+    assert first.content == second.content == b"page 1"
+    assert second.status == 200
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def parse_second_version(content: bytes) -> bytes | None:
+    return content if content.startswith(b"page 2") else None
+
+
+@pytest.mark.parametrize("padding", [0, MIN_BODY_SIZE])
+def test_rejected_page_is_not_kept_in_cache(server, cache, padding):
+    # Without the padding the page is rejected by the classification,
+    # with it by the parsing
+    server.padding = padding
+    policy = RetryPolicy(
+        max_attempts=2,
+        backoff_base=0,
+        backoff_max=0,
+        timeout=5,
+        on_rejected=cache.discard,
+    )
+    fetcher = CachingFetcher(Fetcher(4, make_throttle()), cache)
+
+    with pytest.raises(FetchError):
+        policy.get(fetcher, server.url, parse=parse_second_version)
+    assert cache.get(server.url) is None
+    server.version = 2
+    server.padding = MIN_BODY_SIZE
+    page = policy.get(fetcher, server.url, parse=parse_second_version)
+    fetcher.close()
+
+    assert page.startswith(b"page 2")
+    assert server.requests == [None, None, None]
+    assert cache.get(server.url).etag == '"2"'
+    assert cache.size == len(zlib.compress(page))
@@ -0,0 +1,48 @@
+import queue
+from types import SimpleNamespace
+
+import pytest
+from crawler.checkpoint import Checkpoint
+from crawler.checkpoint import LinkState
+from crawler.crawler import Crawler
+from crawler.listing import ListingLink
+from settings.s_types import AuctionType
+from settings.s_types import PropertyType
+from settings.s_types import SearchSpec
+
+SEARCH = SearchSpec(
+    0, 1000000, "mazowieckie", "warszawa", None, PropertyType.FLAT, AuctionType.SALE
+)
+LINK = ListingLink(1, "https://www.otodom.pl/pl/oferta/flat-1-ID1", False, 500000)
+
+
+@pytest.fixture
+def checkpoint(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.sqlite"), max_retries=2)
+    checkpoint.save_shards([(SEARCH, 1)])
+    checkpoint.add_page(SEARCH, 1, [LINK])
+    yield checkpoint
+    checkpoint.close()
+
+
+def link_state(checkpoint: Checkpoint) -> str:
+    return checkpoint.connection.execute("SELECT state FROM links").fetchone()[0]
+
+
+@pytest.mark.parametrize("error", [ValueError("bad page"), ConnectionError("down")])
+def test_unexpected_error_moves_listing_to_retry_queue(checkpoint, error):
+    def extract_listing_data(listing_link):
+        raise error
+
+    crawler = SimpleNamespace(
+        checkpoint=checkpoint, extract_listing_data=extract_listing_data
+    )
+    listings_queue = queue.Queue()
+    listings_queue.put(LINK)
+    listings_queue.put(None)
+
+    Crawler.consume_listings(crawler, listings_queue)
+
+    assert link_state(checkpoint) == LinkState.FAILED.value
+    assert checkpoint.is_complete()
+    assert checkpoint.pending_links() == [LINK]
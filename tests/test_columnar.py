@@ -0,0 +1,48 @@
+import pytest
+from services import PropertyService
+
+pyarrow = pytest.importorskip("pyarrow")
+pyarrow.ipc = pytest.importorskip("pyarrow.ipc")
+pyarrow.parquet = pytest.importorskip("pyarrow.parquet")
+
+MARKETS = ["secondary", "secondary", "primary", "secondary", "primary"]
+
+
+@pytest.fixture
+def properties(database, make_property):
+    properties = []
+    for otodom_id, market_type in enumerate(MARKETS, start=1):
+        property_ = make_property(otodom_id)
+        property_["market_type"] = market_type
+        properties.append(property_)
+    PropertyService.bulk_upsert(properties)
+    return properties
+
+
+def read_arrow(filename: str) -> pyarrow.Table:
+    with pyarrow.ipc.open_file(filename) as reader:
+        assert reader.num_record_batches == 3
+        return reader.read_all()
+
+
+def read_parquet(filename: str) -> pyarrow.Table:
+    assert pyarrow.parquet.ParquetFile(filename).num_row_groups == 3
+    return pyarrow.parquet.read_table(filename)
+
+
+@pytest.mark.parametrize(
+    "export, read",
+    [
+        (PropertyService.to_arrow_file, read_arrow),
+        (PropertyService.to_parquet_file, read_parquet),
+    ],
+)
+def test_export_is_written_in_many_batches(tmp_path, properties, export, read):
+    filename = str(tmp_path / "properties")
+
+    export(filename, batch_size=2)
+
+    table = read(filename).sort_by("otodom_id")
+    assert table.column("otodom_id").to_pylist() == [1, 2, 3, 4, 5]
+    assert table.column("market_type").to_pylist() == MARKETS
+    assert pyarrow.types.is_dictionary(table.schema.field("market_type").type)
@@ -0,0 +1,49 @@
+import pytest
+from models import AgencyDocument
+from models import PropertyDocument
+from services import PropertyService
+
+CONNECTIONS = 4
+THROTTLE = {
+    "rate": 1000,
+    "burst": 100,
+    "initial_concurrency": CONNECTIONS,
+    "min_concurrency": 1,
+    "latency_threshold": 5,
+}
+
+
+@pytest.mark.parametrize("start", ["start", "start_async"])
+def test_crawl_saves_every_listing(make_crawler, otodom, start):
+    crawler = make_crawler(max_concurrent_requests=CONNECTIONS, throttle=THROTTLE)
+
+    getattr(crawler, start)()
+
+    properties = PropertyDocument._get_collection()
+    assert sorted(properties.distinct("otodom_id")) == otodom.otodom_ids
+    assert AgencyDocument._get_collection().count_documents({}) == 2
+    assert sorted(
+        listing.property_["otodom_id"] for listing in crawler.listings
+    ) == sorted(otodom.otodom_ids)
+    assert properties.count_documents({"estate_agency": {"$exists": True}}) == 8
+
+
+def test_async_crawl_reuses_pooled_connections(make_crawler, otodom):
+    crawler = make_crawler(max_concurrent_requests=CONNECTIONS, throttle=THROTTLE)
+
+    crawler.start_async()
+
+    assert len(otodom.requests) == 1 + 4 + len(otodom.otodom_ids)
+    assert len(otodom.connections) <= CONNECTIONS
+
+
+@pytest.mark.parametrize("start", ["start", "start_async"])
+def test_crawl_raises_errors_of_search_pages(make_crawler, otodom, monkeypatch, start):
+    def unavailable(otodom_ids, *fields):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(PropertyService, "get_many_by_otodom_ids", unavailable)
+    crawler = make_crawler(max_concurrent_requests=CONNECTIONS, throttle=THROTTLE)
+
+    with pytest.raises(RuntimeError, match="database unavailable"):
+        getattr(crawler, start)()
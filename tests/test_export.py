@@ -0,0 +1,49 @@
+import mongomock
+import pytest
+from models import AgencyDocument
+from models import PropertyDocument
+from services import PropertyService
+
+AGENCIES = [7, 8, 9]
+
+
+@pytest.fixture
+def queries(monkeypatch):
+    """
+    :return: The names of the collections read by every query
+    """
+    queries = []
+    find = mongomock.collection.Collection.find
+
+    def counted(collection, *args, **kwargs):
+        queries.append(collection.name)
+        return find(collection, *args, **kwargs)
+
+    monkeypatch.setattr(mongomock.collection.Collection, "find", counted)
+    return queries
+
+
+def test_agencies_are_joined_without_query_per_property(
+    database, make_property, queries
+):
+    agencies = [
+        {"otodom_id": otodom_id, "name": f"Agency {otodom_id}"}
+        for otodom_id in AGENCIES
+    ]
+    refs = AgencyDocument._get_collection().insert_many(agencies).inserted_ids
+    properties = [make_property(otodom_id) for otodom_id in range(1, 31)]
+    for index, property_ in enumerate(properties):
+        property_["estate_agency"] = refs[index % len(refs)]
+    PropertyDocument._get_collection().insert_many(properties)
+    queries.clear()
+
+    rows = list(PropertyService.iter_export_rows(include_agencies=True, batch_size=4))
+
+    assert len(rows) == 30
+    assert sorted(row["agency_otodom_id"] for row in rows) == sorted(AGENCIES * 10)
+    assert sorted(queries) == sorted(
+        [
+            AgencyDocument._get_collection_name(),
+            PropertyDocument._get_collection_name(),
+        ]
+    )
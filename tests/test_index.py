@@ -0,0 +1,45 @@
+import pytest
+from crawler.index import SeenIndex
+
+THROTTLE = {
+    "rate": 1000,
+    "burst": 100,
+    "initial_concurrency": 4,
+    "min_concurrency": 1,
+    "latency_threshold": 5,
+}
+REJECTED = 5
+
+
+def saved_index() -> SeenIndex:
+    index = SeenIndex("seen_index.bin")
+    index.load()
+    return index
+
+
+@pytest.mark.parametrize("start", ["start", "start_async"])
+def test_rejected_listing_is_not_added_to_index(
+    make_crawler, otodom, rejected_ids, start
+):
+    rejected_ids.add(REJECTED)
+    crawler = make_crawler(
+        incremental=True, max_concurrent_requests=4, throttle=THROTTLE
+    )
+
+    getattr(crawler, start)()
+
+    expected = [otodom_id for otodom_id in otodom.otodom_ids if otodom_id != REJECTED]
+    assert sorted(saved_index().entries) == expected
+
+
+def test_rejected_listing_is_extracted_by_next_run(make_crawler, otodom, rejected_ids):
+    rejected_ids.add(REJECTED)
+    make_crawler(incremental=True, max_concurrent_requests=4, throttle=THROTTLE).start()
+    otodom.requests.clear()
+    rejected_ids.clear()
+
+    make_crawler(incremental=True, max_concurrent_requests=4, throttle=THROTTLE).start()
+
+    listing_requests = [path for path in otodom.requests if "/pl/oferta/" in path]
+    assert listing_requests == [f"/pl/oferta/flat-{REJECTED}-ID{REJECTED}"]
+    assert REJECTED in saved_index().entries
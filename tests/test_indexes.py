@@ -0,0 +1,61 @@
+import pytest
+from services.indexes import SERVICE_QUERIES
+from services.indexes import ServiceQuery
+
+SPECIAL_INDEXES = {"$text": "text", "$nearSphere": "2dsphere"}
+
+
+def special_index(query: ServiceQuery) -> tuple[str | None, str] | None:
+    """
+    :param query: The query made by the services
+    :return: The field and the type of the text or geospatial index
+        the query needs, None if it needs a regular one
+    """
+    for key, value in query.filter.items():
+        if key in SPECIAL_INDEXES:
+            return None, SPECIAL_INDEXES[key]
+        if isinstance(value, dict):
+            for operator in value:
+                if operator in SPECIAL_INDEXES:
+                    return key, SPECIAL_INDEXES[operator]
+    return None
+
+
+def covers(fields: list[tuple[str, int | str]], query: ServiceQuery) -> bool:
+    """
+    The index covers the query if it starts with one of the filtered fields,
+    or with the sorted ones when nothing is filtered, contains all of them
+    and can be walked in the order of the sort.
+
+    :param fields: The fields of the declared index with their directions
+    :param query: The query made by the services
+    :return: Whether the index serves the query
+    """
+    directions = dict(fields)
+    filtered = list(query.filter)
+    sort = query.sort or []
+    leading = filtered if filtered else [name for name, _ in sort[:1]]
+    if fields[0][0] not in leading:
+        return False
+    if any(name not in directions for name in filtered + [name for name, _ in sort]):
+        return False
+    if sort and not filtered:
+        orders = {directions[name] * direction for name, direction in sort}
+        return len(orders) == 1
+    return True
+
+
+@pytest.mark.parametrize("query", SERVICE_QUERIES, ids=lambda query: query.name)
+def test_service_query_is_served_by_declared_index(query):
+    specs = [spec["fields"] for spec in query.document._meta["index_specs"]]
+
+    special = special_index(query)
+    if special is not None:
+        field, index_type = special
+        assert any(
+            direction == index_type and field in (None, name)
+            for fields in specs
+            for name, direction in fields
+        )
+    else:
+        assert any(covers(fields, query) for fields in specs)
@@ -0,0 +1,87 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+from crawler.crawler import Crawler
+from crawler.listing import ListingLink
+from services import PropertyService
+
+
+def listing_link(otodom_id: int, price: int = 500000) -> ListingLink:
+    link = f"https://www.otodom.pl/pl/oferta/flat-{otodom_id}-ID{otodom_id}"
+    return ListingLink(otodom_id, link, False, price)
+
+
+@pytest.fixture
+def crawler():
+    crawler = Crawler.__new__(Crawler)
+    crawler.settings = SimpleNamespace(track_changes=False)
+    crawler.index = None
+    crawler.scheduled_ids = set()
+    crawler.lock = threading.Lock()
+    return crawler
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    calls = []
+    get_many = PropertyService.get_many_by_otodom_ids
+
+    def counted(otodom_ids, *fields):
+        calls.append(list(otodom_ids))
+        return get_many(otodom_ids, *fields)
+
+    monkeypatch.setattr(PropertyService, "get_many_by_otodom_ids", counted)
+    return calls
+
+
+def test_known_listings_are_looked_up_once_per_page(
+    database, crawler, lookups, make_property
+):
+    PropertyService.bulk_upsert([make_property(1), make_property(3)])
+    page = [listing_link(otodom_id) for otodom_id in (1, 2, 3, 4, 2)]
+
+    selected = crawler.select_new_listings(page)
+
+    assert [link.otodom_id for link in selected] == [2, 4]
+    assert lookups == [[1, 2, 3, 4]]
+
+
+def test_already_scheduled_listings_are_not_looked_up(database, crawler, lookups):
+    crawler.select_new_listings([listing_link(1), listing_link(2)])
+
+    assert crawler.select_new_listings([listing_link(1), listing_link(2)]) == []
+    assert len(lookups) == 1
+
+
+def test_known_listings_with_changed_price_are_selected(
+    database, crawler, lookups, make_property
+):
+    crawler.settings.track_changes = True
+    PropertyService.bulk_upsert([make_property(1), make_property(2)])
+    page = [listing_link(1), listing_link(2, price=450000), listing_link(3)]
+
+    selected = crawler.select_new_listings(page)
+
+    assert [link.otodom_id for link in selected] == [2, 3]
+    assert len(lookups) == 1
+
+
+def test_links_are_read_with_projection(database, make_property):
+    PropertyService.bulk_upsert([make_property(1), make_property(2)])
+
+    links = PropertyService.get_all_links()
+
+    assert links == PropertyService.get_links_projection()
+    assert links == {make_property(1)["link"], make_property(2)["link"]}
+
+
+def test_properties_are_looked_up_by_otodom_id(database, make_property):
+    PropertyService.bulk_upsert([make_property(1), make_property(2)])
+
+    found = PropertyService.get_many_by_otodom_ids([1, 3], "price")
+
+    assert list(found) == [1]
+    assert set(found[1]) == {"_id", "otodom_id", "price"}
+    assert PropertyService.get_by_otodom_id(2).otodom_id == 2
+    assert PropertyService.get_by_otodom_id(3) is None
@@ -0,0 +1,55 @@
+import pytest
+from models import AgencyDocument
+from models import PropertyDocument
+from models.building import BuildingDocument
+from models.localization import LocalizationDocument
+from models.records import AgencyRecord
+from models.records import PropertyRecord
+from models.records import to_raw
+
+LINK = "https://www.otodom.pl/pl/oferta/flat-1-ID1"
+
+
+def fields(record: object) -> dict:
+    return {name: getattr(record, name) for name in record.__slots__}
+
+
+def to_document(record: PropertyRecord) -> PropertyDocument:
+    """
+    :param record: The property extracted from the listing page
+    :return: The property built the way the extraction did before the records
+    """
+    values = fields(record)
+    values["localization"] = LocalizationDocument(**fields(record.localization))
+    if record.building is not None:
+        values["building"] = BuildingDocument(**fields(record.building))
+    return PropertyDocument(**values)
+
+
+def agency_page(make_page):
+    return make_page(1, agency_id=7)
+
+
+def private_page(make_page):
+    page = make_page(2)
+    target = page["props"]["pageProps"]["ad"]["target"]
+    for name in ("Building_type", "Build_year", "Floor_no", "Heating", "Price"):
+        del target[name]
+    target["ConstructionStatus"] = "ready_to_use"
+    target["Extras_types"] = ["balcony", "garage"]
+    del page["props"]["pageProps"]["ad"]["location"]["coordinates"]
+    return page
+
+
+@pytest.mark.parametrize("page", [agency_page, private_page])
+@pytest.mark.parametrize("promoted", [False, True])
+def test_property_record_is_converted_as_document(make_page, page, promoted):
+    record = PropertyRecord.from_page(page(make_page), LINK, promoted)
+
+    assert to_raw(record) == to_document(record).to_mongo().to_dict()
+
+
+def test_agency_record_is_converted_as_document(make_page):
+    record = AgencyRecord.from_page(make_page(1, agency_id=7))
+
+    assert to_raw(record) == AgencyDocument(**fields(record)).to_mongo().to_dict()
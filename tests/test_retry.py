@@ -0,0 +1,73 @@
+import asyncio
+
+import aiohttp
+import pytest
+import requests
+from crawler.fetcher import Response
+from crawler.retry import RetryPolicy
+
+PAGE = Response(
+    url="https://www.otodom.pl/pl/oferta/flat-1-ID1",
+    status=200,
+    headers={"Content-Type": "text/html"},
+    content=b"<html>" + b" " * 2048 + b"</html>",
+)
+
+
+class FailingFetcher:
+    """
+    Raises the queued errors, then returns the page.
+    """
+
+    def __init__(self, errors: list[Exception]):
+        self.errors = errors
+        self.calls = 0
+
+    def get(self, url, params=None, timeout=None) -> Response:
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return PAGE
+
+
+class AsyncFailingFetcher(FailingFetcher):
+    async def get(self, url, params=None, timeout=None) -> Response:
+        return FailingFetcher.get(self, url, params, timeout)
+
+
+def make_policy() -> RetryPolicy:
+    return RetryPolicy(max_attempts=3, backoff_base=0, backoff_max=0, timeout=1)
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        requests.exceptions.ChunkedEncodingError("connection broken"),
+        requests.exceptions.ContentDecodingError("invalid gzip"),
+        requests.ConnectionError("connection refused"),
+    ],
+)
+def test_request_errors_are_retried(error):
+    fetcher = FailingFetcher([error])
+    policy = make_policy()
+
+    assert policy.get(fetcher, PAGE.url) == PAGE.content
+    assert fetcher.calls == 2
+    assert policy.metrics.as_dict()["retries"] == 1
+
+
+def test_client_errors_are_retried_async():
+    fetcher = AsyncFailingFetcher([aiohttp.ClientPayloadError("connection broken")])
+    policy = make_policy()
+
+    assert asyncio.run(policy.get_async(fetcher, PAGE.url)) == PAGE.content
+    assert fetcher.calls == 2
+
+
+def test_timeouts_are_counted_apart_from_request_errors():
+    fetcher = FailingFetcher([requests.ReadTimeout("timed out")])
+    policy = make_policy()
+
+    policy.get(fetcher, PAGE.url)
+
+    assert policy.metrics.as_dict()["timeouts"] == 1
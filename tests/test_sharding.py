@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+import pytest
+from crawler.checkpoint import Checkpoint
+from crawler.crawler import Crawler
+from settings.s_types import AuctionType
+from settings.s_types import PropertyType
+from settings.s_types import SearchSpec
+
+SEARCH = SearchSpec(
+    0, 1000000, "mazowieckie", "warszawa", None, PropertyType.FLAT, AuctionType.SALE
+)
+OTHER = SEARCH._replace(city="krakow")
+
+
+@pytest.fixture
+def crawler():
+    crawler = Crawler.__new__(Crawler)
+    crawler.settings = SimpleNamespace(
+        max_pages=10, max_concurrent_requests=2, searches=[SEARCH, OTHER]
+    )
+    return crawler
+
+
+def test_failed_count_is_counted_again(crawler):
+    counts = {SEARCH: [None, 3], OTHER: [5]}
+    crawler.count_pages = lambda search: counts[search].pop(0)
+
+    assert sorted(crawler.shard_searches([SEARCH, OTHER])) == sorted(
+        [(SEARCH, 3), (OTHER, 5)]
+    )
+
+
+def test_search_failing_every_count_is_left_uncounted(crawler):
+    crawler.count_pages = lambda search: None if search == SEARCH else 0
+
+    shards = crawler.shard_searches([SEARCH, OTHER])
+
+    assert sorted(shards) == sorted([(SEARCH, None), (OTHER, 0)])
+    assert Crawler.schedule_pages(shards) == ([], [])
+
+
+def test_uncounted_search_is_counted_when_resumed(crawler, tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.sqlite"), max_retries=2)
+    checkpoint.load_shards(crawler.settings.searches)
+    checkpoint.save_shards([(SEARCH, None), (OTHER, 0)])
+
+    assert not checkpoint.is_complete()
+    shards = checkpoint.load_shards(crawler.settings.searches)
+    assert crawler.searches_to_count(shards) == [SEARCH]
+
+    checkpoint.save_shards(Crawler.counted_shards(shards) + [(SEARCH, 2)])
+    assert sorted(checkpoint.load_shards(crawler.settings.searches)) == sorted(
+        [(SEARCH, 2), (OTHER, 0)]
+    )
+    checkpoint.close()
+
+
+def test_new_crawl_counts_every_search(crawler):
+    assert crawler.searches_to_count([]) == [SEARCH, OTHER]
@@ -0,0 +1,149 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+import pytest
+from crawler.fetcher import AsyncFetcher
+from crawler.fetcher import Fetcher
+from crawler.throttle import AdaptiveLimiter
+from crawler.throttle import Throttle
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Answers with the statuses queued on the server, then with 200.
+    """
+
+    def do_GET(self):
+        statuses = self.server.statuses
+        status = statuses.pop(0) if statuses else 200
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.statuses = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_throttle() -> Throttle:
+    return Throttle(
+        rate=1000,
+        burst=100,
+        initial_concurrency=8,
+        min_concurrency=1,
+        max_concurrency=16,
+        latency_threshold=5,
+    )
+
+
+@pytest.mark.parametrize("status", [429, 500, 502, 503, 504])
+def test_unhealthy_responses_back_off(server, status):
+    server.statuses = [status] * 3
+    throttle = make_throttle()
+    fetcher = Fetcher(4, throttle)
+    url = f"http://127.0.0.1:{server.server_port}/"
+
+    statuses = [fetcher.get(url).status for _ in range(4)]
+    fetcher.close()
+
+    assert statuses == [status] * 3 + [200]
+    limiter = throttle.for_url(url).limiter
+    assert 4 <= limiter.limit < 8
+    assert limiter.in_flight == 0
+
+
+def test_throttled_async_requests_back_off(server):
+    server.statuses = [429] * 3
+    throttle = make_throttle()
+    url = f"http://127.0.0.1:{server.server_port}/"
+
+    async def crawl():
+        async with AsyncFetcher(4, throttle) as fetcher:
+            responses = await asyncio.gather(*(fetcher.get(url) for _ in range(10)))
+        return [response.status for response in responses]
+
+    statuses = asyncio.run(crawl())
+
+    assert statuses.count(429) == 3
+    limiter = throttle.for_url(url).limiter
+    assert limiter.limit < 8
+    assert limiter.in_flight == 0
+
+
+def test_async_waiters_are_served_in_order():
+    limiter = AdaptiveLimiter(1, 1, 1, latency_threshold=5)
+    order = []
+
+    async def request(number):
+        await limiter.acquire_async()
+        order.append(number)
+        await asyncio.sleep(0)
+        limiter.release(0.0, False)
+
+    async def crawl():
+        await limiter.acquire_async()
+        tasks = [asyncio.create_task(request(number)) for number in range(5)]
+        await asyncio.sleep(0)
+        assert order == [] and len(limiter.waiters) == 5
+        limiter.release(0.0, False)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(crawl())
+
+    assert order == [0, 1, 2, 3, 4]
+    assert limiter.in_flight == 0 and not limiter.waiters
+
+
+def test_cancelled_waiter_passes_the_slot_on():
+    limiter = AdaptiveLimiter(1, 1, 1, latency_threshold=5)
+
+    async def crawl():
+        await limiter.acquire_async()
+        cancelled = asyncio.create_task(limiter.acquire_async())
+        waiting = asyncio.create_task(limiter.acquire_async())
+        await asyncio.sleep(0)
+        limiter.release(0.0, False)
+        cancelled.cancel()
+        await asyncio.wait_for(waiting, 1)
+        assert cancelled.cancelled()
+
+    asyncio.run(crawl())
+
+    assert limiter.in_flight == 1 and not limiter.waiters
+
+
+def test_cancelled_wait_for_token_gives_slot_back():
+    throttle = Throttle(
+        rate=1,
+        burst=1,
+        initial_concurrency=2,
+        min_concurrency=1,
+        max_concurrency=2,
+        latency_threshold=5,
+    )
+    host = throttle.for_url("http://127.0.0.1/")
+
+    async def crawl():
+        await host.acquire_async()
+        waiting = asyncio.create_task(host.acquire_async())
+        await asyncio.sleep(0.01)
+        assert host.limiter.in_flight == 2
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+    asyncio.run(crawl())
+
+    assert host.limiter.in_flight == 1 and host.limiter.limit == 2
@@ -0,0 +1,136 @@
+import pytest
+from bson import ObjectId
+from crawler.checkpoint import Checkpoint
+from crawler.checkpoint import LinkState
+from models import PropertyDocument
+from services import BulkWriter
+from services import PropertyService
+
+THROTTLE = {
+    "rate": 1000,
+    "burst": 100,
+    "initial_concurrency": 4,
+    "min_concurrency": 1,
+    "latency_threshold": 5,
+}
+
+
+def test_bulk_upsert_inserts_every_property_once(database, make_property):
+    PropertyService.bulk_upsert([make_property(1)])
+
+    result = PropertyService.bulk_upsert(
+        [make_property(2), make_property(3), make_property(2), make_property(1)]
+    )
+
+    assert sorted(result.inserted_ids) == [0, 1]
+    assert result.errors == {}
+    collection = PropertyDocument._get_collection()
+    assert sorted(collection.distinct("otodom_id")) == [1, 2, 3]
+    assert collection.count_documents({}) == 3
+
+
+def test_bulk_upsert_reports_rejected_properties(database, make_property):
+    PropertyService.bulk_upsert([make_property(1)])
+    stored_id = PropertyDocument._get_collection().find_one()["_id"]
+    conflicting = make_property(3)
+    conflicting["_id"] = stored_id
+
+    result = PropertyService.bulk_upsert([make_property(2), conflicting])
+
+    assert list(result.inserted_ids) == [0]
+    assert list(result.errors) == [1]
+    assert PropertyDocument._get_collection().count_documents({}) == 2
+
+
+def test_writer_reports_inserted_documents_once(database, make_property):
+    inserted = []
+    writer = BulkWriter(
+        flush=PropertyService.bulk_upsert,
+        batch_size=2,
+        flush_interval=60,
+        on_inserted=inserted.extend,
+    )
+    for otodom_id in (1, 2, 3, 1, 3):
+        writer.add_raw(make_property(otodom_id), otodom_id)
+    writer.close()
+
+    assert sorted(context for _, context in inserted) == [1, 2, 3]
+    assert all(isinstance(document["_id"], ObjectId) for document, _ in inserted)
+
+
+def test_writer_requeues_batch_when_write_fails(database, make_property):
+    calls = []
+
+    def flaky_flush(documents):
+        calls.append(len(documents))
+        if len(calls) == 1:
+            raise ConnectionError("database is down")
+        return PropertyService.bulk_upsert(documents)
+
+    writer = BulkWriter(flush=flaky_flush, batch_size=2, flush_interval=60)
+    writer.add_raw(make_property(1))
+    writer.add_raw(make_property(2))
+    writer.add_raw(make_property(3))
+    writer.close()
+
+    assert calls == [2, 3]
+    assert PropertyDocument._get_collection().count_documents({}) == 3
+
+
+def test_writer_flushes_full_batches(database, make_property):
+    batches = []
+
+    def flush(documents):
+        batches.append(len(documents))
+        return PropertyService.bulk_upsert(documents)
+
+    writer = BulkWriter(flush=flush, batch_size=10, flush_interval=60)
+    for otodom_id in range(25):
+        writer.add_raw(make_property(otodom_id))
+    assert batches == [10, 10]
+    writer.close()
+
+    assert batches == [10, 10, 5]
+    assert PropertyDocument._get_collection().count_documents({}) == 25
+
+
+@pytest.mark.parametrize("start", ["start", "start_async"])
+def test_crawl_writes_listings_in_batches(make_crawler, otodom, monkeypatch, start):
+    batches = []
+    bulk_upsert = PropertyService.bulk_upsert
+
+    def counted(properties):
+        batches.append(len(properties))
+        return bulk_upsert(properties)
+
+    monkeypatch.setattr(PropertyService, "bulk_upsert", counted)
+    crawler = make_crawler(
+        max_concurrent_requests=4,
+        throttle=THROTTLE,
+        write_batch_size=10,
+        write_flush_interval=60,
+    )
+
+    getattr(crawler, start)()
+
+    assert batches == [10, 10, 4]
+    assert len(crawler.listings) == len(otodom.otodom_ids)
+
+
+def test_crawl_keeps_only_rejected_listing_for_retry(
+    make_crawler, otodom, rejected_ids
+):
+    rejected_ids.add(5)
+    crawler = make_crawler(
+        max_concurrent_requests=4,
+        throttle=THROTTLE,
+        checkpoint={"enabled": True, "path": "checkpoint.sqlite", "max_retries": 3},
+    )
+
+    crawler.start()
+
+    checkpoint = Checkpoint("checkpoint.sqlite", max_retries=3)
+    states = dict(checkpoint.connection.execute("SELECT otodom_id, state FROM links"))
+    assert states == {5: LinkState.FAILED.value}
+    assert [link.otodom_id for link in checkpoint.pending_links()] == [5]
+    checkpoint.close()